@@ -1,11 +1,23 @@
-from flask import Flask
-from app.routes import main
-from app.database import initialize_database
+def create_app(warm_up=None):
+    # Flask and the blueprints are imported here rather than at module level so that importing any
+    # app.* module (tests, benchmarks, CLI tools) doesn't pull in the web stack.
+    from flask import Flask
+    from app.routes import main
+    from app.api import api
+    from app.database import initialize_database
+    from app.services import services, startup_services
+    from app.config.config import Config
 
-def create_app():
     app = Flask(__name__)
 
     initialize_database()
 
     app.register_blueprint(main)
+    app.register_blueprint(api)
+    cfg = Config()
+    if warm_up if warm_up is not None else cfg.get("app.warm_up", True):
+        # Camera(s) and model load in the background; /ready reports when streaming can start.
+        services.warm_up(*startup_services())
+    if cfg.get("storage.enabled", False):
+        services.warm_up("storage")
     return app
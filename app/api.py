@@ -0,0 +1,166 @@
+import base64
+import binascii
+import os
+from datetime import datetime, timezone
+from flask import Blueprint, abort, current_app, g, jsonify, request, send_file
+from app.database import DB_FILE, clips_page, connect, entities_page, get_clip, get_image, images_page, sightings_page
+from app.io import THUMBNAILS_CORE, get_thumbnail, read_packed
+from app.logger import get_logger
+from app.config.config import Config
+
+api = Blueprint("api", __name__, url_prefix="/api")
+logger = get_logger(__name__)
+cfg = Config()
+
+DEFAULT_LIMIT = cfg.get("api.page_size", 50)
+MAX_LIMIT = cfg.get("api.max_page_size", 500)
+THUMBNAIL_SIZES = tuple(cfg.get("api.thumbnail_sizes", [160, 320]))
+CACHE_MAX_AGE = cfg.get("api.cache_max_age", 3600)
+
+
+def get_db():
+    if "db" not in g:
+        g.db = connect(current_app.config.get("DB_FILE", DB_FILE))
+    return g.db
+
+@api.teardown_app_request
+def close_db(_):
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
+
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(":".join(str(v) for v in values).encode()).decode()
+
+def decode_cursor(cursor):
+    # Every cursor is the (sort key, id) pair of the last row of the previous page.
+    if not cursor:
+        return None
+    try:
+        values = tuple(int(v) for v in base64.urlsafe_b64decode(cursor.encode()).decode().split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400, "Invalid cursor")
+    if len(values) != 2:
+        abort(400, "Invalid cursor")
+    return values
+
+def page_limit():
+    try:
+        return max(1, min(MAX_LIMIT, int(request.args.get("limit", DEFAULT_LIMIT))))
+    except ValueError:
+        abort(400, "Invalid limit")
+
+def conditional_json(payload, last_modified=None):
+    response = jsonify(payload)
+    response.add_etag()
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(last_modified, tz=timezone.utc)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@api.route("/entities")
+def list_entities():
+    limit = page_limit()
+    rows = entities_page(get_db(), limit + 1, request.args.get("category"), decode_cursor(request.args.get("cursor")))
+    items = [
+        {"id": entity_id, "category": category, "first_seen": first_seen, "last_seen": last_seen, "sightings": sightings}
+        for entity_id, category, first_seen, last_seen, sightings in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1]["last_seen"], items[-1]["id"]) if len(rows) > limit else None
+    last_modified = max((item["last_seen"] for item in items), default=None)
+    return conditional_json({"items": items, "next_cursor": next_cursor}, last_modified)
+
+
+@api.route("/entities/<int:entity_id>/sightings")
+def list_sightings(entity_id):
+    limit = page_limit()
+    rows = sightings_page(get_db(), entity_id, limit + 1, decode_cursor(request.args.get("cursor")))
+    items = [
+        {"id": sighting_id, "start": start_ts, "end": end_ts, "track_id": track_id}
+        for sighting_id, start_ts, end_ts, track_id in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1]["start"], items[-1]["id"]) if len(rows) > limit else None
+    last_modified = max((item["end"] for item in items), default=None)
+    return conditional_json({"items": items, "next_cursor": next_cursor}, last_modified)
+
+
+@api.route("/entities/<int:entity_id>/images")
+def list_images(entity_id):
+    limit = page_limit()
+    rows = images_page(get_db(), entity_id, limit + 1, decode_cursor(request.args.get("cursor")))
+    items = [
+        {"id": image_id, "ts": ts, "image": f"/api/images/{image_id}", "thumbnail": f"/api/images/{image_id}/thumbnail"}
+        for image_id, ts, _ in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1]["ts"], items[-1]["id"]) if len(rows) > limit else None
+    last_modified = max((item["ts"] for item in items), default=None)
+    return conditional_json({"items": items, "next_cursor": next_cursor}, last_modified)
+
+
+@api.route("/entities/<int:entity_id>/clips")
+def list_clips(entity_id):
+    limit = page_limit()
+    rows = clips_page(get_db(), entity_id, limit + 1, decode_cursor(request.args.get("cursor")))
+    items = [
+        {"id": clip_id, "start": start_ts, "end": end_ts, "video": f"/api/clips/{clip_id}"}
+        for clip_id, start_ts, end_ts, _ in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1]["start"], items[-1]["id"]) if len(rows) > limit else None
+    last_modified = max((item["end"] for item in items), default=None)
+    return conditional_json({"items": items, "next_cursor": next_cursor}, last_modified)
+
+
+@api.route("/clips/<int:clip_id>")
+def clip_video(clip_id):
+    clip = get_clip(get_db(), clip_id)
+    if clip is None or not os.path.isfile(clip[4]):
+        abort(404)
+    # conditional=True also answers Range requests, so players can seek.
+    return send_file(os.path.abspath(clip[4]), conditional=True, max_age=CACHE_MAX_AGE)
+
+
+@api.route("/images/<int:image_id>")
+def image_full(image_id):
+    # Loose files are served from disk; images compacted into a pack are read out of it, so the
+    # URL stays valid when the storage manager moves an image.
+    image = get_image(get_db(), image_id)
+    if image is None:
+        abort(404)
+    if image[4] is None:
+        if not os.path.isfile(image[3]):
+            logger.warning(f"Image {image_id} missing on disk: {image[3]}")
+            abort(404)
+        return send_file(os.path.abspath(image[3]), mimetype="image/jpeg", conditional=True, max_age=CACHE_MAX_AGE)
+    try:
+        data = read_packed(*image[4:])
+    except OSError:
+        logger.warning(f"Image {image_id} missing from pack: {image[4]}")
+        abort(404)
+    response = current_app.response_class(data, mimetype="image/jpeg")
+    response.add_etag()
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response.make_conditional(request)
+
+
+@api.route("/images/<int:image_id>/thumbnail")
+def image_thumbnail(image_id):
+    try:
+        size = int(request.args.get("size", THUMBNAIL_SIZES[0]))
+    except ValueError:
+        abort(400, "Invalid size")
+    if size not in THUMBNAIL_SIZES:
+        abort(400, f"Thumbnail size must be one of {list(THUMBNAIL_SIZES)}")
+
+    image = get_image(get_db(), image_id)
+    if image is None:
+        abort(404)
+    pack = image[4:] if image[4] is not None else None
+    thumb_path = get_thumbnail(image[3], image_id, size, current_app.config.get("THUMBNAILS_DIR", THUMBNAILS_CORE),
+                               pack=pack)
+    if thumb_path is None:
+        logger.warning(f"Image {image_id} missing on disk: {image[3]}")
+        abort(404)
+    # send_file sets ETag/Last-Modified from the cached file and answers conditional requests with 304.
+    return send_file(os.path.abspath(thumb_path), mimetype="image/jpeg", conditional=True, max_age=CACHE_MAX_AGE)
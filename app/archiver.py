@@ -0,0 +1,268 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import cv2
+from app.database import add_clip, add_image, connect, initialize_database, record_sighting
+from app.metrics import metrics
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class ArchiveItem:
+    __slots__ = ("image_path", "crop", "category_pl", "obj_id", "timestamp", "captured_at")
+
+    def __init__(self, image_path, crop, category_pl, obj_id, timestamp, captured_at):
+        self.image_path = image_path
+        self.crop = crop
+        self.category_pl = category_pl
+        self.obj_id = obj_id
+        self.timestamp = timestamp
+        self.captured_at = captured_at
+
+
+class SightingItem:
+    # Extends the sighting of a track to cover [start, end] without writing an image. `crop`
+    # is the track's best shot, used for re-identification when that is enabled.
+    __slots__ = ("category_pl", "obj_id", "start", "end", "crop")
+
+    def __init__(self, category_pl, obj_id, start, end, crop=None):
+        self.category_pl = category_pl
+        self.obj_id = obj_id
+        self.start = start
+        self.end = end
+        self.crop = crop
+
+
+class ClipItem:
+    # A clip file already written by the clip recorder. `tracks` maps (category_pl, obj_id) to
+    # the (first_seen, last_seen) of that track within the clip.
+    __slots__ = ("path", "start", "end", "tracks", "size")
+
+    def __init__(self, path, start, end, tracks, size=None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.tracks = tracks
+        self.size = size
+
+
+class Archiver(threading.Thread):
+    # Writes crops and database rows off the frame loop. DB rows are grouped into one
+    # transaction per flush on a single WAL connection.
+    def __init__(self, db_file=None, queue_size=cfg.get("archive.queue_size", 64),
+                 flush_interval=cfg.get("archive.flush_interval", 2.0), batch_size=cfg.get("archive.batch_size", 32),
+                 jpeg_quality=cfg.get("archive.jpeg_quality", 90), max_retry_delay=cfg.get("archive.max_retry_delay", 60),
+                 max_pending_rows=cfg.get("archive.max_pending_rows", 10000), reid=None):
+        super().__init__(name="archiver", daemon=True)
+        self.db_file = db_file
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.jpeg_quality = jpeg_quality
+        self.max_retry_delay = max_retry_delay
+        self.max_pending_rows = max_pending_rows
+        self.reid = reid
+        self.stop_event = threading.Event()
+        self.pending_rows = []
+        self.retry_delay = 0
+        self.retry_at = 0.0
+        self.open_sightings = {}
+        self.known_dirs = set()
+        self.conn = None
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.db_rows = 0
+        self.db_flushes = 0
+        self.errors = 0
+        self.embed_errors = 0
+        self.flush_failures = 0
+        self.rows_dropped = 0
+
+    def submit(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if isinstance(item, ClipItem):
+                logger.warning(f"Archive queue full, dropped clip {item.path}")
+            else:
+                logger.warning(f"Archive queue full, dropped item for {item.category_pl}, obj_id = {item.obj_id}")
+            return False
+        self.submitted += 1
+        return True
+
+    def run(self):
+        initialize_database(self.db_file)
+        self.conn = connect(self.db_file)
+        last_flush = time.monotonic()
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                try:
+                    self.process(item)
+                except Exception as e:
+                    # One bad item (disk full, unwritable directory, encoder error) must not end
+                    # the only writer thread.
+                    self.errors += 1
+                    logger.error(f"Error archiving {type(item).__name__}: {e}")
+            if len(self.pending_rows) >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+        self.flush(force=True)
+        self.conn.close()
+        if self.reid is not None:
+            self.reid.flush()
+        logger.info("Archiver stopped.")
+
+    def process(self, item):
+        if isinstance(item, SightingItem):
+            embedding = self.embed(item) if self.reid is not None and item.crop is not None else None
+            self.pending_rows.append(("sighting", item.category_pl, item.obj_id, int(item.start), int(item.end),
+                                      embedding))
+        elif isinstance(item, ClipItem):
+            for (category_pl, obj_id), (first_seen, last_seen) in item.tracks.items():
+                self.pending_rows.append(("clip", category_pl, obj_id, int(first_seen),
+                                          (int(last_seen), item.path, int(item.start), int(item.end), item.size),
+                                          None))
+        else:
+            self.write(item)
+
+    def embed(self, item):
+        # Without an embedding the sighting is still stored, just not re-identified.
+        try:
+            return self.reid.embed(item.crop)
+        except Exception as e:
+            self.embed_errors += 1
+            logger.error(f"Re-ID embedding failed for {item.category_pl}, obj_id = {item.obj_id}: {e}")
+            return None
+
+    def write(self, item):
+        base_dir = os.path.dirname(item.image_path)
+        if base_dir not in self.known_dirs:
+            os.makedirs(base_dir, exist_ok=True)
+            self.known_dirs.add(base_dir)
+        with metrics.timer("export"):
+            ok, buffer = cv2.imencode(".jpg", item.crop, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            if not ok:
+                logger.error(f"Could not encode {item.image_path}")
+                return
+            try:
+                file = open(item.image_path, "wb")
+            except FileNotFoundError:
+                # The storage manager removes track directories it has emptied.
+                os.makedirs(base_dir, exist_ok=True)
+                file = open(item.image_path, "wb")
+            with file:
+                file.write(buffer)
+        self.written += 1
+        metrics.inc("images_written")
+        self.pending_rows.append(("image", item.category_pl, item.obj_id, int(item.captured_at),
+                                  (item.image_path, len(buffer)), None))
+
+    def flush(self, force=False):
+        if not self.pending_rows or (not force and time.monotonic() < self.retry_at):
+            return
+        rows, self.pending_rows = self.pending_rows, []
+        open_sightings = {key: list(value) for key, value in self.open_sightings.items()}
+        enrollments = []
+        flush_start = time.perf_counter()
+        try:
+            with self.conn:
+                for kind, category_pl, obj_id, ts, value, embedding in rows:
+                    if kind == "image":
+                        add_image(self.conn, open_sightings, category_pl, obj_id, ts, *value)
+                        continue
+                    if kind == "clip":
+                        add_clip(self.conn, open_sightings, category_pl, obj_id, ts, *value)
+                        continue
+                    entity_id = None
+                    if embedding is not None and (category_pl, obj_id) not in open_sightings:
+                        # A track this writer hasn't seen yet: attach it to a known identity if one looks alike.
+                        entity_id = self.reid.identify(category_pl, embedding)
+                        if entity_id is not None:
+                            logger.info(f"Track {obj_id} re-identified as {category_pl} entity {entity_id}")
+                    entity_id, _ = record_sighting(self.conn, open_sightings, category_pl, obj_id, ts, value, entity_id)
+                    if embedding is not None:
+                        enrollments.append((category_pl, embedding, entity_id))
+        except sqlite3.OperationalError as e:
+            # Locked or busy database, disk IO: the rows' files are already on disk, so keep the rows
+            # and retry with backoff instead of leaving files no index (or storage budget) knows of.
+            self.retry(rows, e)
+            return
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} archive rows: {e}")
+            self.rows_dropped += len(rows)
+            return
+        self.retry_delay = 0
+        self.retry_at = 0.0
+        # Only committed entities go into the index.
+        for category_pl, embedding, entity_id in enrollments:
+            self.reid.enroll(category_pl, embedding, entity_id)
+        self.open_sightings = open_sightings
+        metrics.observe("db_flush", time.perf_counter() - flush_start)
+        self.db_rows += len(rows)
+        self.db_flushes += 1
+
+    def retry(self, rows, error):
+        self.flush_failures += 1
+        self.pending_rows = rows + self.pending_rows
+        excess = len(self.pending_rows) - self.max_pending_rows
+        if excess > 0:
+            del self.pending_rows[:excess]
+            self.rows_dropped += excess
+            logger.error(f"Archive retry backlog full, dropped the {excess} oldest rows")
+        self.retry_delay = min(max(2 * self.retry_delay, self.flush_interval), self.max_retry_delay)
+        self.retry_at = time.monotonic() + self.retry_delay
+        logger.warning(f"Error writing {len(rows)} archive rows, retrying in {self.retry_delay:g} s: {error}")
+
+    def stop(self, timeout=10):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "pending_rows": len(self.pending_rows),
+            "db_rows": self.db_rows,
+            "db_flushes": self.db_flushes,
+            "errors": self.errors,
+            "embed_errors": self.embed_errors,
+            "flush_failures": self.flush_failures,
+            "rows_dropped": self.rows_dropped,
+            "reid": self.reid.stats() if self.reid is not None else None,
+        }
+
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+def get_archiver():
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            reid = None
+            if cfg.get("reid.enabled", False):
+                from app.base.reid import load_reidentifier
+                reid = load_reidentifier()
+            _archiver = Archiver(reid=reid)
+            _archiver.start()
+            atexit.register(_archiver.stop)
+        return _archiver
+
+
+def archiver_stats():
+    return _archiver.stats() if _archiver is not None else None
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from .inference import InferenceResults
+from app.metrics import metrics
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class BatchedInference(threading.Thread):
+    # Collects single-frame requests from any number of threads (detection stages of several
+    # sources, tiles or motion regions of one frame) into micro-batches for one forward pass.
+    # A batch is closed when it reaches max_batch or max_wait_ms after its first request.
+    # Calling the service like a model blocks on the result, so once started it can replace `model` anywhere.
+    def __init__(self, backend, max_batch=cfg.get("detection.batching.max_batch", 4),
+                 max_wait_ms=cfg.get("detection.batching.max_wait_ms", 5),
+                 timeout=cfg.get("detection.batching.timeout", 10)):
+        super().__init__(name="batched-inference", daemon=True)
+        self.backend = backend
+        self.names = backend.names
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        # Guards the check-and-put in submit() against run() closing the queue after its loop.
+        self.lock = threading.Lock()
+        self.closed = False
+        self.batches = 0
+        self.frames = 0
+
+    def submit(self, frame):
+        future = Future()
+        with self.lock:
+            if self.closed or self.stop_event.is_set():
+                future.set_exception(RuntimeError("Batched inference service is stopped"))
+                return future
+            self.requests.put((frame, future))
+        return future
+
+    def __call__(self, frame):
+        future = self.submit(frame)
+        try:
+            return InferenceResults(future.result(self.timeout), self.names)
+        except TimeoutError:
+            # A cancelled request is skipped if it is still queued.
+            future.cancel()
+            raise RuntimeError(f"Batched inference timed out after {self.timeout}s")
+
+    def collect(self):
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while not self.stop_event.is_set() or not self.requests.empty():
+            batch = self.collect()
+            if not batch:
+                continue
+            batch = [(frame, future) for frame, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with metrics.timer("batch_inference"):
+                    preds = self.backend.infer_batch([frame for frame, _ in batch])
+                if len(preds) != len(batch):
+                    raise RuntimeError(f"Backend returned {len(preds)} results for {len(batch)} frames")
+            except Exception as e:
+                logger.error(f"Batched inference of {len(batch)} frames failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), pred in zip(batch, preds):
+                future.set_result(pred)
+            self.batches += 1
+            self.frames += len(batch)
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                _, future = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Batched inference service is stopped"))
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        self.join(timeout)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "pending": self.requests.qsize(),
+        }
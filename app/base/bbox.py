@@ -1,13 +1,31 @@
 class BBox:
+    __slots__ = ("xmin", "ymin", "width", "height")
+
     def __init__(self, xmin, ymin, width, height):
         self.xmin = xmin
         self.ymin = ymin
         self.width = width
         self.height = height
 
+    def __eq__(self, other):
+        if not isinstance(other, BBox):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        # Keeps boxes usable as dict keys and set members; equal boxes hash alike, so a box
+        # must not be mutated while it is one.
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        return f"BBox{self.to_tuple()}"
+
     def to_tuple(self):
         return (self.xmin, self.ymin, self.width, self.height)
 
+    def to_xyxy(self):
+        return (self.xmin, self.ymin, self.xmin + self.width, self.ymin + self.height)
+
     @staticmethod
     def from_detection(detection):
         xmin = int(detection['xmin'])
@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+
+
+class MotionBoxTracker:
+    # Pure motion prediction: extrapolates the last detected box with a constant per-frame velocity.
+    needs_gray = False
+
+    def __init__(self):
+        self.box = None
+        self.velocity = np.zeros(2)
+        self.frames_since_correction = 0
+
+    def init(self, frame, bbox):
+        self.box = np.array(bbox, dtype=np.float64)
+        self.velocity = np.zeros(2)
+        self.frames_since_correction = 0
+
+    def update(self, frame):
+        self.box[:2] += self.velocity
+        self.frames_since_correction += 1
+        return True, tuple(self.box)
+
+    def correct(self, frame, bbox):
+        box = np.array(bbox, dtype=np.float64)
+        if self.frames_since_correction:
+            self.velocity = (box[:2] - (self.box[:2] - self.velocity * self.frames_since_correction)) / self.frames_since_correction
+        self.box = box
+        self.frames_since_correction = 0
+
+
+class FlowBoxTracker:
+    # Propagates the box by the median Lucas-Kanade displacement of corner features inside it.
+    needs_gray = True
+    max_corners = 30
+    lk_params = dict(winSize=(15, 15), maxLevel=2,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+    def __init__(self):
+        self.box = None
+        self.prev_gray = None
+        self.points = None
+
+    def init(self, frame, bbox):
+        self.box = np.array(bbox, dtype=np.float64)
+        self.prev_gray = frame
+        self.points = self.find_points(frame)
+
+    def find_points(self, gray):
+        x, y, w, h = [int(v) for v in self.box]
+        mask = np.zeros(gray.shape[:2], dtype=np.uint8)
+        mask[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)] = 255
+        return cv2.goodFeaturesToTrack(gray, self.max_corners, 0.01, 3, mask=mask)
+
+    def update(self, frame):
+        if self.points is None or len(self.points) == 0:
+            self.points = self.find_points(frame)
+            self.prev_gray = frame
+            return False, tuple(self.box)
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, frame, self.points, None, **self.lk_params)
+        good = status.reshape(-1) == 1
+        self.prev_gray = frame
+        if good.sum() < 3:
+            self.points = self.find_points(frame)
+            return False, tuple(self.box)
+
+        shift = np.median(next_points[good] - self.points[good], axis=0).reshape(-1)
+        self.box[:2] += shift
+        self.points = next_points[good].reshape(-1, 1, 2)
+        return True, tuple(self.box)
+
+    def correct(self, frame, bbox):
+        self.box = np.array(bbox, dtype=np.float64)
+        self.prev_gray = frame
+        self.points = self.find_points(frame)
+
+
+def create_box_tracker(kind):
+    if kind == "csrt":
+        return cv2.TrackerCSRT_create()
+    if kind == "kcf":
+        return cv2.TrackerKCF_create()
+    if kind == "mosse":
+        if not hasattr(cv2, "legacy"):
+            raise RuntimeError("MOSSE tracker requires opencv-contrib-python")
+        return cv2.legacy.TrackerMOSSE_create()
+    if kind == "flow":
+        return FlowBoxTracker()
+    if kind == "motion":
+        return MotionBoxTracker()
+    raise ValueError(f"Unknown tracker kind '{kind}'")
+
+
+def needs_gray(kind):
+    return kind == "flow"
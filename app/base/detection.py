@@ -1,8 +1,10 @@
+from .batching import BatchedInference
 from .bbox import BBox
 from .category import Category
-import torch
+from .geometry import bboxes_to_array, nms
+from .postprocess import detections_from_array
 import os
-import yolov5
+from app.metrics import metrics
 from app.logger import get_logger
 logger = get_logger(__name__)
 from app.config.config import Config
@@ -10,6 +12,9 @@ cfg = Config()
 
 
 def load_model(model_path=cfg.get("detection.model_path")):
+    # torch and yolov5 take seconds to import, so only the torch backend pays for them.
+    import torch
+    import yolov5
     model = None
     try:
         if os.path.isfile(model_path):
@@ -28,29 +33,68 @@ def load_model(model_path=cfg.get("detection.model_path")):
 
 def detect_objects(model, frame, target_classes):
     try:
-        results = model(frame)
-        detections_df = results.pandas().xyxy[0]
-        filtered_detections = detections_df[detections_df['name'].isin(target_classes)]
-
-        detections = [
-            Detection.from_row(row) for _, row in filtered_detections.iterrows()
-        ]
+        with metrics.timer("model"):
+            results = model(frame)
+        with metrics.timer("postprocess"):
+            detections = detections_from_array(results.xyxy[0], results.names, target_classes)
         logger.info(f"Detected {len(detections)} objects matching target classes.")
         return detections
     except Exception as e:
         logger.error(f"Error detecting objects: {e}")
         return []
     
+def detect_batch(model, frames, target_classes):
+    # A batching service gets all frames at once so they can share forward passes.
+    if not isinstance(model, BatchedInference):
+        return [detect_objects(model, frame, target_classes) for frame in frames]
+    futures = [model.submit(frame) for frame in frames]
+    results = []
+    for future in futures:
+        try:
+            with metrics.timer("postprocess"):
+                results.append(detections_from_array(future.result(), model.names, target_classes))
+        except Exception as e:
+            logger.error(f"Error detecting objects: {e}")
+            results.append([])
+    return results
+
+def detect_in_regions(model, frame, target_classes, regions):
+    detections = []
+    crops = [frame[y:y + h, x:x + w] for x, y, w, h in regions]
+    for (x, y, _, _), region_detections in zip(regions, detect_batch(model, crops, target_classes)):
+        for detection in region_detections:
+            detection.bbox.xmin += x
+            detection.bbox.ymin += y
+            detections.append(detection)
+    return detections
+
+def tile_regions(frame_shape, tile_size, overlap=0.2):
+    # Overlapping tiles covering the frame; the last row/column is shifted back to stay inside it.
+    height, width = frame_shape[:2]
+    step = max(1, int(tile_size * (1 - overlap)))
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        return positions + [length - tile_size]
+    return [(x, y, min(tile_size, width), min(tile_size, height)) for y in starts(height) for x in starts(width)]
+
+def detect_tiled(model, frame, target_classes, tile_size=cfg.get("detection.tiling.tile_size", 640),
+                 overlap=cfg.get("detection.tiling.overlap", 0.2)):
+    # Small or distant animals survive better at native resolution than in one downscaled pass.
+    return detect_in_regions(model, frame, target_classes, tile_regions(frame.shape, tile_size, overlap))
+
 def filter_duplicate_detections(detections, iou_threshold=cfg.get("detection.iou_threshold")):
-    unique_detections = []
-    for i, detection in enumerate(detections):
-        is_duplicate = any(detection.bbox.compute_iou(other.bbox) > iou_threshold for other in unique_detections)
-        if not is_duplicate:
-            unique_detections.append(detection)
-    return unique_detections
+    if len(detections) < 2:
+        return list(detections)
+    boxes = bboxes_to_array([detection.bbox for detection in detections])
+    keep = nms(boxes, iou_threshold)
+    return [detections[i] for i in keep]
 
 
 class Detection:
+    __slots__ = ("bbox", "category", "confidence")
+
     def __init__(self, bbox, category, confidence):
         self.bbox = bbox
         self.category = category
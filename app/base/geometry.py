@@ -0,0 +1,136 @@
+import numpy as np
+
+
+def bboxes_to_array(bboxes):
+    # BBox (xmin, ymin, width, height) -> (N, 4) float array of (x1, y1, x2, y2)
+    boxes = np.empty((len(bboxes), 4), dtype=np.float64)
+    for i, bbox in enumerate(bboxes):
+        boxes[i] = bbox.to_xyxy()
+    return boxes
+
+
+def iou_matrix(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+
+    iou = np.zeros_like(inter)
+    np.divide(inter, union, out=iou, where=union > 0)
+    return iou
+
+
+def overlaps_regions(boxes, regions):
+    # Which (x1, y1, x2, y2) boxes intersect any of the (x, y, w, h) regions.
+    regions = np.array([(x, y, x + w, y + h) for x, y, w, h in regions], dtype=np.float64).reshape(-1, 4)
+    return (iou_matrix(boxes, regions) > 0).any(axis=1)
+
+
+def nms(boxes, iou_threshold, scores=None, classes=None):
+    # Greedy NMS. Without scores the input order is the priority order, matching
+    # filter_duplicate_detections. With classes, only boxes of the same class suppress each other.
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    order = np.arange(len(boxes)) if scores is None else np.argsort(-np.asarray(scores), kind="stable")
+    iou = iou_matrix(boxes[order], boxes[order])
+    overlapping = iou > iou_threshold
+    if classes is not None:
+        classes = np.asarray(classes)[order]
+        overlapping &= classes[:, None] == classes[None, :]
+
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        keep.append(order[i])
+        suppressed[i + 1:] |= overlapping[i, i + 1:]
+    return np.array(keep, dtype=np.intp)
+
+
+def greedy_match(iou, iou_threshold):
+    # Rows (detections) are matched in order to their best remaining column (tracker),
+    # matching OpenCVTracker.match_detections_to_trackers.
+    iou = np.array(iou, dtype=np.float64, copy=True).reshape(iou.shape[0], -1)
+    iou[iou < iou_threshold] = 0
+    matched = []
+    unmatched_rows = []
+    for row in range(iou.shape[0]):
+        col = int(np.argmax(iou[row])) if iou.shape[1] else -1
+        if col >= 0 and iou[row, col] > 0:
+            matched.append((row, col))
+            iou[:, col] = 0
+        else:
+            unmatched_rows.append(row)
+    matched_cols = {col for _, col in matched}
+    unmatched_cols = [col for col in range(iou.shape[1]) if col not in matched_cols]
+    return matched, unmatched_rows, unmatched_cols
+
+
+def linear_assignment(cost):
+    # Minimum-cost assignment for a rectangular cost matrix; returns (rows, cols).
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    try:
+        from scipy.optimize import linear_sum_assignment
+        return linear_sum_assignment(cost)
+    except ImportError:
+        pass
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, cols = _hungarian(cost)
+    if transposed:
+        rows, cols = cols, rows
+        order = np.argsort(rows)
+        rows, cols = rows[order], cols[order]
+    return rows, cols
+
+
+def _hungarian(cost):
+    # Shortest augmenting path Hungarian algorithm, O(n^2 m) for n <= m.
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)
+    way = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            improve = free & (reduced < minv[1:])
+            minv[1:][improve] = reduced[improve]
+            way[1:][improve] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
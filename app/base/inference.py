@@ -0,0 +1,217 @@
+import ast
+import os
+import time
+import cv2
+import numpy as np
+from .geometry import nms
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+COCO_NAMES = [
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat", "traffic light",
+    "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep", "cow",
+    "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee",
+    "skis", "snowboard", "sports ball", "kite", "baseball bat", "baseball glove", "skateboard", "surfboard",
+    "tennis racket", "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors", "teddy bear",
+    "hair drier", "toothbrush",
+]
+
+
+class InferenceResults:
+    # Same shape as the parts of yolov5's Detections used by detect_objects.
+    __slots__ = ("xyxy", "names")
+
+    def __init__(self, pred, names):
+        self.xyxy = [pred]
+        self.names = names
+
+
+def letterbox(frame, size, color=114):
+    height, width = frame.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+    if (new_width, new_height) != (width, height):
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color, color, color))
+    return frame, ratio, (left, top)
+
+
+def decode_yolov5_output(raw, ratio, pad, frame_shape, conf_threshold, iou_threshold):
+    # raw: (N, 5 + classes) rows of cx, cy, w, h, objectness, class scores in letterboxed pixels.
+    raw = np.asarray(raw, dtype=np.float32).reshape(-1, raw.shape[-1])
+    raw = raw[raw[:, 4] > conf_threshold]
+    if not len(raw):
+        return np.empty((0, 6), dtype=np.float32)
+
+    class_ids = raw[:, 5:].argmax(axis=1)
+    scores = raw[:, 4] * raw[np.arange(len(raw)), 5 + class_ids]
+    keep = scores > conf_threshold
+    raw, class_ids, scores = raw[keep], class_ids[keep], scores[keep]
+
+    boxes = np.empty((len(raw), 4), dtype=np.float32)
+    boxes[:, 0] = (raw[:, 0] - raw[:, 2] / 2 - pad[0]) / ratio
+    boxes[:, 1] = (raw[:, 1] - raw[:, 3] / 2 - pad[1]) / ratio
+    boxes[:, 2] = (raw[:, 0] + raw[:, 2] / 2 - pad[0]) / ratio
+    boxes[:, 3] = (raw[:, 1] + raw[:, 3] / 2 - pad[1]) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+
+    keep = nms(boxes, iou_threshold, scores=scores, classes=class_ids)
+    return np.column_stack([boxes[keep], scores[keep], class_ids[keep]]).astype(np.float32)
+
+
+def model_variant_path(model_path, precision):
+    # ./static/models/yolov5n.onnx + int8 -> ./static/models/yolov5n-int8.onnx
+    if precision in (None, "fp32"):
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}-{precision}{ext}"
+
+
+class InferenceBackend:
+    name = "base"
+
+    def __init__(self, input_size=cfg.get("detection.input_size", 640), threads=cfg.get("detection.threads"),
+                 precision=cfg.get("detection.precision", "fp32"),
+                 conf_threshold=cfg.get("detection.conf_threshold", 0.25),
+                 nms_iou_threshold=cfg.get("detection.nms_iou_threshold", 0.45)):
+        self.input_size = input_size
+        self.threads = threads
+        self.precision = precision
+        self.conf_threshold = conf_threshold
+        self.nms_iou_threshold = nms_iou_threshold
+        self.names = COCO_NAMES
+
+    def infer(self, frame):
+        raise NotImplementedError
+
+    def infer_batch(self, frames):
+        return [self.infer(frame) for frame in frames]
+
+    def __call__(self, frame):
+        return InferenceResults(self.infer(frame), self.names)
+
+    def warmup(self, runs=cfg.get("detection.warmup_runs", 2), frame_shape=None):
+        if not runs:
+            return
+        width, height = cfg.get("camera.resolution", [self.input_size, self.input_size])
+        frame = np.zeros(frame_shape or (height, width, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.infer(frame)
+        logger.info(f"{self.name} backend warmed up with {runs} runs in {time.perf_counter() - start:.2f}s.")
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model_path=cfg.get("detection.model_path"), **kwargs):
+        super().__init__(**kwargs)
+        import torch
+        from .detection import load_model
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.precision != "fp32":
+            logger.warning(f"Torch backend runs fp32 on CPU; ignoring precision '{self.precision}'.")
+        self.model = load_model(model_path)
+        self.model.conf = self.conf_threshold
+        self.model.iou = self.nms_iou_threshold
+        self.names = self.model.names
+
+    def infer(self, frame):
+        results = self.model(frame, size=self.input_size)
+        return results.xyxy[0].detach().cpu().numpy()
+
+    def infer_batch(self, frames):
+        results = self.model(list(frames), size=self.input_size)
+        return [pred.detach().cpu().numpy() for pred in results.xyxy]
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model_path=cfg.get("detection.onnx_path"), **kwargs):
+        super().__init__(**kwargs)
+        import onnxruntime as ort
+        path = model_variant_path(model_path, self.precision)
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if "float16" in model_input.type else np.float32
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if names:
+            self.names = ast.literal_eval(names)
+        logger.info(f"ONNX Runtime model loaded from {path}")
+
+    def preprocess(self, frame):
+        image, ratio, pad = letterbox(frame, self.input_size)
+        blob = image.transpose(2, 0, 1).astype(self.input_dtype) / self.input_dtype(255)
+        return blob, ratio, pad
+
+    def infer_batch(self, frames):
+        if not self.dynamic_batch:
+            return super().infer_batch(frames)
+        prepared = [self.preprocess(frame) for frame in frames]
+        raw = self.session.run(None, {self.input_name: np.stack([blob for blob, _, _ in prepared])})[0]
+        return [decode_yolov5_output(raw[i], ratio, pad, frame.shape, self.conf_threshold, self.nms_iou_threshold)
+                for i, (frame, (_, ratio, pad)) in enumerate(zip(frames, prepared))]
+
+    def infer(self, frame):
+        blob, ratio, pad = self.preprocess(frame)
+        raw = self.session.run(None, {self.input_name: blob[None]})[0]
+        return decode_yolov5_output(raw[0], ratio, pad, frame.shape, self.conf_threshold, self.nms_iou_threshold)
+
+
+class OpenCVDnnBackend(InferenceBackend):
+    name = "opencv"
+
+    def __init__(self, model_path=cfg.get("detection.onnx_path"), **kwargs):
+        super().__init__(**kwargs)
+        path = model_variant_path(model_path, self.precision)
+        if self.threads:
+            cv2.setNumThreads(self.threads)
+        self.net = cv2.dnn.readNet(path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        if self.precision == "fp16" and hasattr(cv2.dnn, "DNN_TARGET_CPU_FP16"):
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU_FP16)
+        else:
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        logger.info(f"OpenCV DNN model loaded from {path}")
+
+    def infer(self, frame):
+        image, ratio, pad = letterbox(frame, self.input_size)
+        self.net.setInput(cv2.dnn.blobFromImage(image, 1 / 255.0, (self.input_size, self.input_size)))
+        raw = self.net.forward()
+        return decode_yolov5_output(raw[0], ratio, pad, frame.shape, self.conf_threshold, self.nms_iou_threshold)
+
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "onnx": OnnxRuntimeBackend,
+    "opencv": OpenCVDnnBackend,
+}
+
+
+def load_backend(name=cfg.get("detection.backend", "torch"), warmup_runs=cfg.get("detection.warmup_runs", 2), **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'")
+    try:
+        backend = BACKENDS[name](**kwargs)
+    except Exception as e:
+        logger.error(f"Error loading {name} inference backend: {e}")
+        raise RuntimeError(f"Inference backend '{name}' could not be loaded: {e}")
+    backend.warmup(warmup_runs)
+    return backend
@@ -0,0 +1,110 @@
+import cv2
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+def merge_rects(rects):
+    # Repeatedly union overlapping (x, y, w, h) rectangles until none overlap.
+    rects = [list(rect) for rect in rects]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                ax, ay, aw, ah = rects[i]
+                bx, by, bw, bh = rects[j]
+                if ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah:
+                    x1, y1 = min(ax, bx), min(ay, by)
+                    x2, y2 = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+                    rects[i] = [x1, y1, x2 - x1, y2 - y1]
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(rect) for rect in rects]
+
+
+class MotionGate:
+    # Background subtraction on a small grayscale frame. regions() returns [] when nothing moves,
+    # None when the whole frame should be inferred, or full-frame (x, y, w, h) motion ROIs.
+    def __init__(self, width=cfg.get("detection.motion_gate.width", 320),
+                 min_area=cfg.get("detection.motion_gate.min_area", 0.002),
+                 padding=cfg.get("detection.motion_gate.padding", 48),
+                 roi_inference=cfg.get("detection.motion_gate.roi_inference", False),
+                 max_roi_fraction=cfg.get("detection.motion_gate.max_roi_fraction", 0.5),
+                 min_roi_size=cfg.get("detection.motion_gate.min_roi_size", 160),
+                 history=cfg.get("detection.motion_gate.history", 500),
+                 var_threshold=cfg.get("detection.motion_gate.var_threshold", 16)):
+        self.width = width
+        self.min_area = min_area
+        self.padding = padding
+        self.roi_inference = roi_inference
+        self.max_roi_fraction = max_roi_fraction
+        self.min_roi_size = min_roi_size
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold,
+                                                             detectShadows=False)
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self.frames = 0
+        self.skipped = 0
+        self.roi_inferences = 0
+        self.full_inferences = 0
+
+    def motion_rects(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.width / width
+        small = cv2.resize(frame, (self.width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+        mask = self.subtractor.apply(small)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.dilate(mask, self.kernel, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_area = self.min_area * small.shape[0] * small.shape[1]
+        rects = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            rects.append(self.to_frame_rect((x / scale, y / scale, w / scale, h / scale), width, height))
+        return merge_rects(rects)
+
+    def to_frame_rect(self, rect, frame_width, frame_height):
+        x, y, w, h = rect
+        cx, cy = x + w / 2, y + h / 2
+        w = max(w + 2 * self.padding, self.min_roi_size)
+        h = max(h + 2 * self.padding, self.min_roi_size)
+        x1, y1 = max(0, int(cx - w / 2)), max(0, int(cy - h / 2))
+        x2, y2 = min(frame_width, int(cx + w / 2)), min(frame_height, int(cy + h / 2))
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    def regions(self, frame):
+        first = self.frames == 0
+        self.frames += 1
+        rects = self.motion_rects(frame)
+        if first:
+            self.full_inferences += 1
+            return None
+        if not rects:
+            self.skipped += 1
+            return []
+
+        frame_area = frame.shape[0] * frame.shape[1]
+        roi_area = sum(w * h for _, _, w, h in rects)
+        if not self.roi_inference or roi_area > self.max_roi_fraction * frame_area:
+            self.full_inferences += 1
+            return None
+        self.roi_inferences += 1
+        return rects
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferences_skipped": self.skipped,
+            "roi_inferences": self.roi_inferences,
+            "full_inferences": self.full_inferences,
+        }
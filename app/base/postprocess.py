@@ -0,0 +1,53 @@
+from functools import lru_cache
+import numpy as np
+from .bbox import BBox
+from .category import Category
+
+
+@lru_cache(maxsize=8)
+def class_lookup(names, target_classes):
+    # names: tuple of class names indexed by model class id.
+    # Returns a per-class-id keep mask and the shared Category instances.
+    keep = np.array([name in target_classes for name in names], dtype=bool)
+    categories = tuple(Category(name) for name in names)
+    return keep, categories
+
+
+def names_tuple(names):
+    if isinstance(names, dict):
+        return tuple(names.get(i, "") for i in range(max(names) + 1)) if names else ()
+    return tuple(names)
+
+
+def to_numpy(pred):
+    if hasattr(pred, "detach"):
+        pred = pred.detach().cpu().numpy()
+    return np.asarray(pred)
+
+
+def detections_from_array(pred, names, target_classes):
+    # pred: (N, 6) array of x1, y1, x2, y2, confidence, class id in frame coordinates.
+    from .detection import Detection
+    pred = to_numpy(pred).reshape(-1, 6)
+    keep, categories = class_lookup(names_tuple(names), tuple(target_classes))
+    class_ids = pred[:, 5].astype(np.intp)
+    valid = (class_ids >= 0) & (class_ids < len(keep))
+    valid[valid] = keep[class_ids[valid]]
+    pred = pred[valid]
+    if not len(pred):
+        return []
+
+    xyxy = pred[:, :4].astype(np.int64)
+    class_ids = class_ids[valid].tolist()
+    return [
+        Detection(BBox(x1, y1, x2 - x1, y2 - y1), categories[class_id], confidence)
+        for (x1, y1, x2, y2), confidence, class_id in zip(xyxy.tolist(), pred[:, 4].tolist(), class_ids)
+    ]
+
+
+def detections_from_pandas(results, target_classes):
+    # Previous post-processing path, kept for comparison in benchmarks.
+    from .detection import Detection
+    detections_df = results.pandas().xyxy[0]
+    filtered_detections = detections_df[detections_df['name'].isin(target_classes)]
+    return [Detection.from_row(row) for _, row in filtered_detections.iterrows()]
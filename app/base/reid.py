@@ -0,0 +1,200 @@
+import os
+import threading
+import cv2
+import numpy as np
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+def l2_normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class HistogramEmbedder:
+    # Colour layout (hue/saturation of the upper and lower half) plus a gradient orientation
+    # histogram for texture. Each block is square-rooted (Hellinger) so that cosine similarity
+    # of the concatenation behaves like a histogram distance.
+    def __init__(self, hue_bins=16, sat_bins=4, orientation_bins=16, size=(64, 128)):
+        self.hue_bins = hue_bins
+        self.sat_bins = sat_bins
+        self.orientation_bins = orientation_bins
+        self.size = size
+        self.dim = 2 * hue_bins * sat_bins + orientation_bins
+
+    def color_block(self, hsv):
+        hist = cv2.calcHist([hsv], [0, 1], None, [self.hue_bins, self.sat_bins], [0, 180, 0, 256]).ravel()
+        return l2_normalize(np.sqrt(hist))
+
+    def texture_block(self, gray):
+        gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0)
+        gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1)
+        magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+        bins = (angle.ravel() % 180 * self.orientation_bins / 180).astype(np.int64) % self.orientation_bins
+        hist = np.bincount(bins, weights=magnitude.ravel(), minlength=self.orientation_bins)
+        return l2_normalize(np.sqrt(hist))
+
+    def embed(self, crop):
+        image = cv2.resize(crop, self.size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        half = hsv.shape[0] // 2
+        blocks = [self.color_block(hsv[:half]), self.color_block(hsv[half:]), self.texture_block(gray)]
+        return l2_normalize(np.concatenate(blocks)).astype(np.float32)
+
+
+class OnnxEmbedder:
+    # Any re-ID network exported to ONNX that maps an NCHW RGB crop to a feature vector.
+    MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    def __init__(self, path=cfg.get("reid.onnx_path", "static/models/reid.onnx"), size=(128, 256),
+                 threads=cfg.get("detection.threads", 0)):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.size = size
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def embed(self, crop):
+        image = cv2.resize(crop, self.size, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+        blob = ((image - self.MEAN) / self.STD).transpose(2, 0, 1)[None]
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return l2_normalize(output.ravel()).astype(np.float32)
+
+
+EMBEDDERS = {"histogram": HistogramEmbedder, "onnx": OnnxEmbedder}
+
+
+class VectorIndex:
+    # Append-only matrix of unit vectors with one integer label per row. With a path the
+    # arrays are .npy files opened as memory maps, so restarts don't reload anything and the
+    # OS page cache holds the hot part. Search is one matrix-vector product (cosine similarity).
+    def __init__(self, dim, path=None, capacity=1024):
+        self.dim = dim
+        self.path = path
+        self.count = 0
+        if path is not None and os.path.exists(self.vectors_file):
+            self.vectors = np.load(self.vectors_file, mmap_mode="r+")
+            self.labels = np.load(self.labels_file, mmap_mode="r+")
+            if self.vectors.shape[1] != dim:
+                raise ValueError(f"Index {path} stores {self.vectors.shape[1]}-d vectors, embedder produces {dim}-d")
+            self.count = int(np.count_nonzero(self.labels >= 0))
+        else:
+            self.vectors, self.labels = self.allocate(capacity)
+
+    @property
+    def vectors_file(self):
+        return f"{self.path}.vectors.npy"
+
+    @property
+    def labels_file(self):
+        return f"{self.path}.labels.npy"
+
+    def allocate(self, capacity):
+        if self.path is None:
+            return np.zeros((capacity, self.dim), dtype=np.float32), np.full(capacity, -1, dtype=np.int64)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_vectors, tmp_labels = f"{self.vectors_file}.tmp", f"{self.labels_file}.tmp"
+        vectors = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        labels = np.lib.format.open_memmap(tmp_labels, mode="w+", dtype=np.int64, shape=(capacity,))
+        labels[:] = -1
+        if self.count:
+            vectors[:self.count] = self.vectors[:self.count]
+            labels[:self.count] = self.labels[:self.count]
+        vectors.flush()
+        labels.flush()
+        os.replace(tmp_vectors, self.vectors_file)
+        os.replace(tmp_labels, self.labels_file)
+        return vectors, labels
+
+    def add(self, vector, label):
+        if self.count == len(self.labels):
+            self.vectors, self.labels = self.allocate(2 * len(self.labels))
+        self.vectors[self.count] = vector
+        self.labels[self.count] = label
+        self.count += 1
+
+    def search(self, vector, k=1):
+        if self.count == 0:
+            return []
+        scores = self.vectors[:self.count] @ vector
+        if k == 1:
+            best = np.array([int(np.argmax(scores))])
+        else:
+            k = min(k, self.count)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+        return [(int(self.labels[i]), float(scores[i])) for i in best]
+
+    def flush(self):
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+            self.labels.flush()
+
+    def __len__(self):
+        return self.count
+
+
+class ReIdentifier:
+    # One index per category; labels are entity ids from the archive database.
+    def __init__(self, embedder, index_dir=None, threshold=cfg.get("reid.threshold", 0.92)):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self.threshold = threshold
+        self.indexes = {}
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.matches = 0
+        self.enrolled = 0
+
+    def index(self, category):
+        index = self.indexes.get(category)
+        if index is None:
+            path = os.path.join(self.index_dir, category) if self.index_dir else None
+            index = self.indexes[category] = VectorIndex(self.embedder.dim, path)
+            logger.info(f"Re-ID index for {category} opened with {len(index)} embeddings.")
+        return index
+
+    def embed(self, crop):
+        return self.embedder.embed(crop)
+
+    def identify(self, category, embedding):
+        with self.lock:
+            self.queries += 1
+            hits = self.index(category).search(embedding)
+            if hits and hits[0][1] >= self.threshold:
+                self.matches += 1
+                return hits[0][0]
+        return None
+
+    def enroll(self, category, embedding, entity_id):
+        with self.lock:
+            self.index(category).add(embedding, entity_id)
+            self.enrolled += 1
+
+    def flush(self):
+        with self.lock:
+            for index in self.indexes.values():
+                index.flush()
+
+    def stats(self):
+        return {
+            "embeddings": {category: len(index) for category, index in self.indexes.items()},
+            "queries": self.queries,
+            "matches": self.matches,
+            "enrolled": self.enrolled,
+        }
+
+
+def load_reidentifier(embedder=cfg.get("reid.embedder", "histogram"), index_dir=cfg.get("reid.index_dir"), **kwargs):
+    if embedder not in EMBEDDERS:
+        raise ValueError(f"Unknown re-ID embedder '{embedder}', expected one of {list(EMBEDDERS)}")
+    if index_dir is None:
+        from app.database import DB_FILE
+        index_dir = os.path.join(os.path.dirname(DB_FILE), "reid")
+    return ReIdentifier(EMBEDDERS[embedder](), index_dir, **kwargs)
@@ -0,0 +1,186 @@
+import time
+import numpy as np
+from .bbox import BBox
+from .geometry import bboxes_to_array, iou_matrix, linear_assignment, overlaps_regions
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class KalmanBoxTracker:
+    # Constant-velocity Kalman filter over (cx, cy, area, aspect) as in SORT.
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1
+    H = np.eye(4, 7)
+    Q = np.diag([1, 1, 1, 1, 0.01, 0.01, 0.0001])
+    R = np.diag([1, 1, 10, 10])
+
+    def __init__(self, obj_id, bbox, category, confidence=1.0):
+        self.obj_id = obj_id
+        self.category = category
+        self.confidence = confidence
+        self.bbox = bbox
+        self.last_seen = time.monotonic()
+        self.hits = 1
+        self.misses = 0
+        self.x = np.zeros(7)
+        self.x[:4] = self.to_measurement(bbox)
+        self.P = np.diag([10, 10, 10, 10, 10000, 10000, 10000]).astype(np.float64)
+
+    @staticmethod
+    def to_measurement(bbox):
+        xmin, ymin, width, height = bbox.to_tuple()
+        return np.array([xmin + width / 2, ymin + height / 2, width * height, width / max(height, 1e-6)])
+
+    def state_to_bbox(self):
+        cx, cy, area, aspect = self.x[:4]
+        width = np.sqrt(max(area * aspect, 0.0))
+        height = area / width if width > 0 else 0.0
+        return BBox(int(cx - width / 2), int(cy - height / 2), int(width), int(height))
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.bbox = self.state_to_bbox()
+        return self.bbox
+
+    def correct(self, bbox, confidence=None):
+        if confidence is not None:
+            self.confidence = confidence
+        z = self.to_measurement(bbox)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.bbox = bbox
+        self.last_seen = time.monotonic()
+        self.hits += 1
+        self.misses = 0
+
+    def is_active(self, max_time_gap):
+        return time.monotonic() - self.last_seen <= max_time_gap
+
+
+class SortTracker:
+    # Drop-in alternative to OpenCVTracker: Kalman prediction between detections and
+    # optimal IoU assignment on detection frames. Only confirmed tracks get an ID.
+    def __init__(self, min_hits=cfg.get("tracker.sort.min_hits", 2), max_misses=cfg.get("tracker.sort.max_misses", 3),
+                 iou_threshold=cfg.get("tracker.sort.iou_threshold", 0.3), max_time_gap=cfg.get("tracker.max_time_gap")):
+        self.trackers = {}
+        self.tentative = []
+        self.next_id = 1
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.iou_threshold = iou_threshold
+        self.max_time_gap = max_time_gap
+
+    def add_tracker(self, frame, bbox, category, confidence=1.0):
+        # Same contract as OpenCVTracker.add_tracker: an explicitly added track is live at once.
+        return self.confirm(KalmanBoxTracker(None, bbox, category, confidence))
+
+    def _add_tentative(self, bbox, category, confidence):
+        track = KalmanBoxTracker(None, bbox, category, confidence)
+        if track.hits >= self.min_hits:
+            self.confirm(track)
+        else:
+            self.tentative.append(track)
+
+    def confirm(self, track):
+        track.obj_id = self.next_id
+        self.trackers[self.next_id] = track
+        self.next_id += 1
+        logger.info(f"Track {track.obj_id} confirmed after {track.hits} hits.")
+        return track.obj_id
+
+    def update_trackers(self, frame):
+        for track in self.all_tracks():
+            track.predict()
+        for obj_id, track in list(self.trackers.items()):
+            if not track.is_active(self.max_time_gap):
+                self.remove_tracker(obj_id)
+                logger.info(f"Tracker {obj_id} inactive and removed.")
+        return self.trackers
+
+    def remove_tracker(self, obj_id):
+        if obj_id in self.trackers:
+            del self.trackers[obj_id]
+
+    def all_tracks(self):
+        return list(self.trackers.values()) + self.tentative
+
+    def _match_detections(self, detections, boxes=None):
+        # Pairs are (track, detection) over tentative tracks too, which have no obj_id yet. `boxes`
+        # replaces the tracks' current boxes, in all_tracks() order, as what detections are matched against.
+        tracks = self.all_tracks()
+        if not detections or not tracks:
+            return [], list(detections), tracks
+
+        iou = iou_matrix(
+            bboxes_to_array([detection.bbox for detection in detections]),
+            bboxes_to_array([track.bbox for track in tracks] if boxes is None else boxes),
+        )
+        categories_match = np.array([[detection.category == track.category for track in tracks] for detection in detections])
+        iou[~categories_match] = 0
+        rows, cols = linear_assignment(-iou)
+
+        matched = []
+        matched_rows = set()
+        matched_cols = set()
+        for row, col in zip(rows, cols):
+            if iou[row, col] >= self.iou_threshold:
+                matched.append((tracks[col], detections[row]))
+                matched_rows.add(row)
+                matched_cols.add(col)
+        unmatched_detections = [d for i, d in enumerate(detections) if i not in matched_rows]
+        unmatched_tracks = [t for i, t in enumerate(tracks) if i not in matched_cols]
+        return matched, unmatched_detections, unmatched_tracks
+
+    def update_with_detections(self, frame, detections, source_frame=None, source_tracks=None, regions=None):
+        # Every track is predicted to this frame before matching. Detections found on an earlier
+        # source_frame are matched against where the confirmed tracks were on it (source_tracks,
+        # obj_id -> (category, bbox, confidence)) and moved by each track's predicted motion since,
+        # so the innovation is measured at the detection's own time and lag doesn't bias the velocity.
+        # Tracks confirmed after source_frame can't be missed by it.
+        self.update_trackers(frame)
+        source = {}
+        if source_frame is not None and source_tracks is not None:
+            for track in self.all_tracks():
+                entry = source_tracks.get(track.obj_id) if track.obj_id is not None else None
+                source[track] = entry[1] if entry is not None else track.bbox
+        boxes = [source[track] for track in self.all_tracks()] if source else None
+        matched, unmatched_detections, unmatched_tracks = self._match_detections(detections, boxes)
+
+        for track, detection in matched:
+            bbox = detection.bbox
+            if track in source:
+                dx, dy = track.bbox.xmin - source[track].xmin, track.bbox.ymin - source[track].ymin
+                bbox = BBox(bbox.xmin + dx, bbox.ymin + dy, bbox.width, bbox.height)
+            track.correct(bbox, detection.confidence)
+            if track.obj_id is None and track.hits >= self.min_hits:
+                self.tentative.remove(track)
+                self.confirm(track)
+
+        if source:
+            unmatched_tracks = [track for track in unmatched_tracks
+                                if track.obj_id is None or track.obj_id in source_tracks]
+        if regions is not None and unmatched_tracks:
+            # Inference only looked inside `regions`; tracks outside all of them weren't missed.
+            boxes = [source.get(track, track.bbox) for track in unmatched_tracks]
+            covered = overlaps_regions(bboxes_to_array(boxes), regions)
+            unmatched_tracks = [track for track, inside in zip(unmatched_tracks, covered) if inside]
+        for track in unmatched_tracks:
+            track.misses += 1
+            if track.obj_id is None:
+                self.tentative.remove(track)
+            elif track.misses > self.max_misses:
+                self.remove_tracker(track.obj_id)
+                logger.info(f"Tracker {track.obj_id} removed after {track.misses} missed detections.")
+
+        for detection in unmatched_detections:
+            self._add_tentative(detection.bbox, detection.category, detection.confidence)
+
+        return self.trackers
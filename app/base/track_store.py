@@ -0,0 +1,209 @@
+import time
+from collections.abc import Mapping
+import numpy as np
+from .bbox import BBox
+
+
+class TrackView:
+    # Attribute access to one row of a TrackStore, in place of the old per-object Tracker.
+    # A view is created once per track and follows its row when the store compacts.
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def obj_id(self):
+        return int(self.store.ids[self.row])
+
+    @property
+    def bbox(self):
+        return BBox(*(int(v) for v in self.store.boxes[self.row]))
+
+    @bbox.setter
+    def bbox(self, bbox):
+        self.store.boxes[self.row] = bbox.to_tuple()
+
+    @property
+    def category(self):
+        return self.store.category_names[self.store.categories[self.row]]
+
+    @property
+    def confidence(self):
+        return float(self.store.confidence[self.row])
+
+    @confidence.setter
+    def confidence(self, confidence):
+        self.store.confidence[self.row] = confidence
+
+    @property
+    def last_seen(self):
+        return float(self.store.last_seen[self.row])
+
+    @last_seen.setter
+    def last_seen(self, timestamp):
+        self.store.last_seen[self.row] = timestamp
+
+    @property
+    def tracker(self):
+        return self.store.box_trackers[self.row]
+
+    def is_active(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now - self.last_seen <= self.store.max_time_gap
+
+
+class TrackSnapshot(Mapping):
+    # Read-only copy of a store's live rows, taken once per frame for the stages downstream of
+    # tracking. It is a fixed handful of arrays however many tracks there are; reading it as a
+    # mapping gives obj_id -> (category, BBox, confidence), building the BBox only when read.
+    __slots__ = ("ids", "boxes", "categories", "confidence", "category_names")
+
+    def __init__(self, store):
+        size = store.size
+        self.ids = store.ids[:size].copy()
+        self.boxes = store.boxes[:size].astype(np.int32)
+        self.categories = store.categories[:size].copy()
+        self.confidence = store.confidence[:size].copy()
+        # Append-only in the store, so sharing it is safe.
+        self.category_names = store.category_names
+
+    def entry(self, row):
+        return (self.category_names[self.categories[row]], BBox(*self.boxes[row].tolist()),
+                float(self.confidence[row]))
+
+    def items(self):
+        return ((int(self.ids[row]), self.entry(row)) for row in range(len(self.ids)))
+
+    def __getitem__(self, obj_id):
+        rows = np.flatnonzero(self.ids == obj_id)
+        if not len(rows):
+            raise KeyError(obj_id)
+        return self.entry(rows[0])
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class TrackStore(Mapping):
+    # Live tracks as columns: one row per track in preallocated arrays that grow by doubling.
+    # Rows stay in insertion order, and removing tracks compacts the columns, so updating N tracks
+    # touches the arrays in place and allocates no per-track Python objects. Unused rows have
+    # last_seen = inf and updated = False, so whole-column operations need no slicing.
+    # Reading it as a mapping gives obj_id -> TrackView, as the old dict of Tracker objects did.
+    def __init__(self, max_time_gap, capacity=64):
+        self.max_time_gap = max_time_gap
+        self.size = 0
+        self.rows = {}
+        self.views = []
+        self.box_trackers = []
+        self.category_names = []
+        self.category_codes = {}
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        columns = {
+            "ids": np.zeros(capacity, np.int64),
+            "boxes": np.zeros((capacity, 4)),
+            "raw": np.zeros((capacity, 4)),
+            "corners": np.zeros((capacity, 4)),
+            "confidence": np.zeros(capacity),
+            "last_seen": np.full(capacity, np.inf),
+            "categories": np.zeros(capacity, np.int16),
+            "updated": np.zeros(capacity, bool),
+            "age": np.zeros(capacity),
+            "expired": np.zeros(capacity, bool),
+        }
+        for name, column in columns.items():
+            if self.size:
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def category_code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.category_names)
+            self.category_names.append(category)
+        return code
+
+    def add(self, obj_id, bbox, category, confidence, box_tracker, now):
+        if self.size == self.capacity:
+            self.allocate(2 * self.capacity)
+        row = self.size
+        self.ids[row] = obj_id
+        self.boxes[row] = bbox.to_tuple()
+        self.confidence[row] = confidence
+        self.last_seen[row] = now
+        self.categories[row] = self.category_code(category)
+        self.updated[row] = False
+        self.box_trackers.append(box_tracker)
+        self.views.append(TrackView(self, row))
+        self.rows[obj_id] = row
+        self.size += 1
+        return self.views[row]
+
+    def apply_updates(self, scale, now):
+        # `raw` holds the box trackers' output in prepared-frame coordinates for rows with `updated` set.
+        np.divide(self.raw, scale, out=self.raw)
+        np.rint(self.raw, out=self.raw)
+        np.copyto(self.boxes, self.raw, where=self.updated[:, None])
+        np.copyto(self.last_seen, now, where=self.updated)
+
+    def failed_ids(self):
+        if np.count_nonzero(self.updated) == self.size:
+            return []
+        return [int(self.ids[row]) for row in range(self.size) if not self.updated[row]]
+
+    def expired_ids(self, now):
+        np.subtract(now, self.last_seen, out=self.age)
+        np.greater(self.age, self.max_time_gap, out=self.expired)
+        if not self.expired.any():
+            return []
+        return [int(obj_id) for obj_id in self.ids[self.expired]]
+
+    def remove(self, obj_ids):
+        drop = {self.rows[obj_id] for obj_id in obj_ids if obj_id in self.rows}
+        if not drop:
+            return
+        keep = [row for row in range(self.size) if row not in drop]
+        size = len(keep)
+        for column in (self.ids, self.boxes, self.raw, self.confidence, self.last_seen, self.categories, self.updated):
+            column[:size] = column[keep]
+        self.last_seen[size:self.size] = np.inf
+        self.updated[size:self.size] = False
+        self.box_trackers = [self.box_trackers[row] for row in keep]
+        self.views = [self.views[row] for row in keep]
+        for row, view in enumerate(self.views):
+            view.row = row
+        self.rows = {int(self.ids[row]): row for row in range(size)}
+        self.size = size
+
+    def xyxy(self):
+        # (N, 4) corners of the live rows, written into a preallocated buffer.
+        corners = self.corners[:self.size]
+        corners[:, :2] = self.boxes[:self.size, :2]
+        np.add(self.boxes[:self.size, :2], self.boxes[:self.size, 2:], out=corners[:, 2:])
+        return corners
+
+    def snapshot(self):
+        return TrackSnapshot(self)
+
+    def __getitem__(self, obj_id):
+        return self.views[self.rows[obj_id]]
+
+    def __contains__(self, obj_id):
+        return obj_id in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"TrackStore({list(self.rows)})"
@@ -1,107 +1,178 @@
+import time
 import cv2
-import datetime
+from concurrent.futures import ThreadPoolExecutor
 from .bbox import BBox
-from .category import Category
+from .box_trackers import create_box_tracker, needs_gray
+from .geometry import bboxes_to_array, iou_matrix, greedy_match, overlaps_regions
+from .sort import SortTracker
+from .track_store import TrackStore
 from app.logger import get_logger
 logger = get_logger(__name__)
 from app.config.config import Config
 cfg = Config()
 
-class Tracker:
-    def __init__(self, obj_id, bbox, category, frame, max_time_gap=cfg.get("tracker.max_time_gap")):
-        self.obj_id: int = obj_id
-        self.bbox: BBox = bbox
-        self.category: Category = category
-        self.last_seen = datetime.datetime.now()
-        self.max_time_gap = max_time_gap
-        self.tracker = cv2.TrackerCSRT_create()
-        self.tracker.init(frame, bbox.to_tuple())
-
-    def update(self, frame):
-        success, bbox = self.tracker.update(frame)
-        if success:
-            self.bbox = BBox(*bbox)
-            self.last_seen = datetime.datetime.now()
-        return success
-
-    def is_active(self):
-        return (datetime.datetime.now() - self.last_seen).seconds <= self.max_time_gap
-
 class OpenCVTracker:
-    def __init__(self):
-        self.trackers = {}
+    # Box trackers stay OpenCV objects, one per track; everything else about a track lives in
+    # the columns of a TrackStore, which self.trackers exposes as obj_id -> TrackView.
+    def __init__(self, kind=cfg.get("tracker.kind", "csrt"), scale=cfg.get("tracker.scale", 1.0),
+                 workers=cfg.get("tracker.workers", 1), max_time_gap=cfg.get("tracker.max_time_gap")):
+        self.trackers = TrackStore(max_time_gap)
         self.next_id = 1
-
-    def add_tracker(self, frame, bbox, category):
-        tracker = Tracker(self.next_id, bbox, category, frame)
-        self.trackers[self.next_id] = tracker
+        self.kind = kind
+        self.scale = scale
+        # OpenCV releases the GIL inside tracker updates, so a thread pool runs them in parallel.
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tracker") if workers > 1 else None
+
+    def prepare_frame(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if needs_gray(self.kind) and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        return frame
+
+    def to_frame_box(self, bbox):
+        # `frame` is the (possibly downscaled) frame prepared by prepare_frame.
+        return tuple(int(round(v * self.scale)) for v in bbox.to_tuple())
+
+    def add_tracker(self, frame, bbox, category, confidence=1.0):
+        return self._add_tracker(self.prepare_frame(frame), bbox, category, confidence)
+
+    def _add_tracker(self, prepared, bbox, category, confidence=1.0):
+        box_tracker = create_box_tracker(self.kind)
+        box_tracker.init(prepared, self.to_frame_box(bbox))
+        obj_id = self.next_id
+        self.trackers.add(obj_id, bbox, category, confidence, box_tracker, time.monotonic())
         self.next_id += 1
-        return tracker.obj_id
+        return obj_id
+
+    def _update_one(self, prepared, row):
+        success, box = self.trackers.box_trackers[row].update(prepared)
+        self.trackers.updated[row] = success
+        if success:
+            self.trackers.raw[row] = box
+
+    def _update_all(self, prepared):
+        store = self.trackers
+        if self.executor is not None and len(store) > 1:
+            for _ in self.executor.map(lambda row: self._update_one(prepared, row), range(len(store))):
+                pass
+        else:
+            for row in range(len(store)):
+                self._update_one(prepared, row)
+        store.apply_updates(self.scale, time.monotonic())
 
     def update_trackers(self, frame):
-        active_trackers = {}
-        for obj_id, tracker in self.trackers.items():
-            success = tracker.update(frame)
-            if success and tracker.is_active():
-                active_trackers[obj_id] = tracker
-                # logger.info(f"Tracker {obj_id} updated: {tracker.bbox.to_tuple()}")
-            elif not success:
-                logger.warning(f"Tracker {obj_id} failed to update.")
-            elif not tracker.is_active():
-                self.remove_tracker(obj_id)
+        # Tracks not seen for max_time_gap (e.g. after the pipeline stalled) are dropped before
+        # updating; tracks whose box tracker loses the object are dropped after.
+        store = self.trackers
+        expired = store.expired_ids(time.monotonic())
+        if expired:
+            store.remove(expired)
+            for obj_id in expired:
                 logger.info(f"Tracker {obj_id} inactive and removed.")
-
-        self.trackers = {obj_id: tracker for obj_id, tracker in active_trackers.items()}
-        return active_trackers
+        self._update_all(self.prepare_frame(frame))
+        failed = store.failed_ids()
+        if failed:
+            store.remove(failed)
+            for obj_id in failed:
+                logger.warning(f"Tracker {obj_id} failed to update.")
+        return store
 
     def remove_tracker(self, obj_id):
-        if obj_id in self.trackers:
-            del self.trackers[obj_id]
-    
-    def get_all_bboxes(self, frame):
-        bboxes = {}
-        for obj_id, tracker in self.trackers.items():
-            if tracker.update(frame):
-                bboxes[obj_id] = tracker
-        return bboxes
+        self.trackers.remove((obj_id,))
 
-    def match_detections_to_trackers(self, detections, iou_threshold=cfg.get("detection.iou_threshold")):
-        matched = []
-        unmatched_detections = []
-        unmatched_trackers = list(self.trackers.keys())
-
-        for detection in detections:
-            best_match = None
-            best_iou = 0
+    def get_all_bboxes(self, frame):
+        self._update_all(self.prepare_frame(frame))
+        return {obj_id: view for obj_id, view in self.trackers.items() if self.trackers.updated[view.row]}
+
+    def match_detections_to_trackers(self, detections, iou_threshold=cfg.get("detection.iou_threshold"), corners=None):
+        # `corners` replaces the tracks' current boxes, row for row, as what detections are matched against.
+        tracker_ids = list(self.trackers.keys())
+        if not detections or not tracker_ids:
+            return [], list(detections), tracker_ids
+
+        corners = self.trackers.xyxy() if corners is None else corners
+        iou = iou_matrix(bboxes_to_array([detection.bbox for detection in detections]), corners)
+        pairs, unmatched_rows, unmatched_cols = greedy_match(iou, iou_threshold)
+
+        matched = [(tracker_ids[col], detections[row]) for row, col in pairs]
+        unmatched_detections = [detections[row] for row in unmatched_rows]
+        unmatched_trackers = [tracker_ids[col] for col in unmatched_cols]
+        return matched, unmatched_detections, unmatched_trackers
 
+    def source_corners(self, source_tracks):
+        # Corners of every live track on the source frame; tracks started since keep their current box.
+        store = self.trackers
+        corners = store.xyxy().copy()
+        for row in range(store.size):
+            entry = source_tracks.get(int(store.ids[row]))
+            if entry is not None:
+                corners[row] = entry[1].to_xyxy()
+        return corners
+
+    def correct(self, prepared, obj_id, bbox, confidence, now):
+        store = self.trackers
+        row = store.rows[obj_id]
+        store.confidence[row] = confidence
+        store.last_seen[row] = now
+        store.boxes[row] = bbox.to_tuple()
+        box_tracker = store.box_trackers[row]
+        if hasattr(box_tracker, "correct"):
+            box_tracker.correct(prepared, self.to_frame_box(bbox))
+
+    def update_with_detections(self, frame, detections, source_frame=None, source_tracks=None, regions=None):
+        # source_frame is the earlier frame the detections were found on, if not `frame`, and
+        # source_tracks the tracks on it as obj_id -> (category, bbox, confidence). The box trackers
+        # are advanced to `frame` first. Detections are then matched against where the tracks were
+        # on source_frame, and a matched track is re-anchored on its detection moved by the track's
+        # own displacement since. New tracks are initialised where the detection is valid, on
+        # source_frame, and catch up on the next update; tracks started after it can't be missed.
+        # With `regions`, inference only looked inside those (x, y, w, h) rectangles, so only tracks
+        # overlapping one of them can be missed.
+        corners = None
+        if source_frame is not None:
+            self.update_trackers(frame)
+            if source_tracks is not None:
+                corners = self.source_corners(source_tracks)
+        store = self.trackers
+        matched, unmatched_detections, unmatched_trackers = self.match_detections_to_trackers(detections,
+                                                                                              corners=corners)
+        prepared = self.prepare_frame(frame)
+
+        now = time.monotonic()
+        for tracker_id, detection in matched:
+            bbox = detection.bbox
+            if corners is not None:
+                row = store.rows[tracker_id]
+                dx, dy = (store.boxes[row, :2] - corners[row, :2]).tolist()
+                bbox = BBox(int(bbox.xmin + dx), int(bbox.ymin + dy), bbox.width, bbox.height)
+            self.correct(prepared, tracker_id, bbox, detection.confidence, now)
+
+        if corners is not None:
+            unmatched_trackers = [tracker_id for tracker_id in unmatched_trackers if tracker_id in source_tracks]
+        if regions is not None and unmatched_trackers:
+            covered = overlaps_regions(store.xyxy() if corners is None else corners, regions)
+            unmatched_trackers = [tracker_id for tracker_id in unmatched_trackers if covered[store.rows[tracker_id]]]
+        if unmatched_trackers:
+            store.remove(unmatched_trackers)
             for tracker_id in unmatched_trackers:
-                tracker = self.trackers[tracker_id]
-                iou = detection.bbox.compute_iou(tracker.bbox)
-                if iou > best_iou and iou >= iou_threshold:
-                    best_match = tracker_id
-                    best_iou = iou
-
-            if best_match is not None:
-                matched.append((best_match, detection))
-                unmatched_trackers.remove(best_match)
-            else:
-                unmatched_detections.append(detection)
-
-        return matched, unmatched_detections, unmatched_trackers
+                logger.info(f"Tracker {tracker_id} removed due to no match.")
 
+        if unmatched_detections and source_frame is not None:
+            prepared = self.prepare_frame(source_frame)
+        for detection in unmatched_detections:
+            self._add_tracker(prepared, detection.bbox, detection.category, detection.confidence)
 
-def update_trackers_with_yolo(frame, detections, tracker):
-    matched, unmatched_detections, unmatched_trackers = tracker.match_detections_to_trackers(detections)
+        return store
 
-    for tracker_id, detection in matched:
-        tracker.trackers[tracker_id].bbox = detection.bbox
-        tracker.trackers[tracker_id].last_seen = datetime.datetime.now()
 
-    for detection in unmatched_detections:
-        tracker.add_tracker(frame, detection.bbox, detection.category)
+def update_trackers_with_yolo(frame, detections, tracker, source_frame=None, source_tracks=None, regions=None):
+    return tracker.update_with_detections(frame, detections, source_frame, source_tracks, regions)
 
-    for tracker_id in unmatched_trackers:
-        tracker.remove_tracker(tracker_id)
-        logger.info(f"Tracker {tracker_id} removed due to no match.")
 
-    return tracker.trackers
+def create_tracker(backend=cfg.get("tracker.backend", "opencv"), **kwargs):
+    if backend == "opencv":
+        return OpenCVTracker(**kwargs)
+    if backend == "sort":
+        return SortTracker(**kwargs)
+    raise ValueError(f"Unknown tracker backend '{backend}'")
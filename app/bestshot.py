@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+import cv2
+from app.archiver import ArchiveItem, SightingItem, get_archiver
+from app.io import IMAGES_CORE, TIMESTAMP_FORMAT
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+def downscale(crop, max_side):
+    height, width = crop.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return crop.copy()
+    return cv2.resize(crop, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def sharpness(crop, probe_side=96):
+    # Variance of the Laplacian on a small grayscale probe; higher means sharper.
+    probe = downscale(crop, probe_side)
+    if probe.ndim == 3:
+        probe = cv2.cvtColor(probe, cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(probe, cv2.CV_64F).var())
+
+
+def is_truncated(bbox, frame_shape, margin=4):
+    x, y, w, h = bbox.to_tuple()
+    height, width = frame_shape[:2]
+    return x <= margin or y <= margin or x + w >= width - margin or y + h >= height - margin
+
+
+def score_crop(crop, confidence, bbox, frame_shape, sharpness_ref=cfg.get("bestshot.sharpness_ref", 300.0),
+               size_ref=cfg.get("bestshot.size_ref", 0.05)):
+    frame_area = frame_shape[0] * frame_shape[1]
+    size_score = min(1.0, (bbox.width * bbox.height) / (size_ref * frame_area))
+    sharp_score = min(1.0, sharpness(crop) / sharpness_ref)
+    score = 0.4 * confidence + 0.3 * sharp_score + 0.3 * size_score
+    if is_truncated(bbox, frame_shape):
+        score *= 0.5
+    return score
+
+
+class Candidate:
+    __slots__ = ("score", "crop", "timestamp")
+
+    def __init__(self, score, crop, timestamp):
+        self.score = score
+        self.crop = crop
+        self.timestamp = timestamp
+
+
+class TrackShots:
+    __slots__ = ("heap", "first_seen", "last_seen", "last_offer", "last_commit", "counter")
+
+    def __init__(self, now):
+        self.heap = []
+        self.first_seen = now
+        self.last_seen = now
+        self.last_offer = 0.0
+        self.last_commit = now
+        self.counter = itertools.count()
+
+
+class BestShotSelector:
+    # Keeps the top_k best-scoring crops of each live track in memory and commits them to
+    # the archiver when the track ends, or every flush_interval seconds for long tracks.
+    def __init__(self, top_k=cfg.get("bestshot.top_k", 2), max_side=cfg.get("bestshot.max_side", 480),
+                 sample_interval=cfg.get("bestshot.sample_interval", 0.2),
+                 flush_interval=cfg.get("bestshot.flush_interval", 120), min_score=cfg.get("bestshot.min_score", 0.3),
+                 archiver=None, images_core=IMAGES_CORE):
+        self.top_k = top_k
+        self.max_side = max_side
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.min_score = min_score
+        self.archiver = archiver
+        self.images_core = images_core
+        self.tracks = {}
+        self.lock = threading.Lock()
+        self.candidates_seen = 0
+        self.candidates_kept = 0
+        self.written = 0
+        self.tracks_committed = 0
+
+    def offer(self, category_pl, obj_id, frame, bbox, confidence, now=None):
+        now = time.time() if now is None else now
+        key = (category_pl, obj_id)
+        with self.lock:
+            shots = self.tracks.get(key)
+            if shots is None:
+                shots = self.tracks[key] = TrackShots(now)
+            shots.last_seen = now
+            if now - shots.last_offer < self.sample_interval:
+                return
+            shots.last_offer = now
+
+        x, y = max(int(bbox.xmin), 0), max(int(bbox.ymin), 0)
+        crop = frame[y:y + int(bbox.height), x:x + int(bbox.width)]
+        if crop.size == 0:
+            return
+        self.candidates_seen += 1
+        score = score_crop(crop, confidence, bbox, frame.shape)
+        if score < self.min_score:
+            return
+
+        with self.lock:
+            entry = (score, next(shots.counter))
+            if len(shots.heap) < self.top_k:
+                heapq.heappush(shots.heap, entry + (Candidate(score, downscale(crop, self.max_side), now),))
+                self.candidates_kept += 1
+            elif score > shots.heap[0][0]:
+                heapq.heapreplace(shots.heap, entry + (Candidate(score, downscale(crop, self.max_side), now),))
+                self.candidates_kept += 1
+
+    def end_track(self, category_pl, obj_id):
+        with self.lock:
+            shots = self.tracks.pop((category_pl, obj_id), None)
+        if shots is not None:
+            self.commit(category_pl, obj_id, shots)
+
+    def end_missing(self, live_keys):
+        with self.lock:
+            ended = [key for key in self.tracks if key not in live_keys]
+        for category_pl, obj_id in ended:
+            self.end_track(category_pl, obj_id)
+
+    def flush_due(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [(key, shots) for key, shots in self.tracks.items() if now - shots.last_commit >= self.flush_interval]
+            for key, shots in due:
+                self.tracks[key] = TrackShots(now)
+                self.tracks[key].last_offer = shots.last_offer
+        for (category_pl, obj_id), shots in due:
+            self.commit(category_pl, obj_id, shots)
+
+    def flush_all(self):
+        with self.lock:
+            tracks, self.tracks = self.tracks, {}
+        for (category_pl, obj_id), shots in tracks.items():
+            self.commit(category_pl, obj_id, shots)
+
+    def commit(self, category_pl, obj_id, shots):
+        archiver = self.archiver or get_archiver()
+        best = max(shots.heap)[2].crop if shots.heap else None
+        archiver.submit(SightingItem(category_pl, obj_id, shots.first_seen, shots.last_seen, best))
+        if not shots.heap:
+            return
+        for _, _, candidate in sorted(shots.heap, key=lambda entry: entry[2].timestamp):
+            timestamp = datetime.fromtimestamp(candidate.timestamp).strftime(TIMESTAMP_FORMAT)
+            image_path = f"{self.images_core}/{category_pl}/{obj_id}/{timestamp}.jpg"
+            if archiver.submit(ArchiveItem(image_path, candidate.crop, category_pl, obj_id, timestamp, candidate.timestamp)):
+                self.written += 1
+        self.tracks_committed += 1
+        logger.info(f"Committed {len(shots.heap)} best shots for {category_pl}, obj_id = {obj_id}")
+
+    def stats(self):
+        return {
+            "live_tracks": len(self.tracks),
+            "candidates_seen": self.candidates_seen,
+            "candidates_kept": self.candidates_kept,
+            "written": self.written,
+            "tracks_committed": self.tracks_committed,
+        }
@@ -0,0 +1,87 @@
+import itertools
+import threading
+import time
+from app.logger import get_logger
+logger = get_logger(__name__)
+
+
+class FrameBroadcaster:
+    # Single producer, many consumers. Only the newest frame is kept; every subscriber
+    # reads the same bytes object, and one that falls behind simply skips frames.
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.latest = None
+        self.seq = 0
+        self.published_at = 0.0
+        self.subscribers = {}
+        self.client_ids = itertools.count(1)
+
+    def publish(self, buffer):
+        with self.cond:
+            self.latest = buffer
+            self.seq += 1
+            self.published_at = time.monotonic()
+            self.cond.notify_all()
+
+    def subscribe(self):
+        subscription = Subscription(self, next(self.client_ids))
+        with self.cond:
+            self.subscribers[subscription.client_id] = subscription
+        logger.info(f"Stream client {subscription.client_id} subscribed ({len(self.subscribers)} active).")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.cond:
+            self.subscribers.pop(subscription.client_id, None)
+        logger.info(f"Stream client {subscription.client_id} unsubscribed ({len(self.subscribers)} active).")
+
+    def subscriber_count(self):
+        return len(self.subscribers)
+
+    def stats(self):
+        with self.cond:
+            subscribers = list(self.subscribers.values())
+        return {
+            "published": self.seq,
+            "subscribers": len(subscribers),
+            "clients": {sub.client_id: sub.stats() for sub in subscribers},
+        }
+
+
+class Subscription:
+    def __init__(self, broadcaster, client_id):
+        self.broadcaster = broadcaster
+        self.client_id = client_id
+        self.last_seq = broadcaster.seq
+        self.delivered = 0
+        self.skipped = 0
+        self.lag_total = 0.0
+        self.lag_last = 0.0
+
+    def next_frame(self, timeout=1.0):
+        broadcaster = self.broadcaster
+        with broadcaster.cond:
+            if not broadcaster.cond.wait_for(lambda: broadcaster.seq > self.last_seq, timeout):
+                return None
+            buffer = broadcaster.latest
+            seq = broadcaster.seq
+            published_at = broadcaster.published_at
+
+        self.skipped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.delivered += 1
+        self.lag_last = time.monotonic() - published_at
+        self.lag_total += self.lag_last
+        return buffer
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+    def stats(self):
+        return {
+            "delivered": self.delivered,
+            "skipped": self.skipped,
+            "frames_behind": self.broadcaster.seq - self.last_seq,
+            "lag_ms": round(1000 * self.lag_last, 2),
+            "avg_lag_ms": round(1000 * self.lag_total / self.delivered, 2) if self.delivered else 0.0,
+        }
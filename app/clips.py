@@ -0,0 +1,221 @@
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+import cv2
+import numpy as np
+from app.archiver import ClipItem, get_archiver
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+CLIPS_CORE = "static/clips"
+MB = 1024 * 1024
+
+
+class EncodedFrame:
+    __slots__ = ("timestamp", "data")
+
+    def __init__(self, timestamp, data):
+        self.timestamp = timestamp
+        self.data = data
+
+
+class Clip:
+    __slots__ = ("frames", "bytes", "tracks", "last_trigger")
+
+    def __init__(self, frames, now):
+        self.frames = list(frames)
+        self.bytes = sum(len(frame.data) for frame in self.frames)
+        self.tracks = {}
+        self.last_trigger = now
+
+    @property
+    def start(self):
+        return self.frames[0].timestamp
+
+    @property
+    def end(self):
+        return self.frames[-1].timestamp
+
+
+class ClipRecorder(threading.Thread):
+    # Keeps a pre-roll of recent frames as JPEGs in memory. When a track of one of `categories`
+    # appears, a clip is opened with that pre-roll and runs until post_roll seconds after the last
+    # such track is gone. Finished clips go to this thread, which writes the video file and hands
+    # the clip to the archiver. record() runs on the pipeline's clips stage and never waits: the
+    # pre-roll is bounded by max_buffer_mb, an open clip by max_clip_seconds/max_clip_mb, and
+    # finished clips waiting for the writer by max_pending.
+    def __init__(self, categories=cfg.get("clips.categories", ["dogs"]), pre_roll=cfg.get("clips.pre_roll", 5),
+                 post_roll=cfg.get("clips.post_roll", 5), fps=cfg.get("clips.fps", 10),
+                 max_side=cfg.get("clips.max_side", 640), jpeg_quality=cfg.get("clips.jpeg_quality", 75),
+                 max_buffer_mb=cfg.get("clips.max_buffer_mb", 16), max_clip_seconds=cfg.get("clips.max_clip_seconds", 120),
+                 max_clip_mb=cfg.get("clips.max_clip_mb", 64), max_pending=cfg.get("clips.max_pending", 2),
+                 codec=cfg.get("clips.codec", "mp4v"), container=cfg.get("clips.container", "mp4"),
+                 clips_core=CLIPS_CORE, archiver=None):
+        super().__init__(name="clip-writer", daemon=True)
+        self.categories = set(categories)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self.max_side = max_side
+        self.jpeg_quality = jpeg_quality
+        self.max_buffer_bytes = int(max_buffer_mb * MB)
+        self.max_clip_seconds = max_clip_seconds
+        self.max_clip_bytes = int(max_clip_mb * MB)
+        self.codec = codec
+        self.container = container
+        self.clips_core = clips_core
+        self.archiver = archiver
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.stop_event = threading.Event()
+        self.buffer = deque()
+        self.buffer_bytes = 0
+        self.clip = None
+        self.last_sample = float("-inf")
+        self.frames_encoded = 0
+        self.clips_started = 0
+        self.clips_written = 0
+        self.clips_dropped = 0
+        self.clips_failed = 0
+        self.truncated = 0
+
+    def record(self, timestamp, image, tracked):
+        # `tracked` is the pipeline's {obj_id: (category, bbox, confidence)} for this frame.
+        triggers = []
+        for obj_id, (category, _, _) in tracked.items():
+            category_pl = category.to_plural()
+            if category_pl in self.categories:
+                triggers.append((category_pl, obj_id))
+        if triggers and self.clip is None:
+            self.clip = Clip(self.buffer, timestamp)
+            self.buffer.clear()
+            self.buffer_bytes = 0
+            self.clips_started += 1
+        if self.clip is not None and triggers:
+            self.clip.last_trigger = timestamp
+            for key in triggers:
+                self.clip.tracks.setdefault(key, [timestamp, timestamp])[1] = timestamp
+
+        if timestamp - self.last_sample >= self.frame_interval:
+            self.last_sample = timestamp
+            frame = self.encode(timestamp, image)
+            if frame is not None:
+                self.append(frame)
+
+        if self.clip is not None and not triggers and timestamp - self.clip.last_trigger >= self.post_roll:
+            self.finish()
+
+    def encode(self, timestamp, image):
+        height, width = image.shape[:2]
+        scale = self.max_side / max(height, width) if self.max_side else 1.0
+        if scale < 1:
+            image = cv2.resize(image, (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)),
+                               interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if not ok:
+            return None
+        self.frames_encoded += 1
+        return EncodedFrame(timestamp, buffer.tobytes())
+
+    def append(self, frame):
+        clip = self.clip
+        if clip is None:
+            self.buffer.append(frame)
+            self.buffer_bytes += len(frame.data)
+            while self.buffer and (self.buffer_bytes > self.max_buffer_bytes or
+                                   frame.timestamp - self.buffer[0].timestamp > self.pre_roll):
+                self.buffer_bytes -= len(self.buffer.popleft().data)
+            return
+        clip.frames.append(frame)
+        clip.bytes += len(frame.data)
+        if clip.bytes >= self.max_clip_bytes or clip.end - clip.start >= self.max_clip_seconds:
+            # A long visit is cut into consecutive clips; the next one opens on the next frame
+            # with a trigger track, without pre-roll.
+            self.truncated += 1
+            self.finish()
+
+    def finish(self):
+        clip, self.clip = self.clip, None
+        if clip is None or not clip.frames or not clip.tracks:
+            return
+        try:
+            self.queue.put_nowait(clip)
+        except queue.Full:
+            self.clips_dropped += 1
+            logger.warning(f"Clip writer busy, dropped a {clip.end - clip.start:.1f}s clip.")
+
+    def run(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                clip = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.write(clip)
+            except Exception as e:
+                self.clips_failed += 1
+                logger.error(f"Error writing clip: {e}")
+        logger.info("Clip writer stopped.")
+
+    def clip_path(self, clip):
+        started = datetime.fromtimestamp(clip.start)
+        return os.path.join(self.clips_core, started.strftime("%Y-%m-%d"),
+                            f"{started.strftime('%H-%M-%S-%f')}.{self.container}")
+
+    def write(self, clip):
+        path = self.clip_path(clip)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so a crash never leaves a truncated clip at `path`;
+        # the extension stays last because VideoWriter picks the container from it.
+        tmp_path = f"{path[:-len(self.container) - 1]}.tmp.{self.container}"
+        writer = None
+        try:
+            for frame in clip.frames:
+                image = cv2.imdecode(np.frombuffer(frame.data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    continue
+                if writer is None:
+                    height, width = image.shape[:2]
+                    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (width, height))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"cannot open a {self.codec} writer for {tmp_path}")
+                writer.write(image)
+        finally:
+            if writer is not None:
+                writer.release()
+        if writer is None:
+            return None
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        tracks = {key: tuple(span) for key, span in clip.tracks.items()}
+        (self.archiver or get_archiver()).submit(ClipItem(path, clip.start, clip.end, tracks, size))
+        self.clips_written += 1
+        logger.info(f"Wrote {len(clip.frames)}-frame clip {path} for {len(tracks)} tracks.")
+        return path
+
+    def stop(self, timeout=10):
+        # The open clip is cut at the current frame and still written.
+        self.finish()
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        clip = self.clip
+        return {
+            "recording": clip is not None,
+            "buffered_frames": len(self.buffer),
+            "buffered_mb": round(self.buffer_bytes / MB, 2),
+            "clip_mb": round(clip.bytes / MB, 2) if clip is not None else 0.0,
+            "pending": self.queue.qsize(),
+            "frames_encoded": self.frames_encoded,
+            "clips_started": self.clips_started,
+            "clips_written": self.clips_written,
+            "clips_dropped": self.clips_dropped,
+            "clips_failed": self.clips_failed,
+            "truncated": self.truncated,
+        }
@@ -1,16 +1,27 @@
 import json
 import os
+import threading
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
 
 class Config:
-    def __init__(self, config_file="app/config/config.json"):
+    # Every module builds its own Config(); the parsed file is shared per path so the JSON is read once.
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, config_file=DEFAULT_CONFIG_FILE):
         self.config_file = config_file
         self.config = self.load_config()
 
     def load_config(self):
-        if not os.path.exists(self.config_file):
-            raise FileNotFoundError(f"Config file '{self.config_file}' not found.")
-        with open(self.config_file, "r") as file:
-            return json.load(file)
+        with Config._lock:
+            if self.config_file not in Config._cache:
+                if not os.path.exists(self.config_file):
+                    raise FileNotFoundError(f"Config file '{self.config_file}' not found.")
+                with open(self.config_file, "r") as file:
+                    Config._cache[self.config_file] = json.load(file)
+            return Config._cache[self.config_file]
 
     def get(self, key, default=None):
         keys = key.split(".")
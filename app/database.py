@@ -1,42 +1,309 @@
 import sqlite3
 import os
-from flask import Flask
+from datetime import datetime
 from app.logger import get_logger
 logger = get_logger(__name__)
 
 
 def get_database_path():
-    app = Flask(__name__, instance_relative_config=True)
-    return os.path.join(app.instance_path, 'dog_database.db')
+    # Same location as Flask's instance folder for the `app` package, without building an app for it.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, 'instance', 'dog_database.db')
 
 DB_FILE = get_database_path()
 
-def initialize_database():
+# Sightings are split at this length so time-range queries can bound start_ts on both sides.
+MAX_SIGHTING_SECONDS = 3600
+
+
+def to_epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    for fmt in ("%Y-%m-%d_%H-%M-%S-%f", "%Y-%m-%d_%H-%M-%S"):
+        try:
+            return int(datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized timestamp '{value}'")
+
+
+def _migration_1(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS dogs (
+        id INTEGER PRIMARY KEY,
+        first_seen TEXT,
+        last_seen TEXT,
+        image_path TEXT
+    )''')
+
+def _migration_2(conn):
+    conn.execute('''CREATE TABLE entities (
+        id INTEGER PRIMARY KEY,
+        category TEXT NOT NULL,
+        first_seen INTEGER NOT NULL,
+        last_seen INTEGER NOT NULL,
+        sightings INTEGER NOT NULL DEFAULT 0
+    )''')
+    conn.execute('''CREATE TABLE sightings (
+        id INTEGER PRIMARY KEY,
+        entity_id INTEGER NOT NULL REFERENCES entities(id),
+        category TEXT NOT NULL,
+        track_id INTEGER,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL
+    )''')
+    conn.execute('''CREATE TABLE images (
+        id INTEGER PRIMARY KEY,
+        entity_id INTEGER NOT NULL REFERENCES entities(id),
+        sighting_id INTEGER REFERENCES sightings(id),
+        ts INTEGER NOT NULL,
+        path TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX idx_entities_category_last_seen ON entities(category, last_seen)")
+    conn.execute("CREATE INDEX idx_sightings_start ON sightings(start_ts)")
+    conn.execute("CREATE INDEX idx_sightings_category_start ON sightings(category, start_ts)")
+    conn.execute("CREATE INDEX idx_sightings_entity_start ON sightings(entity_id, start_ts)")
+    conn.execute("CREATE INDEX idx_images_entity_ts ON images(entity_id, ts)")
+
+    rows = conn.execute("SELECT id, first_seen, last_seen, image_path FROM dogs").fetchall()
+    for dog_id, first_seen, last_seen, image_path in rows:
+        first_ts = to_epoch(first_seen)
+        last_ts = to_epoch(last_seen) or first_ts
+        conn.execute("INSERT INTO entities (id, category, first_seen, last_seen, sightings) VALUES (?, 'dogs', ?, ?, 1)",
+                     (dog_id, first_ts, last_ts))
+        sighting_id = conn.execute(
+            "INSERT INTO sightings (entity_id, category, track_id, start_ts, end_ts) VALUES (?, 'dogs', ?, ?, ?)",
+            (dog_id, dog_id, first_ts, last_ts)).lastrowid
+        if image_path:
+            conn.execute("INSERT INTO images (entity_id, sighting_id, ts, path) VALUES (?, ?, ?, ?)",
+                         (dog_id, sighting_id, first_ts, image_path))
+    conn.execute("DROP TABLE dogs")
+    logger.info(f"Migrated {len(rows)} dog records to the entities/sightings/images schema.")
+
+def _migration_3(conn):
+    # Keyset pagination of the archive browser orders entities by (last_seen, id) without a category.
+    conn.execute("CREATE INDEX idx_entities_last_seen ON entities(last_seen, id)")
+
+def _migration_4(conn):
+    # Tiered storage: loose files record their size for the disk budget, and compacted images
+    # point into an append-only pack file instead.
+    conn.execute('''CREATE TABLE packs (
+        id INTEGER PRIMARY KEY,
+        category TEXT NOT NULL,
+        path TEXT NOT NULL UNIQUE,
+        size INTEGER NOT NULL DEFAULT 0,
+        created INTEGER NOT NULL
+    )''')
+    conn.execute("ALTER TABLE images ADD COLUMN bytes INTEGER")
+    conn.execute("ALTER TABLE images ADD COLUMN pack_id INTEGER REFERENCES packs(id)")
+    conn.execute("ALTER TABLE images ADD COLUMN pack_offset INTEGER")
+    conn.execute("ALTER TABLE images ADD COLUMN pack_length INTEGER")
+    conn.execute("CREATE INDEX idx_images_ts ON images(ts)")
+    conn.execute("CREATE INDEX idx_images_pack_ts ON images(pack_id, ts)")
+
+def _migration_5(conn):
+    # One row per track that appears in a recorded clip; several rows can share a clip file.
+    conn.execute('''CREATE TABLE clips (
+        id INTEGER PRIMARY KEY,
+        entity_id INTEGER NOT NULL REFERENCES entities(id),
+        sighting_id INTEGER REFERENCES sightings(id),
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        bytes INTEGER
+    )''')
+    conn.execute("CREATE INDEX idx_clips_entity_start ON clips(entity_id, start_ts)")
+
+def _migration_6(conn):
+    # The storage manager expires and evicts clips oldest first, one file (all its rows) at a time.
+    conn.execute("CREATE INDEX idx_clips_start ON clips(start_ts)")
+    conn.execute("CREATE INDEX idx_clips_path ON clips(path)")
+
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4, _migration_5, _migration_6]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0 and conn.execute("SELECT name FROM sqlite_master WHERE name = 'dogs'").fetchone():
+        version = 1
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with conn:
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        logger.info(f"Database migrated to schema version {number}")
+
+def initialize_database(db_file=None):
     logger.info("Initializing database...")
-    if not os.path.exists(DB_FILE):
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE dogs (
-            id INTEGER PRIMARY KEY,
-            first_seen TEXT,
-            last_seen TEXT,
-            image_path TEXT
-        )''')
-        conn.commit()
-        conn.close()
-        logger.info("Database initiated")
+    conn = connect(db_file)
+    migrate(conn)
+    conn.close()
+    logger.info("Database initiated")
 
-def add_or_update_dog(dog_id, image_path, first_seen, last_seen):
-    conn = sqlite3.connect(DB_FILE)
-    logger.info("Connected to database")
-    c = conn.cursor()
-    c.execute("SELECT id FROM dogs WHERE id = ?", (dog_id,))
-    if c.fetchone() is None:
-        c.execute("INSERT INTO dogs (id, first_seen, last_seen, image_path) VALUES (?, ?, ?, ?)",
-                  (dog_id, first_seen, last_seen, image_path))
-        logger.info(f"New record added to db. Dog ID = {dog_id}, first_seen = {first_seen}")
+
+def connect(db_file=None):
+    # Long-lived connection for the archiver thread: WAL lets readers run while it writes.
+    db_file = db_file or DB_FILE
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    conn = sqlite3.connect(db_file, check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Statements are kept as constants so sqlite3's per-connection statement cache reuses them.
+INSERT_ENTITY = "INSERT INTO entities (category, first_seen, last_seen, sightings) VALUES (?, ?, ?, 0)"
+INSERT_SIGHTING = "INSERT INTO sightings (entity_id, category, track_id, start_ts, end_ts) VALUES (?, ?, ?, ?, ?)"
+EXTEND_SIGHTING = "UPDATE sightings SET start_ts = MIN(start_ts, ?), end_ts = MAX(end_ts, ?) WHERE id = ?"
+COUNT_SIGHTING = "UPDATE entities SET sightings = sightings + 1 WHERE id = ?"
+TOUCH_ENTITY = "UPDATE entities SET first_seen = MIN(first_seen, ?), last_seen = MAX(last_seen, ?) WHERE id = ?"
+INSERT_IMAGE = "INSERT INTO images (entity_id, sighting_id, ts, path, bytes) VALUES (?, ?, ?, ?, ?)"
+INSERT_CLIP = "INSERT INTO clips (entity_id, sighting_id, start_ts, end_ts, path, bytes) VALUES (?, ?, ?, ?, ?, ?)"
+
+def insert_sightings(conn, entity_id, category, track_id, start_ts, end_ts):
+    # A span longer than MAX_SIGHTING_SECONDS (a long flush interval or clip) is stored as consecutive
+    # sightings, so every row stays within the bound the range queries rely on. Returns the id and
+    # start of the last one.
+    while True:
+        chunk_end = min(end_ts, start_ts + MAX_SIGHTING_SECONDS)
+        sighting_id = conn.execute(INSERT_SIGHTING, (entity_id, category, track_id, start_ts, chunk_end)).lastrowid
+        conn.execute(COUNT_SIGHTING, (entity_id,))
+        if chunk_end >= end_ts:
+            return sighting_id, start_ts
+        start_ts = chunk_end
+
+def record_sighting(conn, open_sightings, category, track_id, start_ts, end_ts, entity_id=None):
+    # open_sightings maps (category, track_id) -> [entity_id, sighting_id, sighting_start, sighting_end]
+    # for the tracks seen by this writer; it is updated in place. Rows can arrive out of order
+    # (clip spans, late best shots), so the cached span follows every extension in both directions.
+    key = (category, track_id)
+    current = open_sightings.get(key)
+    if current is None:
+        if entity_id is None:
+            entity_id = conn.execute(INSERT_ENTITY, (category, start_ts, end_ts)).lastrowid
+        current = open_sightings[key] = [entity_id, None, start_ts, end_ts]
+    entity_id, sighting_id, sighting_start, sighting_end = current
+
+    if sighting_id is None or max(end_ts, sighting_end) - min(start_ts, sighting_start) > MAX_SIGHTING_SECONDS:
+        sighting_id, last_start = insert_sightings(conn, entity_id, category, track_id, start_ts, end_ts)
+        current[1:] = sighting_id, last_start, end_ts
     else:
-        c.execute("UPDATE dogs SET last_seen = ? WHERE id = ?", (last_seen, dog_id))
-        logger.info(f"Record updated. Dog = {dog_id}, last_seen = {last_seen}")
-    conn.commit()
+        conn.execute(EXTEND_SIGHTING, (start_ts, end_ts, sighting_id))
+        current[2], current[3] = min(start_ts, sighting_start), max(end_ts, sighting_end)
+    conn.execute(TOUCH_ENTITY, (start_ts, end_ts, entity_id))
+    return entity_id, sighting_id
+
+def add_image(conn, open_sightings, category, track_id, ts, path, size=None):
+    entity_id, sighting_id = record_sighting(conn, open_sightings, category, track_id, ts, ts)
+    conn.execute(INSERT_IMAGE, (entity_id, sighting_id, ts, path, size))
+    return entity_id
+
+def add_clip(conn, open_sightings, category, track_id, first_seen, last_seen, path, start_ts, end_ts, size=None):
+    # [first_seen, last_seen] is the track's span inside the clip, [start_ts, end_ts] the whole clip's.
+    entity_id, sighting_id = record_sighting(conn, open_sightings, category, track_id, first_seen, last_seen)
+    conn.execute(INSERT_CLIP, (entity_id, sighting_id, start_ts, end_ts, path, size))
+    return entity_id
+
+def add_or_update_dog(dog_id, image_path, first_seen, last_seen):
+    conn = connect()
+    first_ts, last_ts = to_epoch(first_seen), to_epoch(last_seen)
+    with conn:
+        if conn.execute("SELECT id FROM entities WHERE id = ?", (dog_id,)).fetchone() is None:
+            conn.execute("INSERT INTO entities (id, category, first_seen, last_seen, sightings) VALUES (?, 'dogs', ?, ?, 0)",
+                         (dog_id, first_ts, last_ts))
+            logger.info(f"New record added to db. Dog ID = {dog_id}, first_seen = {first_seen}")
+        else:
+            logger.info(f"Record updated. Dog = {dog_id}, last_seen = {last_seen}")
+        open_sightings = {("dogs", dog_id): [dog_id, None, first_ts, first_ts]}
+        entity_id, sighting_id = record_sighting(conn, open_sightings, "dogs", dog_id, first_ts, last_ts)
+        conn.execute(INSERT_IMAGE, (entity_id, sighting_id, last_ts, image_path, None))
     conn.close()
+
+
+ENTITIES_SEEN_BETWEEN = '''
+    SELECT DISTINCT entity_id FROM sightings
+    WHERE start_ts BETWEEN ? AND ? AND end_ts >= ?
+'''
+ENTITIES_SEEN_BETWEEN_CATEGORY = '''
+    SELECT DISTINCT entity_id FROM sightings
+    WHERE category = ? AND start_ts BETWEEN ? AND ? AND end_ts >= ?
+'''
+SIGHTINGS_BY_CATEGORY = '''
+    SELECT category, COUNT(*), COUNT(DISTINCT entity_id) FROM sightings
+    WHERE start_ts BETWEEN ? AND ? AND end_ts >= ?
+    GROUP BY category
+'''
+SIGHTINGS_PER_DAY = '''
+    SELECT start_ts / 86400 AS day, COUNT(*) FROM sightings
+    WHERE category = ? AND start_ts BETWEEN ? AND ?
+    GROUP BY day ORDER BY day
+'''
+
+def entities_seen_between(conn, start_ts, end_ts, category=None):
+    # A sighting overlaps [start, end] iff it starts before `end` and ends after `start`; since
+    # sightings are at most MAX_SIGHTING_SECONDS long the start_ts index bounds both sides.
+    lower = start_ts - MAX_SIGHTING_SECONDS
+    if category is None:
+        rows = conn.execute(ENTITIES_SEEN_BETWEEN, (lower, end_ts, start_ts))
+    else:
+        rows = conn.execute(ENTITIES_SEEN_BETWEEN_CATEGORY, (category, lower, end_ts, start_ts))
+    return [row[0] for row in rows]
+
+def count_sightings_by_category(conn, start_ts, end_ts):
+    rows = conn.execute(SIGHTINGS_BY_CATEGORY, (start_ts - MAX_SIGHTING_SECONDS, end_ts, start_ts))
+    return {category: {"sightings": sightings, "entities": entities} for category, sightings, entities in rows}
+
+def sightings_per_day(conn, category, start_ts, end_ts):
+    return conn.execute(SIGHTINGS_PER_DAY, (category, start_ts, end_ts)).fetchall()
+
+
+ENTITIES_PAGE = "SELECT id, category, first_seen, last_seen, sightings FROM entities"
+SIGHTINGS_PAGE = "SELECT id, start_ts, end_ts, track_id FROM sightings WHERE entity_id = ?"
+IMAGES_PAGE = "SELECT id, ts, path FROM images WHERE entity_id = ?"
+CLIPS_PAGE = "SELECT id, start_ts, end_ts, path FROM clips WHERE entity_id = ?"
+
+def entities_page(conn, limit, category=None, before=None):
+    # Newest first; `before` is the (last_seen, id) of the last row of the previous page.
+    conditions, params = [], []
+    if category is not None:
+        conditions.append("category = ?")
+        params.append(category)
+    if before is not None:
+        conditions.append("(last_seen, id) < (?, ?)")
+        params.extend(before)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"{ENTITIES_PAGE}{where} ORDER BY last_seen DESC, id DESC LIMIT ?"
+    return conn.execute(query, params + [limit]).fetchall()
+
+def sightings_page(conn, entity_id, limit, before=None):
+    if before is None:
+        return conn.execute(f"{SIGHTINGS_PAGE} ORDER BY start_ts DESC, id DESC LIMIT ?", (entity_id, limit)).fetchall()
+    return conn.execute(f"{SIGHTINGS_PAGE} AND (start_ts, id) < (?, ?) ORDER BY start_ts DESC, id DESC LIMIT ?",
+                        (entity_id, *before, limit)).fetchall()
+
+def images_page(conn, entity_id, limit, before=None):
+    if before is None:
+        return conn.execute(f"{IMAGES_PAGE} ORDER BY ts DESC, id DESC LIMIT ?", (entity_id, limit)).fetchall()
+    return conn.execute(f"{IMAGES_PAGE} AND (ts, id) < (?, ?) ORDER BY ts DESC, id DESC LIMIT ?",
+                        (entity_id, *before, limit)).fetchall()
+
+def clips_page(conn, entity_id, limit, before=None):
+    if before is None:
+        return conn.execute(f"{CLIPS_PAGE} ORDER BY start_ts DESC, id DESC LIMIT ?", (entity_id, limit)).fetchall()
+    return conn.execute(f"{CLIPS_PAGE} AND (start_ts, id) < (?, ?) ORDER BY start_ts DESC, id DESC LIMIT ?",
+                        (entity_id, *before, limit)).fetchall()
+
+GET_IMAGE = '''
+    SELECT images.id, entity_id, ts, images.path, packs.path, pack_offset, pack_length
+    FROM images LEFT JOIN packs ON packs.id = images.pack_id WHERE images.id = ?
+'''
+
+def get_image(conn, image_id):
+    # (id, entity_id, ts, path, pack_path, pack_offset, pack_length); the pack fields are None for loose files.
+    return conn.execute(GET_IMAGE, (image_id,)).fetchone()
+
+def get_clip(conn, clip_id):
+    return conn.execute("SELECT id, entity_id, start_ts, end_ts, path FROM clips WHERE id = ?", (clip_id,)).fetchone()
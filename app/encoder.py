@@ -0,0 +1,164 @@
+import time
+import cv2
+import numpy as np
+from app.metrics import metrics
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class OpenCVJpeg:
+    name = "opencv"
+
+    def encode(self, frame, quality):
+        _, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buffer.tobytes()
+
+
+class SimpleJpeg:
+    # libjpeg-turbo through simplejpeg; needs a C-contiguous array.
+    name = "simplejpeg"
+
+    def __init__(self):
+        import simplejpeg
+        self.simplejpeg = simplejpeg
+
+    def encode(self, frame, quality):
+        return self.simplejpeg.encode_jpeg(frame, quality=quality, colorspace="BGR", fastdct=True)
+
+
+class TurboJpeg:
+    name = "turbojpeg"
+
+    def __init__(self):
+        from turbojpeg import TurboJPEG
+        self.turbo = TurboJPEG()
+
+    def encode(self, frame, quality):
+        return self.turbo.encode(frame, quality=quality)
+
+
+JPEG_ENCODERS = {"simplejpeg": SimpleJpeg, "turbojpeg": TurboJpeg, "opencv": OpenCVJpeg}
+
+
+def load_jpeg_encoder(name=cfg.get("stream.jpeg_backend", "auto")):
+    # "auto" takes the first libjpeg-turbo binding that imports and falls back to OpenCV.
+    candidates = list(JPEG_ENCODERS) if name == "auto" else [name]
+    for candidate in candidates:
+        if candidate not in JPEG_ENCODERS:
+            raise ValueError(f"Unknown JPEG backend '{candidate}', expected one of {list(JPEG_ENCODERS)}")
+        try:
+            return JPEG_ENCODERS[candidate]()
+        except (ImportError, OSError, RuntimeError) as e:
+            logger.warning(f"JPEG backend '{candidate}' unavailable: {e}")
+    logger.warning("Falling back to OpenCV JPEG encoding.")
+    return OpenCVJpeg()
+
+
+def preview_size(frame_shape, preview_width):
+    height, width = frame_shape[:2]
+    if not preview_width or preview_width >= width:
+        return width, height
+    return preview_width, max(1, int(round(height * preview_width / width)))
+
+
+class StreamEncoder:
+    # Turns tracked frames into JPEGs for the broadcaster. Nothing is drawn or encoded while no
+    # client is subscribed. Frames are scaled to the preview width before the overlay is drawn.
+    # Quality and frame rate follow a bitrate budget shared by all clients: the rate drops first,
+    # then quality once the rate is at its minimum, and quality recovers when there is headroom.
+    def __init__(self, broadcaster, preview_width=cfg.get("stream.preview_width", 960),
+                 quality=cfg.get("stream.jpeg_quality", 80), min_quality=cfg.get("stream.min_quality", 40),
+                 max_quality=cfg.get("stream.max_quality", 85),
+                 target_bitrate_kbps=cfg.get("stream.target_bitrate_kbps", 8000),
+                 max_fps=cfg.get("stream.max_fps", 30), min_fps=cfg.get("stream.min_fps", 5), jpeg_encoder=None):
+        self.broadcaster = broadcaster
+        self.preview_width = preview_width
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.target_bitrate = 1000 * target_bitrate_kbps if target_bitrate_kbps else None
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.fps_limit = max_fps
+        self.jpeg = jpeg_encoder or load_jpeg_encoder()
+        self.preview = None
+        self.avg_bytes = None
+        self.last_encoded = 0.0
+        self.encoded = 0
+        self.skipped_idle = 0
+        self.skipped_rate = 0
+
+    def should_encode(self, now):
+        if self.broadcaster.subscriber_count() == 0:
+            self.skipped_idle += 1
+            return False
+        if self.fps_limit and now - self.last_encoded < 1.0 / self.fps_limit:
+            self.skipped_rate += 1
+            return False
+        return True
+
+    def render(self, image, tracked, fps):
+        # The overlay goes into a preview buffer that is reused for every frame, never into the
+        # captured frame, so the archive stage always crops clean pixels.
+        width, height = preview_size(image.shape, self.preview_width)
+        scale = width / image.shape[1]
+        shape = (height, width) + image.shape[2:]
+        if self.preview is None or self.preview.shape != shape:
+            self.preview = np.empty(shape, dtype=image.dtype)
+        frame = self.preview
+        if scale < 1:
+            # INTER_AREA is slow for non-integer ratios such as 1280 -> 960; bilinear is fine that close to 1.
+            interpolation = cv2.INTER_AREA if scale <= 0.5 else cv2.INTER_LINEAR
+            cv2.resize(image, (width, height), dst=frame, interpolation=interpolation)
+        else:
+            np.copyto(frame, image)
+        for obj_id, (category, bbox, _) in tracked.items():
+            x, y, w, h = [int(v * scale) for v in bbox.to_tuple()]
+            color = (0, 255, 0) if category == "dog" else (255, 0, 0)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+            cv2.putText(frame, f"{category.capitalize()} ID {obj_id}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+        return frame
+
+    def encode(self, image, tracked, fps, now=None):
+        now = time.monotonic() if now is None else now
+        if not self.should_encode(now):
+            return None
+        with metrics.timer("draw"):
+            frame = self.render(image, tracked, fps)
+        with metrics.timer("jpeg_encode"):
+            buffer = self.jpeg.encode(frame, self.quality)
+        self.last_encoded = now
+        self.encoded += 1
+        self.adapt(len(buffer))
+        self.broadcaster.publish(buffer)
+        return buffer
+
+    def adapt(self, size):
+        self.avg_bytes = size if self.avg_bytes is None else 0.9 * self.avg_bytes + 0.1 * size
+        if not self.target_bitrate:
+            return
+        clients = max(1, self.broadcaster.subscriber_count())
+        affordable_fps = self.target_bitrate / (8 * self.avg_bytes * clients)
+        if affordable_fps < self.min_fps and self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - 5)
+        elif affordable_fps > 1.5 * self.max_fps and self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + 1)
+        self.fps_limit = max(self.min_fps, min(self.max_fps, affordable_fps))
+
+    def stats(self):
+        clients = self.broadcaster.subscriber_count()
+        return {
+            "backend": self.jpeg.name,
+            "quality": self.quality,
+            "fps_limit": round(self.fps_limit, 2) if self.fps_limit else None,
+            "avg_kb": round(self.avg_bytes / 1024, 1) if self.avg_bytes else None,
+            "bitrate_kbps": round(8 * self.avg_bytes * self.fps_limit * clients / 1000, 1)
+            if self.avg_bytes and self.fps_limit else None,
+            "encoded": self.encoded,
+            "skipped_idle": self.skipped_idle,
+            "skipped_rate": self.skipped_rate,
+        }
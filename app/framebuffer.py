@@ -0,0 +1,150 @@
+import os
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+# meta: slots, height, width, channels, latest slot, frames written
+META_FIELDS = 6
+ALIGN = 64
+
+
+class SharedSegment(shared_memory.SharedMemory):
+    # Unmapping while numpy views of the segment are alive crashes the process. Dropping our
+    # references instead lets the mmap close itself once the last view is collected.
+    def close(self):
+        if getattr(self, "_fd", -1) >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._buf = None
+        self._mmap = None
+
+
+def open_segment(name, cls=SharedSegment):
+    # Attaching registers the segment with this process' resource tracker, which would unlink it
+    # at exit although the creating process still owns it (track=False exists from Python 3.13).
+    try:
+        return cls(name=name, track=False)
+    except TypeError:
+        segment = cls(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+def layout(slots, shape):
+    header = (META_FIELDS + 2 * slots) * 8
+    offset = (header + ALIGN - 1) // ALIGN * ALIGN
+    return offset, offset + slots * int(np.prod(shape))
+
+
+class FrameRing:
+    # A fixed ring of uint8 frame slots, preallocated once (in shared memory when possible) and
+    # reused for every frame. Each slot carries a sequence number and timestamp; a slot's sequence
+    # is -1 while it is being written, so readers in other processes can check that the frame they
+    # used was not overwritten underneath them (valid()).
+    # In the writing process a slot is not reused while the read-only view of its last frame is
+    # still referenced, e.g. by a packet waiting in a queue. Slices of a view do not pin the slot,
+    # so anything that keeps pixels beyond the packet's lifetime has to copy them.
+    def __init__(self, shape, slots, shared=True, name=None, create=True):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.segment = None
+        size = layout(slots, self.shape)[1]
+        if not create:
+            self.segment = open_segment(name)
+        elif shared:
+            try:
+                self.segment = SharedSegment(name=name, create=True, size=size)
+            except OSError as e:
+                logger.warning(f"Shared memory for {slots} frames unavailable ({e}); using process-local buffers.")
+        buffer = self.segment.buf if self.segment is not None else bytearray(size)
+        self.owner = create
+        self.map(buffer)
+        if create:
+            channels = self.shape[2] if len(self.shape) > 2 else 0
+            self.meta[:] = (slots, self.shape[0], self.shape[1], channels, -1, 0)
+            self.seqs[:] = -1
+            self.timestamps[:] = 0.0
+        self.leases = [None] * slots
+        self.cursor = 0
+
+    @classmethod
+    def attach(cls, name):
+        # Opens a ring created by another process; frames come back as read-only views.
+        probe = open_segment(name)
+        slots, height, width, channels = (int(v) for v in np.ndarray((4,), np.int64, buffer=probe.buf))
+        probe.close()
+        shape = (height, width, channels) if channels else (height, width)
+        return cls(shape, slots, name=name, create=False)
+
+    def map(self, buffer):
+        offset, _ = layout(self.slots, self.shape)
+        self.meta = np.ndarray((META_FIELDS,), np.int64, buffer=buffer)
+        self.seqs = np.ndarray((self.slots,), np.int64, buffer=buffer, offset=META_FIELDS * 8)
+        self.timestamps = np.ndarray((self.slots,), np.float64, buffer=buffer, offset=(META_FIELDS + self.slots) * 8)
+        self.frames = np.ndarray((self.slots,) + self.shape, np.uint8, buffer=buffer, offset=offset)
+
+    @property
+    def name(self):
+        return self.segment.name if self.segment is not None else None
+
+    def acquire(self):
+        # Next slot whose last frame nobody holds any more, as (slot, writable buffer).
+        for i in range(self.slots):
+            slot = (self.cursor + i) % self.slots
+            lease = self.leases[slot]
+            if lease is None or lease() is None:
+                self.cursor = (slot + 1) % self.slots
+                self.seqs[slot] = -1
+                return slot, self.frames[slot]
+        raise RuntimeError(f"All {self.slots} frame slots are in use")
+
+    def commit(self, slot, seq, timestamp):
+        self.timestamps[slot] = timestamp
+        self.seqs[slot] = seq
+        self.meta[4] = slot
+        self.meta[5] += 1
+        view = self.view(slot)
+        self.leases[slot] = weakref.ref(view)
+        return view
+
+    def view(self, slot):
+        view = self.frames[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def latest(self):
+        # (slot, seq, timestamp, view) of the newest complete frame, or None before the first one.
+        slot = int(self.meta[4])
+        if slot < 0:
+            return None
+        seq = int(self.seqs[slot])
+        if seq < 0:
+            return None
+        return slot, seq, float(self.timestamps[slot]), self.view(slot)
+
+    def valid(self, slot, seq):
+        return int(self.seqs[slot]) == seq
+
+    def in_use(self):
+        return sum(1 for lease in self.leases if lease is not None and lease() is not None)
+
+    def close(self):
+        self.meta = self.seqs = self.timestamps = self.frames = None
+        if self.segment is not None:
+            self.segment.close()
+            if self.owner:
+                self.segment.unlink()
+            self.segment = None
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "in_use": self.in_use(),
+            "frames_written": int(self.meta[5]) if self.meta is not None else None,
+            "mb": round(self.slots * int(np.prod(self.shape)) / 2 ** 20, 1),
+        }
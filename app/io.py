@@ -1,42 +1,156 @@
 import cv2
+import numpy as np
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from app.logger import get_logger
-from app.database import add_or_update_dog
+from app.archiver import ArchiveItem, get_archiver
 
 logger = get_logger(__name__)
 
 IMAGES_CORE = "static/images"
+THUMBNAILS_CORE = "static/thumbnails"
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S-%f"
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+def crop_bbox(frame, bbox):
+    x, y, w, h = [int(v) for v in bbox.to_tuple()]
+    x, y = max(x, 0), max(y, 0)
+    return frame[y:y + h, x:x + w]
 
 def save_image(category, obj_id, frame, bbox, timestamp):    
     base_dir = f"{IMAGES_CORE}/{category}/{obj_id}"
     os.makedirs(base_dir, exist_ok=True)
     image_path = f"{base_dir}/{timestamp}.jpg"
 
-    x, y, w, h = [int(v) for v in bbox.to_tuple()]
-    cropped = frame[y:y + h, x:x + w]
+    cropped = crop_bbox(frame, bbox)
     cv2.imwrite(image_path, cropped)
     return image_path
 
-def check_if_recently_saved(category, obj_id, timestamp, cooldown=10):
-    base_dir = f"{IMAGES_CORE}/{category}/{obj_id}"
-    if os.path.isdir(base_dir):
-        files = [f for f in os.listdir(base_dir) if f.endswith(".jpg")]
-        if files:
-            latest_file = max(files, key=lambda f: datetime.strptime(f.split('.')[0], "%Y-%m-%d_%H-%M-%S"))
-            latest_timestamp = datetime.strptime(latest_file.split('.')[0], "%Y-%m-%d_%H-%M-%S")
-            
-            current_time = datetime.strptime(timestamp, "%Y-%m-%d_%H-%M-%S")
-            # logger.info(f"current time - latest_timestamp = {(current_time - latest_timestamp).total_seconds()}")
-            if (current_time - latest_timestamp).total_seconds() < cooldown:
-                return True
-    return False
+def read_packed(pack_path, offset, length):
+    with open(pack_path, "rb") as file:
+        file.seek(offset)
+        return file.read(length)
 
-def export(category_pl, obj_id, frame, bbox):
-    now = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    if not check_if_recently_saved(category_pl, obj_id, now):
-        image_path = save_image(category_pl, obj_id, frame, bbox, now)
-        logger.info(f"Saved image to {category_pl}, obj_id = {obj_id} // {now}")
+def read_image(image_path, pack=None):
+    # `pack` is (pack_path, offset, length) for images compacted by the storage manager.
+    if pack is None:
+        return cv2.imread(image_path)
+    try:
+        data = read_packed(*pack)
+    except OSError:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+def get_thumbnail(image_path, image_id, size, thumbnails_core=THUMBNAILS_CORE, quality=80, pack=None):
+    # Thumbnails are generated once and then served from disk; returns None if the source is gone.
+    thumb_path = os.path.join(thumbnails_core, str(size), f"{image_id}.jpg")
+    if os.path.isfile(thumb_path):
+        return thumb_path
+    image = read_image(image_path, pack)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    tmp_path = f"{thumb_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])[1])
+    os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+def parse_timestamp(name):
+    for fmt in (TIMESTAMP_FORMAT, LEGACY_TIMESTAMP_FORMAT):
+        try:
+            return datetime.strptime(name, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class LastSavedIndex:
+    # (category, obj_id) -> epoch of the last queued save. Built once from disk on first use;
+    # afterwards lookups never touch the filesystem. Entries older than `ttl` can no longer be
+    # inside any cooldown, so they are evicted, as are the least recently used beyond max_entries.
+    def __init__(self, images_core=IMAGES_CORE, max_entries=4096, ttl=3600):
+        self.images_core = images_core
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.loaded = False
+        self.lock = threading.Lock()
 
-        if "dog" in category_pl:
-            add_or_update_dog(obj_id, image_path, now, now)
+    def load(self):
+        cutoff = time.time() - self.ttl
+        found = []
+        if os.path.isdir(self.images_core):
+            for category in os.scandir(self.images_core):
+                if not category.is_dir():
+                    continue
+                for obj_dir in os.scandir(category.path):
+                    if not obj_dir.is_dir():
+                        continue
+                    stamps = [parse_timestamp(f.name[:-4]) for f in os.scandir(obj_dir.path) if f.name.endswith(".jpg")]
+                    stamps = [stamp.timestamp() for stamp in stamps if stamp is not None]
+                    if stamps and max(stamps) >= cutoff:
+                        found.append(((category.name, obj_dir.name), max(stamps)))
+        for key, last_saved in sorted(found, key=lambda entry: entry[1]):
+            self.entries[key] = last_saved
+        self.evict()
+        self.loaded = True
+        logger.info(f"Last-saved index rebuilt with {len(self.entries)} recent entries.")
+
+    def evict(self, now=None):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        cutoff = (now or time.time()) - self.ttl
+        for key in [key for key, last_saved in self.entries.items() if last_saved < cutoff]:
+            del self.entries[key]
+
+    def last_saved(self, category, obj_id):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            key = (str(category), str(obj_id))
+            last_saved = self.entries.get(key)
+            if last_saved is not None:
+                self.entries.move_to_end(key)
+            return last_saved
+
+    def record(self, category, obj_id, saved_at):
+        with self.lock:
+            key = (str(category), str(obj_id))
+            self.entries[key] = saved_at
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.evict(saved_at)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+last_saved_index = LastSavedIndex()
+
+def check_if_recently_saved(category, obj_id, timestamp, cooldown=10, index=last_saved_index):
+    if isinstance(timestamp, str):
+        timestamp = parse_timestamp(timestamp)
+    last_saved = index.last_saved(category, obj_id)
+    return last_saved is not None and timestamp.timestamp() - last_saved < cooldown
+
+def export(category_pl, obj_id, frame, bbox):
+    now_dt = datetime.now()
+    now = now_dt.strftime(TIMESTAMP_FORMAT)
+    if not check_if_recently_saved(category_pl, obj_id, now_dt):
+        cropped = crop_bbox(frame, bbox)
+        if cropped.size == 0:
+            return
+        # Encoding, the file write and the DB upsert happen on the archiver thread.
+        image_path = f"{IMAGES_CORE}/{category_pl}/{obj_id}/{now}.jpg"
+        item = ArchiveItem(image_path, cropped.copy(), category_pl, obj_id, now, now_dt.timestamp())
+        if get_archiver().submit(item):
+            last_saved_index.record(category_pl, obj_id, now_dt.timestamp())
+            logger.info(f"Queued image for {category_pl}, obj_id = {obj_id} // {now}")
@@ -0,0 +1,249 @@
+import bisect
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as StackCounter
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+# Upper bounds in seconds, from sub-millisecond bookkeeping up to multi-second inference.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    # Cumulative bucket counts for Prometheus plus a rolling window made of `slices` sub-histograms
+    # that are recycled as time moves on, so quantiles reflect only the last `window` seconds.
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=60.0, slices=6):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.slice_seconds = window / slices
+        self.slices = [[0] * (len(buckets) + 1) for _ in range(slices)]
+        self.slice_ids = [None] * slices
+        self.lock = threading.Lock()
+
+    def current_slice(self, now):
+        slice_id = int(now / self.slice_seconds)
+        position = slice_id % len(self.slices)
+        if self.slice_ids[position] != slice_id:
+            self.slices[position] = [0] * (len(self.buckets) + 1)
+            self.slice_ids[position] = slice_id
+        return self.slices[position]
+
+    def observe(self, value, now=None):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            self.current_slice(time.monotonic() if now is None else now)[index] += 1
+
+    def window_counts(self, now=None):
+        oldest = int((time.monotonic() if now is None else now) / self.slice_seconds) - len(self.slices) + 1
+        with self.lock:
+            counts = [0] * (len(self.buckets) + 1)
+            for slice_id, slice_counts in zip(self.slice_ids, self.slices):
+                if slice_id is not None and slice_id >= oldest:
+                    counts = [a + b for a, b in zip(counts, slice_counts)]
+        return counts
+
+    def quantile(self, q, now=None):
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus does.
+        counts = self.window_counts(now)
+        observed = sum(counts)
+        if not observed:
+            return None
+        rank = q * observed
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    # Stage timings and event counters. When disabled every call returns immediately and
+    # timer() hands out a shared no-op context manager, so instrumented code pays almost nothing.
+    def __init__(self, enabled=cfg.get("metrics.enabled", True), window=cfg.get("metrics.window", 60)):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def timer(self, name):
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram(window=self.window))
+        histogram.observe(seconds)
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        result = {}
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        for name, histogram in histograms:
+            p50, p95, p99 = (histogram.quantile(q) for q in (0.5, 0.95, 0.99))
+            if p50 is None:
+                continue
+            result[name] = {"count": sum(histogram.window_counts()), "p50_ms": round(1000 * p50, 2),
+                            "p95_ms": round(1000 * p95, 2), "p99_ms": round(1000 * p99, 2)}
+        return result
+
+    def render_prometheus(self, prefix="dogarchivist"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        quantiles = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        for name, histogram in histograms:
+            with histogram.lock:
+                counts, total, count = list(histogram.counts), histogram.total, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q)
+                if value is not None:
+                    quantiles.append(f'{prefix}_stage_seconds_window{{stage="{name}",quantile="{q}"}} {value:.6f}')
+        if quantiles:
+            lines.append(f"# HELP {prefix}_stage_seconds_window Stage time quantiles over the last {self.window} s.")
+            lines.append(f"# TYPE {prefix}_stage_seconds_window gauge")
+            lines.extend(quantiles)
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsReporter(threading.Thread):
+    def __init__(self, registry=metrics, interval=cfg.get("metrics.log_interval", 60)):
+        super().__init__(name="metrics-reporter", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            summary = self.registry.summary()
+            if summary:
+                parts = [f"{name} p50={s['p50_ms']}ms p95={s['p95_ms']}ms n={s['count']}" for name, s in summary.items()]
+                logger.info("Stage timings: " + "; ".join(parts))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class SamplingProfiler(threading.Thread):
+    # Samples the stacks of all other threads every `interval` seconds for `duration` seconds and
+    # writes them in collapsed-stack format ("a;b;c count"), which flamegraph tools read directly.
+    def __init__(self, duration, interval=cfg.get("metrics.profile_interval_ms", 5) / 1000,
+                 output_dir=cfg.get("metrics.profile_dir", "logs")):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.duration = duration
+        self.interval = interval
+        self.output_path = os.path.join(output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        self.stacks = StackCounter()
+        self.samples = 0
+
+    def run(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = [f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+                         for entry in traceback.extract_stack(frame)]
+                self.stacks[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        with open(self.output_path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        logger.info(f"Profile of {self.samples} samples written to {self.output_path}")
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def start_profile(seconds, max_seconds=cfg.get("metrics.profile_max_seconds", 60)):
+    # Returns the running profiler, or None if one is already in progress.
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None and _profiler.is_alive():
+            return None
+        _profiler = SamplingProfiler(min(seconds, max_seconds))
+        _profiler.start()
+        return _profiler
+
+
+def profile_status():
+    profiler = _profiler
+    if profiler is None:
+        return {"running": False}
+    return {"running": profiler.is_alive(), "samples": profiler.samples, "output": profiler.output_path}
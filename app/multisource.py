@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from app.broadcast import FrameBroadcaster
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+# Track IDs are per tracker, so each worker numbers its tracks from its own block to keep
+# image directories and sightings of different sources apart in the shared archive.
+ID_STRIDE = 1_000_000
+
+
+class FrameRelay:
+    # Worker-side stand-in for FrameBroadcaster: JPEGs go to the parent through a small queue,
+    # and the subscriber count the StreamEncoder checks is mirrored from the parent.
+    def __init__(self, frames, subscribers):
+        self.frames = frames
+        self.subscribers = subscribers
+        self.published = 0
+        self.dropped = 0
+
+    def subscriber_count(self):
+        return self.subscribers.value
+
+    def publish(self, buffer):
+        try:
+            self.frames.put_nowait(buffer)
+            self.published += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueArchiver:
+    # Worker-side stand-in for Archiver: items are pickled to the parent, which owns the only writer.
+    def __init__(self, items):
+        self.items = items
+
+    def submit(self, item):
+        try:
+            self.items.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+def run_worker(name, spec, index, threads, frames, archive_items, stats, subscribers, stop_event,
+               realtime=True, loop=True, stats_interval=1.0):
+    # Entry point of a worker process: one source, model, tracker and pipeline.
+    from app.base.inference import load_backend
+    from app.base.tracker import create_tracker
+    from app.bestshot import BestShotSelector
+    from app.pipeline import FramePipeline
+    from app.sources import open_source
+
+    source = open_source(spec, realtime=realtime, loop=loop)
+    model = load_backend(threads=threads)
+    tracker = create_tracker()
+    tracker.next_id = index * ID_STRIDE + 1
+    pipeline = FramePipeline(source, model, tracker, broadcaster=FrameRelay(frames, subscribers))
+    # Best shots and finished clips go to the parent's writer, so every row goes through it.
+    archiver = QueueArchiver(archive_items)
+    pipeline.bestshot = BestShotSelector(archiver=archiver)
+    if pipeline.clip_recorder is not None:
+        pipeline.clip_recorder.archiver = archiver
+    pipeline.start()
+
+    last_cpu, last_wall = cpu_seconds(), time.monotonic()
+    try:
+        while not stop_event.wait(stats_interval):
+            cpu, wall = cpu_seconds(), time.monotonic()
+            snapshot = pipeline.stats()
+            snapshot["pid"] = os.getpid()
+            snapshot["cpu_percent"] = round(100 * (cpu - last_cpu) / (wall - last_wall), 1)
+            snapshot["relay"] = {"published": pipeline.broadcaster.published, "dropped": pipeline.broadcaster.dropped}
+            last_cpu, last_wall = cpu, wall
+            try:
+                stats.put_nowait((name, snapshot))
+            except queue.Full:
+                pass
+            if pipeline.finished.is_set():
+                break
+    finally:
+        pipeline.stop()
+        source.close()
+
+
+class SourceHandle:
+    def __init__(self, name, spec, index, context):
+        self.name = name
+        self.spec = spec
+        self.index = index
+        self.frames = context.Queue(maxsize=2)
+        self.subscribers = context.Value("i", 0)
+        self.broadcaster = FrameBroadcaster()
+        self.process = None
+        self.stats = {}
+        self.stats_at = None
+
+    def relay_frames(self, stop_event):
+        while not stop_event.is_set():
+            self.subscribers.value = self.broadcaster.subscriber_count()
+            try:
+                buffer = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.broadcaster.publish(buffer)
+
+    def snapshot(self):
+        return {
+            "source": self.spec,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.process.is_alive() if self.process else False,
+            "exitcode": self.process.exitcode if self.process else None,
+            "stats_age_s": round(time.monotonic() - self.stats_at, 1) if self.stats_at else None,
+            "stream": self.broadcaster.stats(),
+            **self.stats,
+        }
+
+
+class MultiSourceManager:
+    # One worker process per configured source. The parent relays each worker's JPEGs to a
+    # per-source broadcaster, collects stats and feeds all archive items into one Archiver.
+    def __init__(self, sources=cfg.get("multisource.sources", []), threads_per_worker=None, archiver=None,
+                 worker=run_worker, realtime=cfg.get("multisource.realtime", True), loop=cfg.get("multisource.loop", True)):
+        self.context = multiprocessing.get_context("spawn")
+        self.handles = {}
+        for index, entry in enumerate(sources):
+            if entry["name"] in self.handles:
+                raise ValueError(f"Duplicate source name '{entry['name']}'")
+            self.handles[entry["name"]] = SourceHandle(entry["name"], entry["source"], index, self.context)
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // max(1, len(self.handles)))
+        self.threads_per_worker = threads_per_worker
+        self.archiver = archiver
+        self.worker = worker
+        self.worker_options = {"realtime": realtime, "loop": loop}
+        self.archive_items = self.context.Queue(maxsize=cfg.get("archive.queue_size", 64) * max(1, len(self.handles)))
+        self.stats_queue = self.context.Queue(maxsize=64)
+        self.stop_event = self.context.Event()
+        self.relay_stop = threading.Event()
+        self.threads = []
+
+    def start(self):
+        if self.archiver is None:
+            from app.archiver import get_archiver
+            self.archiver = get_archiver()
+        for handle in self.handles.values():
+            handle.process = self.context.Process(
+                target=self.worker, name=f"source-{handle.name}", daemon=True,
+                args=(handle.name, handle.spec, handle.index, self.threads_per_worker, handle.frames,
+                      self.archive_items, self.stats_queue, handle.subscribers, self.stop_event),
+                kwargs=self.worker_options)
+            handle.process.start()
+            self.spawn_thread(f"relay-{handle.name}", handle.relay_frames, self.relay_stop)
+            logger.info(f"Source '{handle.name}' ({handle.spec}) started in process {handle.process.pid}.")
+        self.spawn_thread("relay-archive", self.relay_archive)
+        self.spawn_thread("relay-stats", self.relay_stats)
+        return self
+
+    def spawn_thread(self, name, target, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def relay_archive(self):
+        while not self.relay_stop.is_set():
+            try:
+                item = self.archive_items.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.archiver.submit(item)
+
+    def relay_stats(self):
+        while not self.relay_stop.is_set():
+            try:
+                name, snapshot = self.stats_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            handle = self.handles[name]
+            handle.stats, handle.stats_at = snapshot, time.monotonic()
+
+    def stop(self, timeout=10):
+        self.stop_event.set()
+        for handle in self.handles.values():
+            if handle.process is not None:
+                handle.process.join(timeout)
+                if handle.process.is_alive():
+                    logger.warning(f"Source '{handle.name}' did not stop in time; terminating.")
+                    handle.process.terminate()
+        # Workers flush their best shots on stop; give the relay a moment to pass them on.
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and not self.archive_items.empty():
+            time.sleep(0.05)
+        self.relay_stop.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        logger.info("All sources stopped.")
+
+    def broadcaster(self, name):
+        return self.handles[name].broadcaster
+
+    def stats(self):
+        return {name: handle.snapshot() for name, handle in self.handles.items()}
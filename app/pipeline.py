@@ -0,0 +1,397 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from app.base.detection import detect_objects, detect_in_regions, detect_tiled, filter_duplicate_detections
+from app.base.batching import BatchedInference
+from app.base.motion import MotionGate
+from app.base.tracker import update_trackers_with_yolo
+from app.broadcast import FrameBroadcaster
+from app.encoder import StreamEncoder
+from app.framebuffer import FrameRing
+from app.sources import read_into
+from app.archiver import archiver_stats
+from app.bestshot import BestShotSelector
+from app.clips import ClipRecorder
+from app.io import export
+from app.metrics import MetricsReporter, metrics
+from app.scheduler import AdaptiveDetectionScheduler
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class BoundedQueue:
+    # Fixed-size FIFO that never blocks the producer: when full, the oldest item is dropped.
+    def __init__(self, maxsize):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+    def get_nowait(self):
+        with self.cond:
+            return self.items.popleft() if self.items else None
+
+    def qsize(self):
+        return len(self.items)
+
+
+class StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.busy_time = 0.0
+        self.started = time.monotonic()
+        self.window_start = self.started
+        self.window_count = 0
+        self.fps = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, duration):
+        with self.lock:
+            self.processed += 1
+            self.busy_time += duration
+            self.window_count += 1
+            now = time.monotonic()
+            elapsed = now - self.window_start
+            if elapsed >= 1.0:
+                self.fps = self.window_count / elapsed
+                self.window_start = now
+                self.window_count = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "processed": self.processed,
+                "fps": round(self.fps, 2),
+                "avg_ms": round(1000 * self.busy_time / self.processed, 2) if self.processed else 0.0,
+            }
+
+
+class FramePacket:
+    __slots__ = ("seq", "timestamp", "image", "tracked")
+
+    def __init__(self, seq, timestamp, image):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+        # Set by the tracking stage; None until it has processed the packet.
+        self.tracked = None
+
+
+class DetectionResult:
+    # Detections together with the packet of the frame they were found on, whose `tracked` says
+    # where the tracks were on that frame once the tracking stage has got to it. `regions` are
+    # the (x, y, w, h) rectangles inference ran on, or None for the whole frame.
+    __slots__ = ("packet", "detections", "regions")
+
+    def __init__(self, packet, detections, regions=None):
+        self.packet = packet
+        self.detections = detections
+        self.regions = regions
+
+
+class Stage(threading.Thread):
+    def __init__(self, name, func, inbox=None, outboxes=()):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.inbox = inbox
+        self.outboxes = outboxes
+        self.stats = StageStats()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        logger.info(f"Pipeline stage '{self.stage_name}' started.")
+        while not self.stop_event.is_set():
+            if self.inbox is not None:
+                item = self.inbox.get(timeout=0.5)
+                if item is None:
+                    continue
+            else:
+                item = None
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                logger.error(f"Error in pipeline stage '{self.stage_name}': {e}")
+                continue
+            duration = time.perf_counter() - start
+            self.stats.record(duration)
+            metrics.observe(self.stage_name, duration)
+
+            if result is not None:
+                for outbox in self.outboxes:
+                    outbox.put(result)
+        logger.info(f"Pipeline stage '{self.stage_name}' stopped.")
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class FramePipeline:
+    # capture -> tracking -> encode -> broadcaster
+    #    \          ^   \
+    #     inference-'    archive, clips
+    def __init__(self, camera, model, tracker, broadcaster=None, queue_size=cfg.get("pipeline.queue_size", 4)):
+        self.camera = camera
+        self.model = model
+        self.tracker = tracker
+        self.broadcaster = broadcaster or FrameBroadcaster()
+        self.stream_encoder = StreamEncoder(self.broadcaster)
+        self.scheduler = AdaptiveDetectionScheduler()
+        self.motion_gate = MotionGate() if cfg.get("detection.motion_gate.enabled", True) else None
+        self.classes = cfg.get("detection.classes")
+        self.tiling = cfg.get("detection.tiling.enabled", False)
+        self.archive_enabled = cfg.get("pipeline.archive", True)
+        self.bestshot = BestShotSelector() if cfg.get("bestshot.enabled", True) else None
+        self.clip_recorder = ClipRecorder() if cfg.get("clips.enabled", False) else None
+        self.max_detection_age = cfg.get("pipeline.max_detection_age", 1.0)
+        self.stale_detections = 0
+        self.seq = 0
+        self.finished = threading.Event()
+        self.reporter = MetricsReporter() if metrics.enabled and cfg.get("metrics.log_interval", 60) else None
+
+        self.queues = {
+            "tracking": BoundedQueue(queue_size),
+            "inference": BoundedQueue(1),
+            "detections": BoundedQueue(1),
+            "encode": BoundedQueue(queue_size),
+            "archive": BoundedQueue(queue_size),
+        }
+        if self.clip_recorder is not None:
+            self.queues["clips"] = BoundedQueue(queue_size)
+        q = self.queues
+        side_out = (q["archive"],) if self.archive_enabled else ()
+        if self.clip_recorder is not None:
+            side_out += (q["clips"],)
+        self.stages = [
+            Stage("capture", self.capture, None, ()),
+            Stage("inference", self.infer, q["inference"], (q["detections"],)),
+            Stage("tracking", self.track, q["tracking"], (q["encode"],) + side_out),
+            Stage("encode", self.encode, q["encode"]),
+        ]
+        if self.archive_enabled:
+            self.stages.append(Stage("archive", self.archive, q["archive"]))
+        if self.clip_recorder is not None:
+            self.stages.append(Stage("clips", self.record_clip, q["clips"]))
+        # Frames are captured into a preallocated ring and passed on as read-only views. Every
+        # packet still referenced sits in a queue or a stage, so this many slots never run out.
+        self.ring_enabled = cfg.get("pipeline.frame_ring.enabled", True)
+        self.ring_shared = cfg.get("pipeline.frame_ring.shared", True)
+        self.ring_slots = cfg.get("pipeline.frame_ring.slots") or \
+            sum(q.items.maxlen for q in self.queues.values()) + len(self.stages) + 1
+        self.ring = None
+        self.started = False
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        with self.start_lock:
+            if self.started:
+                return
+            for stage in self.stages:
+                stage.start()
+            if self.reporter is not None:
+                self.reporter.start()
+            if self.clip_recorder is not None:
+                self.clip_recorder.start()
+            self.started = True
+        logger.info("Frame pipeline started.")
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(timeout=2)
+        if self.reporter is not None:
+            self.reporter.stop()
+        if self.bestshot is not None:
+            self.bestshot.flush_all()
+        if self.clip_recorder is not None:
+            self.clip_recorder.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self.started = False
+        logger.info("Frame pipeline stopped.")
+
+    def read_frame(self):
+        if not self.ring_enabled:
+            return time.time(), self.camera.capture_array()
+        if self.ring is None:
+            # The ring is sized from the first frame.
+            image = self.camera.capture_array()
+            if image is None:
+                return None, None
+            self.ring = FrameRing(image.shape, self.ring_slots, shared=self.ring_shared)
+            logger.info(f"Frame ring: {self.ring_slots} slots of {image.shape} in {self.ring.name or 'process memory'}.")
+            slot, buffer = self.ring.acquire()
+            np.copyto(buffer, image)
+        else:
+            slot, buffer = self.ring.acquire()
+            if read_into(self.camera, buffer) is None:
+                return None, None
+        timestamp = time.time()
+        return timestamp, self.ring.commit(slot, self.seq, timestamp)
+
+    def capture(self, _):
+        timestamp, image = self.read_frame()
+        if image is None:
+            # A recorded source ran out; the downstream stages drain what is queued.
+            self.stage("capture").stop_event.set()
+            self.finished.set()
+            logger.info("Frame source exhausted.")
+            return None
+        metrics.inc("frames_captured")
+        packet = FramePacket(self.seq, timestamp, image)
+        self.queues["tracking"].put(packet)
+        if self.scheduler.should_detect(image, self.stage("capture").stats.fps):
+            self.queues["inference"].put(packet)
+        self.seq += 1
+        return None
+
+    def infer(self, packet):
+        start = time.perf_counter()
+        regions = self.motion_gate.regions(packet.image) if self.motion_gate is not None else None
+        if regions is None and self.tiling:
+            detections = detect_tiled(self.model, packet.image, self.classes)
+        elif regions is None:
+            detections = detect_objects(self.model, packet.image, self.classes)
+        elif regions:
+            detections = detect_in_regions(self.model, packet.image, self.classes, regions)
+        else:
+            # Nothing moved since the last sampled frame: keep the trackers running without inference.
+            return None
+        detections = filter_duplicate_detections(detections)
+        self.scheduler.record_inference(time.perf_counter() - start)
+        metrics.inc("inferences")
+        metrics.inc("detections", len(detections))
+        for detection in detections:
+            logger.info(f"Detections = {detection.to_tuple()}")
+        return DetectionResult(packet, detections, regions)
+
+    def track(self, packet):
+        # Detections arrive asynchronously, usually for a frame the trackers have already moved
+        # past. Results older than max_detection_age are dropped; younger ones are passed with
+        # their source frame and the tracks as they were on it, so the tracker matches against
+        # those boxes and never re-initialises on pixels the detections don't belong to.
+        result = self.queues["detections"].get_nowait()
+        if result is not None and packet.timestamp - result.packet.timestamp > self.max_detection_age:
+            self.stale_detections += 1
+            metrics.inc("stale_detections")
+            result = None
+        live_before = set(self.tracker.trackers)
+        with metrics.timer("tracker_update"):
+            if result is not None:
+                source = result.packet
+                if source is packet:
+                    tracked_objects = update_trackers_with_yolo(packet.image, result.detections, self.tracker,
+                                                                regions=result.regions)
+                else:
+                    tracked_objects = update_trackers_with_yolo(packet.image, result.detections, self.tracker,
+                                                                source.image, source.tracked, result.regions)
+            else:
+                tracked_objects = self.tracker.update_trackers(packet.image)
+        self.scheduler.observe_tracks(len(tracked_objects), len(live_before - set(tracked_objects)))
+        if hasattr(tracked_objects, "snapshot"):
+            # A TrackStore: its columns are copied once instead of a tuple and BBox per track.
+            packet.tracked = tracked_objects.snapshot()
+        else:
+            packet.tracked = {obj_id: (obj.category, obj.bbox, getattr(obj, "confidence", 1.0))
+                              for obj_id, obj in tracked_objects.items() if obj.bbox}
+        return packet
+
+    def encode(self, packet):
+        self.stream_encoder.encode(packet.image, packet.tracked, self.stage("capture").stats.fps)
+        return None
+
+    def archive(self, packet):
+        if self.bestshot is None:
+            for obj_id, (category, bbox, _) in packet.tracked.items():
+                category_pl = category.to_plural()
+                if category_pl:
+                    export(category_pl, obj_id, packet.image, bbox)
+            return None
+
+        live = set()
+        for obj_id, (category, bbox, confidence) in packet.tracked.items():
+            category_pl = category.to_plural()
+            if category_pl:
+                live.add((category_pl, obj_id))
+                self.bestshot.offer(category_pl, obj_id, packet.image, bbox, confidence, packet.timestamp)
+        self.bestshot.end_missing(live)
+        self.bestshot.flush_due(packet.timestamp)
+        return None
+
+    def record_clip(self, packet):
+        self.clip_recorder.record(packet.timestamp, packet.image, packet.tracked)
+        return None
+
+    def step(self, image, timestamp=None, capture_fps=None):
+        # Runs one frame through every stage on the calling thread. Used for offline replay,
+        # where results must not depend on thread scheduling or dropped queue items.
+        packet = FramePacket(self.seq, time.time() if timestamp is None else timestamp, image)
+        self.seq += 1
+        timings = {}
+        if self.scheduler.should_detect(image, capture_fps):
+            start = time.perf_counter()
+            result = self.infer(packet)
+            timings["inference"] = time.perf_counter() - start
+            if result is not None:
+                self.queues["detections"].put(result)
+        funcs = [("tracking", self.track), ("encode", self.encode)]
+        if self.archive_enabled:
+            funcs.append(("archive", self.archive))
+        if self.clip_recorder is not None:
+            funcs.append(("clips", self.record_clip))
+        for name, func in funcs:
+            start = time.perf_counter()
+            func(packet)
+            timings[name] = time.perf_counter() - start
+        for name, duration in timings.items():
+            self.stage(name).stats.record(duration)
+            metrics.observe(name, duration)
+        return timings
+
+    def stage(self, name):
+        for stage in self.stages:
+            if stage.stage_name == name:
+                return stage
+        raise KeyError(name)
+
+    def stats(self):
+        stats = {}
+        for stage in self.stages:
+            stats[stage.stage_name] = stage.stats.snapshot()
+            if stage.inbox is not None:
+                stats[stage.stage_name]["queue_depth"] = stage.inbox.qsize()
+                stats[stage.stage_name]["dropped"] = stage.inbox.dropped
+        stats["stream_encoder"] = self.stream_encoder.stats()
+        stats["tracking"]["stale_detections"] = self.stale_detections
+        stats["scheduler"] = self.scheduler.stats()
+        stats["archiver"] = archiver_stats()
+        if self.bestshot is not None:
+            stats["bestshot"] = self.bestshot.stats()
+        if self.clip_recorder is not None:
+            stats["clips"] = self.clip_recorder.stats()
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        if isinstance(self.model, BatchedInference):
+            stats["inference_service"] = self.model.stats()
+        if self.ring is not None:
+            stats["frame_ring"] = self.ring.stats()
+        return stats
@@ -1,72 +1,116 @@
-from flask import Blueprint, Response
-from app.camera import initialize_camera
-from app.base.detection import load_model, detect_objects, filter_duplicate_detections
-from app.base.tracker import OpenCVTracker, update_trackers_with_yolo
+from flask import Blueprint, Response, abort, jsonify, request
+from app.services import services, startup_services
+from app.metrics import metrics, profile_status, start_profile
 from app.logger import get_logger
 from app.config.config import Config
-import cv2
-import time
 
 main = Blueprint("main", __name__)
-camera = initialize_camera()
-model = load_model()
-tracker = OpenCVTracker()
 logger = get_logger(__name__)
 cfg = Config()
 
 
+def mjpeg_response(broadcaster):
+    subscription = broadcaster.subscribe()
+
+    def generate_frames():
+        try:
+            while True:
+                buffer = subscription.next_frame()
+                if buffer is None:
+                    continue
+                # Yield the shared JPEG bytes as their own chunk to avoid copying them per client.
+                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+                yield buffer
+                yield b'\r\n'
+        finally:
+            subscription.close()
+
+    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
 @main.route("/")
 def video_feed():
     logger.info("Starting video stream...")
     try:
-        def generate_frames():
-            prev_time = time.time()
-            frame_count = 0
+        pipeline = services.get("pipeline")
+        pipeline.start()
+        return mjpeg_response(pipeline.broadcaster)
+    except Exception as e:
+        logger.error(f"Error while streaming: {e}")
+        return Response(status=500)
 
-            while True:
-                frame = camera.capture_array()
-
-                if frame_count % cfg.get("detection.detect_every_n_frames") == 0:
-                    detections = detect_objects(model, frame, cfg.get("detection.classes"))
-                    detections = filter_duplicate_detections(detections)
-                    for detection in detections:
-                        logger.info(f"Detections = {detection.to_tuple()}")
-                    tracked_objects = update_trackers_with_yolo(frame, detections, tracker)
-                else:
-                    tracked_objects = tracker.update_trackers(frame)
-                    
-                for obj_id, tracker_obj in tracked_objects.items():
-                    if not tracker_obj.bbox:
-                        continue
-                    
-                    bbox = tracker_obj.bbox
-                    category = tracker_obj.category
-
-                    x, y, w, h = [int(v) for v in bbox.to_tuple()]
-
-                    category_pl = category.to_plural()
-                    if not category_pl:
-                        continue
-
-                    color = (0, 255, 0) if category == "dog" else (255, 0, 0)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                    cv2.putText(frame, f"{category.capitalize()} ID {obj_id}", (x, y - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-
-                current_time = time.time()
-                elapsed_time = current_time - prev_time
-                fps = 1 / elapsed_time if elapsed_time > 0 else 0
-                prev_time = current_time
-
-                cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                frame_count += 1
-
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-        return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@main.route("/sources")
+def list_sources():
+    manager = services.peek("sources")
+    if manager is None:
+        return jsonify({"ready": False, "services": services.status()}), 503
+    return jsonify(manager.stats())
+
+
+@main.route("/sources/<name>")
+def source_feed(name):
+    try:
+        manager = services.get("sources")
     except Exception as e:
-        logger.error(f"Error while streaming: {e}")
+        logger.error(f"Error while streaming source '{name}': {e}")
         return Response(status=500)
+    if name not in manager.handles:
+        abort(404)
+    logger.info(f"Starting video stream for source '{name}'...")
+    return mjpeg_response(manager.broadcaster(name))
+
+
+@main.route("/sources/<name>/stats")
+def source_stats(name):
+    manager = services.peek("sources")
+    if manager is None:
+        return jsonify({"ready": False, "services": services.status()}), 503
+    if name not in manager.handles:
+        abort(404)
+    return jsonify(manager.handles[name].snapshot())
+
+
+@main.route("/ready")
+def readiness():
+    # 200 once the camera(s), model and pipeline are up; 503 while they are still loading or failed.
+    ready = services.ready(*startup_services())
+    return jsonify({"ready": ready, "services": services.status()}), 200 if ready else 503
+
+
+@main.route("/stats")
+def pipeline_stats():
+    pipeline = services.peek("pipeline")
+    if pipeline is None:
+        return jsonify({"ready": False, "services": services.status()}), 503
+    stats = pipeline.stats()
+    stats["stream"] = pipeline.broadcaster.stats()
+    return jsonify(stats)
+
+
+@main.route("/storage")
+def storage_stats():
+    manager = services.peek("storage")
+    if manager is None:
+        return jsonify({"ready": False, "services": services.status()}), 503
+    return jsonify(manager.stats())
+
+
+@main.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@main.route("/metrics/profile", methods=["GET", "POST"])
+def sampling_profile():
+    if request.method == "GET":
+        return jsonify(profile_status())
+    try:
+        seconds = float(request.args.get("seconds", 10))
+    except ValueError:
+        return jsonify({"error": "seconds must be a number"}), 400
+    profiler = start_profile(seconds)
+    if profiler is None:
+        return jsonify({"error": "A profile is already running", **profile_status()}), 409
+    logger.info(f"Sampling profile started for {profiler.duration:.0f} s")
+    return jsonify(profile_status()), 202
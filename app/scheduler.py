@@ -0,0 +1,110 @@
+import math
+import threading
+import cv2
+import numpy as np
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class AdaptiveDetectionScheduler:
+    # Decides per captured frame whether to run the detector. Activity (motion, lost tracks)
+    # pulls the interval down to min_interval; a static, empty scene backs off to max_interval.
+    def __init__(self, enabled=cfg.get("detection.scheduler.enabled", True),
+                 base_interval=cfg.get("detection.detect_every_n_frames"),
+                 min_interval=cfg.get("detection.scheduler.min_interval", 3),
+                 max_interval=cfg.get("detection.scheduler.max_interval", 60),
+                 motion_threshold=cfg.get("detection.scheduler.motion_threshold", 4.0),
+                 inference_budget=cfg.get("detection.scheduler.inference_budget", 0.5),
+                 motion_width=cfg.get("detection.scheduler.motion_width", 160)):
+        self.enabled = enabled
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.motion_threshold = motion_threshold
+        self.inference_budget = inference_budget
+        self.motion_width = motion_width
+
+        self.interval = base_interval
+        self.frames_since_detection = 0
+        self.frame_count = 0
+        self.prev_small = None
+        self.motion_energy = 0.0
+        self.live_tracks = 0
+        self.lost_tracks = 0
+        self.inference_time = None
+        self.capture_fps = 0.0
+        self.detections_requested = 0
+        self.lock = threading.Lock()
+
+    def measure_motion(self, frame):
+        height, width = frame.shape[:2]
+        small_height = max(1, int(height * self.motion_width / width))
+        small = cv2.resize(frame, (self.motion_width, small_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        energy = 0.0 if self.prev_small is None else float(np.mean(cv2.absdiff(small, self.prev_small)))
+        self.prev_small = small
+        return energy
+
+    def budget_interval(self):
+        # Smallest interval that keeps inference within its share of wall-clock time.
+        if not self.inference_time or not self.capture_fps or not self.inference_budget:
+            return 1
+        return max(1, math.ceil(self.inference_time * self.capture_fps / self.inference_budget))
+
+    def choose_interval(self):
+        with self.lock:
+            active = self.motion_energy >= self.motion_threshold or self.lost_tracks > 0
+            live_tracks = self.live_tracks
+            self.lost_tracks = 0
+        if active:
+            interval = self.min_interval
+        elif live_tracks > 0:
+            interval = self.base_interval
+        else:
+            interval = min(self.max_interval, max(self.interval, self.base_interval) * 2)
+        return max(interval, self.budget_interval())
+
+    def should_detect(self, frame, capture_fps=None):
+        if capture_fps:
+            self.capture_fps = capture_fps
+        first = self.frame_count == 0
+        self.frame_count += 1
+        if self.enabled:
+            self.motion_energy = self.measure_motion(frame)
+            if self.motion_energy >= self.motion_threshold:
+                # React to a motion spike without waiting out a long heartbeat interval.
+                self.interval = min(self.interval, max(self.min_interval, self.budget_interval()))
+
+        detect = first or self.frames_since_detection + 1 >= self.interval
+        if detect:
+            self.frames_since_detection = 0
+            self.detections_requested += 1
+            if self.enabled:
+                self.interval = self.choose_interval()
+        else:
+            self.frames_since_detection += 1
+        return detect
+
+    def observe_tracks(self, live_tracks, lost_tracks):
+        with self.lock:
+            self.live_tracks = live_tracks
+            self.lost_tracks += lost_tracks
+
+    def record_inference(self, duration):
+        self.inference_time = duration if self.inference_time is None else 0.8 * self.inference_time + 0.2 * duration
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "interval": self.interval,
+            "motion_energy": round(self.motion_energy, 2),
+            "live_tracks": self.live_tracks,
+            "lost_tracks": self.lost_tracks,
+            "inference_ms": round(1000 * self.inference_time, 2) if self.inference_time else None,
+            "budget_interval": self.budget_interval(),
+            "detections_requested": self.detections_requested,
+            "frames": self.frame_count,
+        }
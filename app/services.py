@@ -0,0 +1,134 @@
+import threading
+import time
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+
+class Service:
+    __slots__ = ("name", "factory", "instance", "state", "error", "load_seconds", "lock")
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    # Named resources created on first use (or by a background warm-up) instead of at import time.
+    # A factory runs once; if it fails, the error is recorded and the next get() tries again.
+    def __init__(self):
+        self.services = {}
+
+    def register(self, name, factory):
+        self.services[name] = Service(name, factory)
+
+    def get(self, name):
+        service = self.services[name]
+        if service.state == "ready":
+            return service.instance
+        with service.lock:
+            if service.state != "ready":
+                service.state = "loading"
+                start = time.perf_counter()
+                try:
+                    service.instance = service.factory()
+                except Exception as e:
+                    service.state = "failed"
+                    service.error = str(e)
+                    logger.error(f"Service '{name}' failed to start: {e}")
+                    raise RuntimeError(f"Service '{name}' is unavailable: {e}")
+                service.load_seconds = time.perf_counter() - start
+                service.error = None
+                service.state = "ready"
+                logger.info(f"Service '{name}' ready in {service.load_seconds:.2f}s.")
+        return service.instance
+
+    def peek(self, name):
+        # The instance if it has already been created, without triggering creation.
+        service = self.services.get(name)
+        return service.instance if service is not None and service.state == "ready" else None
+
+    def ready(self, *names):
+        return all(self.services[name].state == "ready" for name in names or self.services)
+
+    def warm_up(self, *names):
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except RuntimeError:
+                    pass
+        thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            name: {"state": service.state, "error": service.error,
+                   "load_seconds": round(service.load_seconds, 2) if service.load_seconds is not None else None}
+            for name, service in self.services.items()
+        }
+
+
+def create_source():
+    from app.sources import open_source
+    return open_source(realtime=True, loop=True)
+
+
+def create_model():
+    from app.base.inference import load_backend
+    model = load_backend()
+    if cfg.get("detection.batching.enabled", False):
+        from app.base.batching import BatchedInference
+        model = BatchedInference(model)
+        model.start()
+    return model
+
+
+def create_tracker():
+    from app.base.tracker import create_tracker
+    return create_tracker()
+
+
+def create_pipeline():
+    from app.pipeline import FramePipeline
+    return FramePipeline(services.get("camera"), services.get("model"), services.get("tracker"))
+
+
+def create_sources():
+    from app.multisource import MultiSourceManager
+    import atexit
+    manager = MultiSourceManager().start()
+    atexit.register(manager.stop)
+    return manager
+
+
+def create_storage():
+    from app.storage import StorageManager
+    import atexit
+    manager = StorageManager()
+    manager.start()
+    atexit.register(manager.stop)
+    return manager
+
+
+def startup_services():
+    # What has to be up before the app can stream, depending on single- or multi-source mode.
+    if cfg.get("multisource.enabled", False):
+        return ("sources",)
+    return ("camera", "model", "tracker", "pipeline")
+
+
+services = ServiceRegistry()
+services.register("camera", create_source)
+services.register("model", create_model)
+services.register("tracker", create_tracker)
+services.register("pipeline", create_pipeline)
+services.register("sources", create_sources)
+services.register("storage", create_storage)
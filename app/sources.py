@@ -0,0 +1,156 @@
+import os
+import time
+import cv2
+import numpy as np
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    # Everything the pipeline reads frames from. read() returns None once the source is exhausted;
+    # capture_array() keeps the Picamera2 name so a source can stand in for the camera.
+    # Sources that can decode straight into a caller's buffer do so when read() is given `out`.
+    fps = None
+
+    def read(self, out=None):
+        raise NotImplementedError
+
+    def read_into(self, out):
+        frame = self.read(out)
+        if frame is None:
+            return None
+        if not np.may_share_memory(frame, out):
+            np.copyto(out, frame)
+        return out
+
+    def capture_array(self):
+        return self.read()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CameraSource(FrameSource):
+    def __init__(self, camera=None):
+        if camera is None:
+            from app.camera import initialize_camera
+            camera = initialize_camera()
+        self.camera = camera
+        self.fps = cfg.get("camera.frame_rate")
+
+    def read(self, out=None):
+        # Picamera2 recycles its request buffers, so the frame is copied out of them once either way.
+        return self.camera.capture_array()
+
+    def close(self):
+        self.camera.stop()
+
+
+class ReplaySource(FrameSource):
+    # Shared pacing/looping for recorded sources. With realtime=False frames are returned as
+    # fast as they can be decoded, which is what the offline benchmark wants.
+    def __init__(self, fps=None, loop=False, realtime=False):
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self.frames_read = 0
+        self.next_due = None
+
+    def pace(self):
+        if not self.realtime or not self.fps:
+            return
+        now = time.monotonic()
+        if self.next_due is not None and self.next_due > now:
+            time.sleep(self.next_due - now)
+        self.next_due = max(now, self.next_due or now) + 1.0 / self.fps
+
+    def read(self, out=None):
+        frame = self.read_next(out)
+        if frame is None and self.loop and self.frames_read:
+            self.rewind()
+            frame = self.read_next(out)
+        if frame is None:
+            return None
+        self.pace()
+        self.frames_read += 1
+        return frame
+
+    def read_next(self, out=None):
+        raise NotImplementedError
+
+    def rewind(self):
+        raise NotImplementedError
+
+
+class VideoFileSource(ReplaySource):
+    def __init__(self, path, fps=None, loop=False, realtime=False):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video file '{path}'")
+        super().__init__(fps or self.capture.get(cv2.CAP_PROP_FPS) or None, loop, realtime)
+
+    def read_next(self, out=None):
+        ok, frame = self.capture.read(out)
+        return frame if ok else None
+
+    def rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def close(self):
+        self.capture.release()
+
+
+class ImageDirectorySource(ReplaySource):
+    def __init__(self, path, fps=cfg.get("camera.frame_rate"), loop=False, realtime=False):
+        self.path = path
+        self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise ValueError(f"No images found in '{path}'")
+        self.position = 0
+        super().__init__(fps, loop, realtime)
+
+    def read_next(self, out=None):
+        while self.position < len(self.files):
+            frame = cv2.imread(self.files[self.position])
+            self.position += 1
+            if frame is not None:
+                return frame
+            logger.warning(f"Skipping unreadable image {self.files[self.position - 1]}")
+        return None
+
+    def rewind(self):
+        self.position = 0
+
+
+def read_into(source, out):
+    # Fills `out` from a FrameSource or anything with a Picamera2-style capture_array().
+    if isinstance(source, FrameSource):
+        return source.read_into(out)
+    frame = source.capture_array()
+    if frame is None:
+        return None
+    np.copyto(out, frame)
+    return out
+
+
+def open_source(spec=cfg.get("camera.source", "camera"), **kwargs):
+    # "camera", a directory of images, a video file or a stream URL such as rtsp://...
+    if spec == "camera":
+        return CameraSource()
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, **kwargs)
+    if os.path.isfile(spec) or "://" in spec:
+        return VideoFileSource(spec, **kwargs)
+    raise ValueError(f"Unknown frame source '{spec}'")
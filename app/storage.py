@@ -0,0 +1,424 @@
+import os
+import shutil
+import struct
+import threading
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+from app.clips import CLIPS_CORE
+from app.database import connect, initialize_database
+from app.io import IMAGES_CORE, THUMBNAILS_CORE
+from app.logger import get_logger
+logger = get_logger(__name__)
+from app.config.config import Config
+cfg = Config()
+
+PACKS_CORE = "static/packs"
+DAY = 86400
+MB = 2 ** 20
+# Every packed JPEG is preceded by a magic, its image id and its length, so a pack can be
+# re-indexed from the file alone if the database is lost.
+RECORD_HEADER = struct.Struct("<4sqI")
+RECORD_MAGIC = b"DAPK"
+
+LOOSE_TO_COMPACT = '''
+    SELECT images.id, images.path, images.ts FROM images JOIN entities ON entities.id = images.entity_id
+    WHERE images.pack_id IS NULL AND entities.category = ? AND images.ts < ? ORDER BY images.ts LIMIT ?
+'''
+EXPIRED_IMAGES = '''
+    SELECT images.id, images.path, images.pack_id, images.bytes FROM images JOIN entities ON entities.id = images.entity_id
+    WHERE entities.category = ? AND images.ts < ? ORDER BY images.ts LIMIT ?
+'''
+OLDEST_IMAGES = "SELECT id, path, pack_id, bytes FROM images ORDER BY ts, id LIMIT ?"
+PACK_IMAGES = "SELECT id, path, pack_id, bytes FROM images WHERE pack_id = ?"
+UNSIZED_IMAGES = "SELECT id, path FROM images WHERE pack_id IS NULL AND bytes IS NULL LIMIT ?"
+PACK_IMAGE = "UPDATE images SET pack_id = ?, pack_offset = ?, pack_length = ?, bytes = NULL WHERE id = ?"
+# Several clip rows (one per track in it) share a clip file; its bytes count once.
+EXPIRED_CLIPS = '''
+    SELECT clips.id, clips.path FROM clips JOIN entities ON entities.id = clips.entity_id
+    WHERE entities.category = ? AND clips.end_ts < ? LIMIT ?
+'''
+OLDEST_CLIP = "SELECT path, start_ts FROM clips ORDER BY start_ts LIMIT 1"
+CLIP_FILES = "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM (SELECT MAX(bytes) AS bytes FROM clips GROUP BY path)"
+
+
+class RateLimiter:
+    # Token bucket over bytes of disk IO, so a GC pass never saturates the SD card the
+    # archiver is writing to. Waits on the stop event so stopping is not delayed by it.
+    def __init__(self, bytes_per_second, stop_event):
+        self.rate = bytes_per_second
+        self.stop_event = stop_event
+        self.allowance = float(bytes_per_second or 0)
+        self.last = time.monotonic()
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate) - size
+        self.last = now
+        if self.allowance < 0:
+            self.stop_event.wait(-self.allowance / self.rate)
+
+
+class StorageManager(threading.Thread):
+    # Keeps the archive inside a disk budget with three tiers per category:
+    #   loose JPEGs under images_core while they are recent,
+    #   after compact_after_days, appended (optionally downscaled) to a monthly pack file per category,
+    #   after retention_days, deleted.
+    # Clip files are deleted after clip_retention_days, once no category still keeps a row for them.
+    # When the archive still exceeds budget_mb, or less than min_free_mb is left on the disk,
+    # the oldest images and clips are deleted first; a pack is deleted as a whole. Work happens in batches
+    # with IO rate limiting, on its own WAL connection, in a background thread.
+    def __init__(self, db_file=None, budget_mb=cfg.get("storage.budget_mb", 4096),
+                 min_free_mb=cfg.get("storage.min_free_mb", 512), interval=cfg.get("storage.interval", 600),
+                 batch_size=cfg.get("storage.batch_size", 100), io_rate_mb=cfg.get("storage.io_rate_mb", 4),
+                 pack_max_side=cfg.get("storage.pack_max_side", 0), pack_quality=cfg.get("storage.pack_quality", 0),
+                 policies=cfg.get("storage.categories", {}),
+                 default_policy=cfg.get("storage.default", {"compact_after_days": 7, "retention_days": 365,
+                                                            "clip_retention_days": 30}),
+                 images_core=IMAGES_CORE, packs_core=PACKS_CORE, thumbnails_core=THUMBNAILS_CORE, clips_core=CLIPS_CORE):
+        super().__init__(name="storage", daemon=True)
+        self.db_file = db_file
+        self.budget = budget_mb * MB if budget_mb else None
+        self.min_free = min_free_mb * MB if min_free_mb else 0
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pack_max_side = pack_max_side
+        self.pack_quality = pack_quality
+        self.policies = policies
+        self.default_policy = default_policy
+        self.images_core = images_core
+        self.packs_core = packs_core
+        self.thumbnails_core = thumbnails_core
+        self.clips_core = clips_core
+        self.stop_event = threading.Event()
+        self.limiter = RateLimiter(io_rate_mb * MB if io_rate_mb else None, self.stop_event)
+        self.lock = threading.Lock()
+        self.totals = {"compacted": 0, "expired": 0, "evicted": 0, "missing": 0, "clips_expired": 0,
+                       "clips_evicted": 0, "passes": 0}
+        self.last_pass = None
+
+    def policy(self, category):
+        return {**self.default_policy, **self.policies.get(category, {})}
+
+    def run(self):
+        try:
+            # Background IO should yield to capture; on Linux this lowers only this thread.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+        initialize_database(self.db_file)
+        while not self.stop_event.is_set():
+            try:
+                self.run_pass()
+            except Exception as e:
+                logger.error(f"Storage pass failed: {e}")
+            self.stop_event.wait(self.interval)
+        logger.info("Storage manager stopped.")
+
+    def run_pass(self, now=None):
+        now = time.time() if now is None else now
+        start = time.perf_counter()
+        summary = {"compacted": 0, "expired": 0, "evicted": 0, "missing": 0, "clips_expired": 0, "clips_evicted": 0}
+        with self.lock:
+            conn = connect(self.db_file)
+            try:
+                self.measure_loose(conn)
+                categories = {row[0] for row in conn.execute("SELECT DISTINCT category FROM entities")}
+                for category in sorted(categories):
+                    policy = self.policy(category)
+                    if policy.get("retention_days"):
+                        summary["expired"] += self.expire(conn, category, now - policy["retention_days"] * DAY)
+                    if policy.get("clip_retention_days"):
+                        summary["clips_expired"] += self.expire_clips(conn, category,
+                                                                      now - policy["clip_retention_days"] * DAY)
+                    if policy.get("compact_after_days"):
+                        compacted, missing = self.compact(conn, category, now - policy["compact_after_days"] * DAY)
+                        summary["compacted"] += compacted
+                        summary["missing"] += missing
+                summary["evicted"], summary["clips_evicted"] = self.enforce_budget(conn)
+                usage = self.usage(conn)
+            finally:
+                conn.close()
+        summary["seconds"] = round(time.perf_counter() - start, 2)
+        for key in ("compacted", "expired", "evicted", "missing", "clips_expired", "clips_evicted"):
+            self.totals[key] += summary[key]
+        self.totals["passes"] += 1
+        self.last_pass = {**summary, "at": int(now), "usage": usage}
+        if any(summary[key] for key in ("compacted", "expired", "evicted", "clips_expired", "clips_evicted")):
+            logger.info(f"Storage pass: {summary}, {usage['used_mb']} MB used.")
+        return summary
+
+    def measure_loose(self, conn):
+        # Rows written before sizes were recorded get theirs from the filesystem.
+        while not self.stop_event.is_set():
+            rows = conn.execute(UNSIZED_IMAGES, (self.batch_size,)).fetchall()
+            if not rows:
+                return
+            sizes = []
+            for image_id, path in rows:
+                try:
+                    sizes.append((os.path.getsize(path), image_id))
+                except OSError:
+                    sizes.append((0, image_id))
+            with conn:
+                conn.executemany("UPDATE images SET bytes = ? WHERE id = ?", sizes)
+
+    def expire(self, conn, category, cutoff):
+        expired = 0
+        while not self.stop_event.is_set():
+            rows = conn.execute(EXPIRED_IMAGES, (category, int(cutoff), self.batch_size)).fetchall()
+            if not rows:
+                break
+            self.delete_images(conn, rows)
+            expired += len(rows)
+        return expired
+
+    def expire_clips(self, conn, category, cutoff):
+        # Drops this category's rows of old clips; a file goes once no other category links to it.
+        expired = 0
+        while not self.stop_event.is_set():
+            rows = conn.execute(EXPIRED_CLIPS, (category, int(cutoff), self.batch_size)).fetchall()
+            if not rows:
+                break
+            with conn:
+                conn.executemany("DELETE FROM clips WHERE id = ?", [(row[0],) for row in rows])
+            for path in {row[1] for row in rows}:
+                if conn.execute("SELECT 1 FROM clips WHERE path = ? LIMIT 1", (path,)).fetchone() is None:
+                    self.remove_clip_file(path)
+                    expired += 1
+        return expired
+
+    def delete_clip(self, conn, path):
+        with conn:
+            conn.execute("DELETE FROM clips WHERE path = ?", (path,))
+        self.remove_clip_file(path)
+
+    def remove_clip_file(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        directory = os.path.dirname(path)
+        if os.path.abspath(directory).startswith(os.path.abspath(self.clips_core) + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def compact(self, conn, category, cutoff):
+        compacted = missing = 0
+        while not self.stop_event.is_set():
+            rows = conn.execute(LOOSE_TO_COMPACT, (category, int(cutoff), self.batch_size)).fetchall()
+            if not rows:
+                break
+            by_month = {}
+            for image_id, path, ts in rows:
+                by_month.setdefault(datetime.fromtimestamp(ts).strftime("%Y-%m"), []).append((image_id, path))
+            for month, images in by_month.items():
+                packed, gone = self.append_to_pack(conn, category, month, images)
+                compacted += packed
+                missing += gone
+        return compacted, missing
+
+    def pack_id(self, conn, category, path):
+        row = conn.execute("SELECT id FROM packs WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            return row[0]
+        with conn:
+            return conn.execute("INSERT INTO packs (category, path, size, created) VALUES (?, ?, 0, ?)",
+                                (category, path, int(time.time()))).lastrowid
+
+    def encode_for_pack(self, data):
+        if not self.pack_max_side and not self.pack_quality:
+            return data
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return data
+        height, width = image.shape[:2]
+        if self.pack_max_side and max(height, width) > self.pack_max_side:
+            scale = self.pack_max_side / max(height, width)
+            image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.pack_quality or 90])
+        # Re-encoding a small, already compressed crop can make it larger; keep the original then.
+        return buffer.tobytes() if ok and len(buffer) < len(data) else data
+
+    def append_to_pack(self, conn, category, month, images):
+        # The pack is appended and synced before the index points into it, and loose files are
+        # removed only after that commit; a crash leaves at worst dead bytes or a stray file.
+        pack_path = os.path.join(self.packs_core, category, f"{month}.pack")
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        pack_id = self.pack_id(conn, category, pack_path)
+        entries, gone = [], []
+        with open(pack_path, "ab") as pack:
+            for image_id, path in images:
+                try:
+                    with open(path, "rb") as file:
+                        data = file.read()
+                except OSError:
+                    gone.append((image_id, path, None, 0))
+                    continue
+                packed = self.encode_for_pack(data)
+                pack.write(RECORD_HEADER.pack(RECORD_MAGIC, image_id, len(packed)))
+                entries.append((pack_id, pack.tell(), len(packed), image_id))
+                pack.write(packed)
+                self.limiter.consume(len(data) + len(packed))
+            pack.flush()
+            os.fsync(pack.fileno())
+            size = pack.tell()
+        with conn:
+            conn.executemany(PACK_IMAGE, entries)
+            conn.execute("UPDATE packs SET size = ? WHERE id = ?", (size, pack_id))
+        for _, path in images:
+            self.remove_file(path)
+        if gone:
+            logger.warning(f"{len(gone)} {category} images were missing on disk; dropping their rows.")
+            self.delete_images(conn, gone)
+        return len(entries), len(gone)
+
+    def remove_file(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        # Drop the per-track directory once its last image is gone, to keep inode counts down.
+        directory = os.path.dirname(path)
+        if os.path.abspath(directory).startswith(os.path.abspath(self.images_core) + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def delete_images(self, conn, rows):
+        # rows are (id, path, pack_id, bytes). Packs left without images are deleted with them.
+        ids = [(row[0],) for row in rows]
+        packs = {row[2] for row in rows if row[2] is not None}
+        with conn:
+            conn.executemany("DELETE FROM images WHERE id = ?", ids)
+        for image_id, path, pack_id, size in rows:
+            if pack_id is None:
+                self.remove_file(path)
+                self.limiter.consume(size or 0)
+            for thumb_size in self.thumbnail_sizes():
+                try:
+                    os.remove(os.path.join(self.thumbnails_core, thumb_size, f"{image_id}.jpg"))
+                except FileNotFoundError:
+                    pass
+        for pack_id in packs:
+            if conn.execute("SELECT 1 FROM images WHERE pack_id = ? LIMIT 1", (pack_id,)).fetchone() is None:
+                path = conn.execute("SELECT path FROM packs WHERE id = ?", (pack_id,)).fetchone()[0]
+                with conn:
+                    conn.execute("DELETE FROM packs WHERE id = ?", (pack_id,))
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def thumbnail_sizes(self):
+        if not os.path.isdir(self.thumbnails_core):
+            return []
+        return [entry.name for entry in os.scandir(self.thumbnails_core) if entry.is_dir()]
+
+    def over_budget(self, conn):
+        # Bytes that have to go to get back under the budget and min_free; 0 when within both.
+        used = self.used_bytes(conn)
+        limit = self.budget
+        if self.min_free:
+            free = self.disk_free()
+            if free is not None:
+                # What can still be written without going under min_free on the card.
+                headroom = used + free - self.min_free
+                limit = headroom if limit is None else min(limit, headroom)
+        return max(0, used - limit) if limit is not None else 0
+
+    def enforce_budget(self, conn):
+        # Whichever is older goes first: the oldest clip file or the oldest images.
+        evicted = clips_evicted = 0
+        while not self.stop_event.is_set():
+            excess = self.over_budget(conn)
+            if not excess:
+                break
+            clip = conn.execute(OLDEST_CLIP).fetchone()
+            oldest_image = conn.execute("SELECT ts FROM images ORDER BY ts, id LIMIT 1").fetchone()
+            if clip is not None and (oldest_image is None or clip[1] <= oldest_image[0]):
+                self.delete_clip(conn, clip[0])
+                clips_evicted += 1
+                continue
+            rows = conn.execute(OLDEST_IMAGES, (self.batch_size,)).fetchall()
+            if not rows:
+                logger.warning("Storage budget exceeded with no images or clips left to delete.")
+                break
+            if rows[0][2] is not None:
+                # Space in a pack is only reclaimed when the whole pack goes.
+                rows = conn.execute(PACK_IMAGES, (rows[0][2],)).fetchall()
+            else:
+                loose = []
+                for row in rows:
+                    if row[2] is not None or excess <= 0:
+                        break
+                    loose.append(row)
+                    excess -= row[3] or 0
+                rows = loose
+            self.delete_images(conn, rows)
+            evicted += len(rows)
+        if evicted or clips_evicted:
+            logger.warning(f"Storage over budget: deleted the {evicted} oldest images and {clips_evicted} oldest clips.")
+        return evicted, clips_evicted
+
+    def used_bytes(self, conn):
+        loose = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images WHERE pack_id IS NULL").fetchone()[0]
+        packed = conn.execute("SELECT COALESCE(SUM(size), 0) FROM packs").fetchone()[0]
+        clips = conn.execute(CLIP_FILES).fetchone()[1]
+        return loose + packed + clips
+
+    def disk_free(self):
+        path = self.images_core if os.path.isdir(self.images_core) else "."
+        try:
+            return shutil.disk_usage(path).free
+        except OSError:
+            return None
+
+    def usage(self, conn):
+        loose_count, loose_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM images WHERE pack_id IS NULL").fetchone()
+        packed_count = conn.execute("SELECT COUNT(*) FROM images WHERE pack_id IS NOT NULL").fetchone()[0]
+        packs, pack_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM packs").fetchone()
+        categories = {
+            category: {"images": count, "oldest": oldest}
+            for category, count, oldest in conn.execute(
+                "SELECT entities.category, COUNT(*), MIN(images.ts) FROM images "
+                "JOIN entities ON entities.id = images.entity_id GROUP BY entities.category")
+        }
+        clip_files, clip_bytes = conn.execute(CLIP_FILES).fetchone()
+        used = loose_bytes + pack_bytes + clip_bytes
+        free = self.disk_free()
+        return {
+            "used_mb": round(used / MB, 1),
+            "budget_mb": round(self.budget / MB) if self.budget else None,
+            "utilization": round(used / self.budget, 3) if self.budget else None,
+            "disk_free_mb": round(free / MB) if free is not None else None,
+            "loose": {"images": loose_count, "mb": round(loose_bytes / MB, 1)},
+            "packed": {"images": packed_count, "packs": packs, "mb": round(pack_bytes / MB, 1)},
+            "clips": {"files": clip_files, "mb": round(clip_bytes / MB, 1)},
+            "categories": categories,
+        }
+
+    def stop(self, timeout=10):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        if self.last_pass is None:
+            conn = connect(self.db_file)
+            try:
+                usage = self.usage(conn)
+            finally:
+                conn.close()
+        else:
+            usage = self.last_pass["usage"]
+        return {**usage, "totals": dict(self.totals),
+                "last_pass": {key: value for key, value in (self.last_pass or {}).items() if key != "usage"}}
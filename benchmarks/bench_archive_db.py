@@ -0,0 +1,81 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.database import (connect, count_sightings_by_category, entities_seen_between, initialize_database,
+                          sightings_per_day)
+
+CATEGORIES = ["dogs", "owners"]
+
+
+def populate(conn, sightings, entities, years, seed=0):
+    rng = np.random.default_rng(seed)
+    end = int(time.time())
+    start = end - years * 365 * 86400
+    entity_ids = np.arange(1, entities + 1)
+    entity_categories = rng.integers(0, len(CATEGORIES), entities)
+
+    with conn:
+        conn.executemany("INSERT INTO entities (id, category, first_seen, last_seen, sightings) VALUES (?, ?, ?, ?, 0)",
+                         ((int(i), CATEGORIES[c], start, end) for i, c in zip(entity_ids, entity_categories)))
+    chunk = 200000
+    for offset in range(0, sightings, chunk):
+        n = min(chunk, sightings - offset)
+        owners = rng.integers(1, entities + 1, n)
+        starts = rng.integers(start, end, n)
+        durations = rng.integers(5, 600, n)
+        with conn:
+            conn.executemany(
+                "INSERT INTO sightings (entity_id, category, track_id, start_ts, end_ts) VALUES (?, ?, ?, ?, ?)",
+                ((int(e), CATEGORIES[entity_categories[e - 1]], int(e), int(s), int(s + d))
+                 for e, s, d in zip(owners, starts, durations)))
+    return start, end
+
+
+def timed(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - t0)
+    return 1000 * min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Range and aggregate queries over a synthetic archive.")
+    parser.add_argument("--sightings", type=int, default=2000000)
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--db", help="reuse or create this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = args.db or os.path.join(tmp, "bench.db")
+        fresh = not os.path.exists(db_file)
+        initialize_database(db_file)
+        conn = connect(db_file)
+        if fresh:
+            t0 = time.perf_counter()
+            start, end = populate(conn, args.sightings, args.entities, args.years)
+            print(f"populated {args.sightings} sightings in {time.perf_counter() - t0:.1f}s")
+        else:
+            start, end = conn.execute("SELECT MIN(start_ts), MAX(end_ts) FROM sightings").fetchone()
+
+        middle = (start + end) // 2
+        queries = [
+            ("who, 1 hour", lambda: entities_seen_between(conn, middle, middle + 3600)),
+            ("who, 1 day", lambda: entities_seen_between(conn, middle, middle + 86400)),
+            ("dogs, 1 week", lambda: entities_seen_between(conn, middle, middle + 7 * 86400, category="dogs")),
+            ("per category, 1 month", lambda: count_sightings_by_category(conn, middle, middle + 30 * 86400)),
+            ("dogs per day, 1 year", lambda: sightings_per_day(conn, "dogs", middle, middle + 365 * 86400)),
+        ]
+        print(f"{'query':>24} {'ms':>9} {'rows':>7}")
+        for name, query in queries:
+            ms, result = timed(query)
+            print(f"{name:>24} {ms:>9.2f} {len(result):>7}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
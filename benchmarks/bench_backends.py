@@ -0,0 +1,43 @@
+import argparse
+import time
+import numpy as np
+from app.base.inference import BACKENDS, load_backend
+
+
+def percentile_ms(timings, q):
+    return 1000 * float(np.percentile(timings, q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU latency per inference backend.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--precision", nargs="+", default=["fp32"])
+    parser.add_argument("--input-size", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1280, 720])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (args.resolution[1], args.resolution[0], 3), dtype=np.uint8)
+
+    print(f"{'backend':>8} {'precision':>9} {'p50 ms':>8} {'p95 ms':>8} {'fps':>6}")
+    for name in args.backends:
+        for precision in args.precision:
+            try:
+                backend = load_backend(name, warmup_runs=2, input_size=args.input_size,
+                                       threads=args.threads, precision=precision)
+            except RuntimeError as e:
+                print(f"{name:>8} {precision:>9} unavailable: {e}")
+                continue
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                backend.infer(frame)
+                timings.append(time.perf_counter() - start)
+            p50 = percentile_ms(timings, 50)
+            print(f"{name:>8} {precision:>9} {p50:>8.1f} {percentile_ms(timings, 95):>8.1f} {1000 / p50:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
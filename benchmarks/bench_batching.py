@@ -0,0 +1,57 @@
+import argparse
+import threading
+import time
+import numpy as np
+from app.base.batching import BatchedInference
+from app.base.inference import load_backend
+
+
+def run(backend, frame, clients, max_batch, max_wait_ms, seconds):
+    service = BatchedInference(backend, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    service.start()
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            service.submit(frame).result()
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    service.stop()
+    timings = 1000 * np.concatenate([np.asarray(l) for l in latencies])
+    return len(timings) / elapsed, np.percentile(timings, 50), np.percentile(timings, 95), service.stats()["avg_batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of batched inference per batch setting.")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4],
+                        help="concurrent callers, e.g. sources or tiles of one frame")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0, 5, 20])
+    parser.add_argument("--size", type=int, default=640, help="side of the square input frames")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    backend = load_backend(args.backend, warmup_runs=2)
+    frame = np.random.default_rng(0).integers(0, 255, (args.size, args.size, 3), dtype=np.uint8)
+    print(f"{'clients':>7} {'batch':>5} {'wait ms':>7} {'fps':>7} {'p50 ms':>7} {'p95 ms':>7} {'avg batch':>9}")
+    for clients in args.clients:
+        for max_batch in args.max_batch:
+            for max_wait_ms in args.max_wait_ms:
+                if max_batch == 1 and max_wait_ms:
+                    continue
+                fps, p50, p95, avg_batch = run(backend, frame, clients, max_batch, max_wait_ms, args.seconds)
+                print(f"{clients:>7} {max_batch:>5} {max_wait_ms:>7g} {fps:>7.1f} {p50:>7.1f} {p95:>7.1f} {avg_batch:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.clips import MB, ClipRecorder
+
+DOG = {1: (Category("dog"), BBox(100, 100, 200, 200), 0.9)}
+
+
+def frames(shape, count):
+    # A moving gradient, so JPEG sizes are closer to camera footage than a flat frame.
+    base = np.tile(np.linspace(0, 255, shape[1], dtype=np.uint8), (shape[0], 1))[..., None].repeat(3, axis=2)
+    noise = np.random.default_rng(0).integers(0, 32, shape, dtype=np.uint8)
+    return [np.roll(base, 8 * i, axis=1) + noise for i in range(count)]
+
+
+def run(shape, fps, camera_fps, seconds, max_side, visit):
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = ClipRecorder(fps=fps, max_side=max_side, clips_core=tmp, archiver=MagicMock())
+        images = frames(shape, 16)
+        record_times = []
+        peak = 0
+        total = int(seconds * camera_fps)
+        start_visit, end_visit = int(total * 0.3), int(total * 0.3 + visit * camera_fps)
+        for i in range(total):
+            tracked = DOG if start_visit <= i < end_visit else {}
+            start = time.perf_counter()
+            recorder.record(i / camera_fps, images[i % len(images)], tracked)
+            record_times.append(time.perf_counter() - start)
+            clip_bytes = recorder.clip.bytes if recorder.clip is not None else 0
+            peak = max(peak, recorder.buffer_bytes + clip_bytes)
+        recorder.finish()
+        clip = recorder.queue.get_nowait()
+        start = time.perf_counter()
+        path = recorder.write(clip)
+        write_seconds = time.perf_counter() - start
+        return {
+            "record_ms": 1000 * np.mean(record_times),
+            "record_p99_ms": 1000 * np.percentile(record_times, 99),
+            "peak_mb": peak / MB,
+            "clip_seconds": clip.end - clip.start,
+            "write_s": write_seconds,
+            "file_mb": os.path.getsize(path) / MB,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cost and memory of the clip recorder, and clip write time.")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1280, 720])
+    parser.add_argument("--camera-fps", type=float, default=30)
+    parser.add_argument("--fps", type=float, nargs="+", default=[5, 10, 15])
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--seconds", type=float, default=40)
+    parser.add_argument("--visit", type=float, default=20)
+    args = parser.parse_args()
+
+    shape = (args.resolution[1], args.resolution[0], 3)
+    print(f"{'fps':>5} {'record ms':>10} {'p99 ms':>7} {'peak MB':>8} {'clip s':>7} {'write s':>8} {'file MB':>8}")
+    for fps in args.fps:
+        r = run(shape, fps, args.camera_fps, args.seconds, args.max_side, args.visit)
+        print(f"{fps:>5g} {r['record_ms']:>10.3f} {r['record_p99_ms']:>7.2f} {r['peak_mb']:>8.2f} "
+              f"{r['clip_seconds']:>7.1f} {r['write_s']:>8.2f} {r['file_mb']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.broadcast import FrameBroadcaster
+from app.encoder import JPEG_ENCODERS, StreamEncoder
+
+
+def synthetic_frame(width, height, seed=0):
+    # Smooth gradients plus noise compress roughly like a camera frame; pure noise would not.
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                      (x + y) / 2], axis=2)
+    return np.clip(frame + rng.normal(0, 12, frame.shape), 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time per streamed frame for each encoder mode.")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1280, 720])
+    parser.add_argument("--preview-widths", type=int, nargs="+", default=[0, 960, 640])
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    frame = synthetic_frame(*args.resolution)
+    tracked = {1: (Category("dog"), BBox(200, 150, 300, 250), 0.9), 2: (Category("person"), BBox(700, 100, 200, 500), 0.8)}
+
+    idle = StreamEncoder(FrameBroadcaster(), target_bitrate_kbps=None, max_fps=None)
+    start = time.process_time()
+    for _ in range(args.frames):
+        idle.encode(frame, tracked, 30.0)
+    print(f"no subscribers: {1000 * (time.process_time() - start) / args.frames:.3f} ms CPU/frame")
+
+    print(f"{'backend':>10} {'preview':>8} {'cpu ms':>7} {'wall ms':>8} {'kB':>6}")
+    for name, backend in JPEG_ENCODERS.items():
+        try:
+            jpeg = backend()
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"{name:>10} unavailable: {e}")
+            continue
+        for preview_width in args.preview_widths:
+            broadcaster = FrameBroadcaster()
+            subscription = broadcaster.subscribe()
+            encoder = StreamEncoder(broadcaster, preview_width=preview_width, quality=args.quality,
+                                    target_bitrate_kbps=None, max_fps=None, jpeg_encoder=jpeg)
+            encoder.encode(frame, tracked, 30.0)
+            cpu, wall = time.process_time(), time.perf_counter()
+            for _ in range(args.frames):
+                buffer = encoder.encode(frame, tracked, 30.0)
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+            subscription.close()
+            label = preview_width or args.resolution[0]
+            print(f"{name:>10} {label:>8} {1000 * cpu / args.frames:>7.2f} {1000 * wall / args.frames:>8.2f} "
+                  f"{len(buffer) / 1024:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+import cv2
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.broadcast import FrameBroadcaster
+from app.encoder import StreamEncoder
+from app.framebuffer import FrameRing
+from app.sources import VideoFileSource
+from benchmarks.bench_encoder import synthetic_frame
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def run(mode, path, frames, held, preview_width):
+    # Captures `frames` frames while keeping the last `held` alive, as the pipeline queues do,
+    # and renders each into the stream preview. Allocation is the per-frame tracemalloc peak;
+    # both are measured once every ring slot has been written at least once.
+    encoder = StreamEncoder(FrameBroadcaster(), preview_width=preview_width)
+    tracked = {1: (Category("dog"), BBox(200, 150, 300, 250), 0.9)}
+    source = VideoFileSource(path, loop=True)
+    ring = None
+    in_flight = deque(maxlen=held)
+    allocated = 0
+    warmup = held + 2
+    rss_start = None
+    start = time.perf_counter()
+    for i in range(warmup + frames):
+        if i == warmup:
+            rss_start = rss_mb()
+            start = time.perf_counter()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        if mode == "ring":
+            if ring is None:
+                ring = FrameRing(source.read().shape, warmup)
+            slot, buffer = ring.acquire()
+            source.read_into(buffer)
+            image = ring.commit(slot, i, time.time())
+        else:
+            image = source.read()
+        in_flight.append(image)
+        encoder.render(image, tracked, 30.0)
+        if i >= warmup:
+            allocated += tracemalloc.get_traced_memory()[1] - current
+    elapsed = time.perf_counter() - start
+    in_flight.clear()
+    source.close()
+    if ring is not None:
+        ring.close()
+    return 1000 * elapsed / frames, allocated / frames / 1024, rss_start, rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame allocation and RSS of the capture path.")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1280, 720])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--held", type=int, default=12, help="frames kept alive downstream")
+    parser.add_argument("--preview-width", type=int, default=960)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, tuple(args.resolution))
+        for seed in range(30):
+            writer.write(synthetic_frame(*args.resolution, seed=seed))
+        writer.release()
+
+        tracemalloc.start()
+        print(f"{'mode':>8} {'ms/frame':>9} {'KiB alloc/frame':>16} {'RSS MB start':>13} {'end':>7}")
+        for mode in ("alloc", "ring"):
+            ms, kib, rss_start, rss_end = run(mode, path, args.frames, args.held, args.preview_width)
+            print(f"{mode:>8} {ms:>9.2f} {kib:>16.1f} {rss_start:>13.1f} {rss_end:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import time
+import numpy as np
+from app.base.bbox import BBox
+from app.base.geometry import bboxes_to_array, iou_matrix, nms
+
+
+def random_bboxes(rng, n):
+    return [BBox(int(x), int(y), int(w), int(h))
+            for x, y, w, h in zip(rng.integers(0, 1200, n), rng.integers(0, 700, n),
+                                  rng.integers(20, 200, n), rng.integers(20, 200, n))]
+
+
+def loop_pairwise(a, b):
+    return [[x.compute_iou(y) for y in b] for x in a]
+
+
+def loop_nms(bboxes, iou_threshold):
+    kept = []
+    for bbox in bboxes:
+        if not any(bbox.compute_iou(other) > iou_threshold for other in kept):
+            kept.append(bbox)
+    return kept
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return 1000 * min(timings)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} {'iou loop ms':>12} {'iou numpy ms':>13} {'nms loop ms':>12} {'nms numpy ms':>13}")
+    for n in (50, 100, 300, 500):
+        bboxes = random_bboxes(rng, n)
+        iou_loop = best_of(lambda: loop_pairwise(bboxes, bboxes))
+        iou_vec = best_of(lambda: iou_matrix(bboxes_to_array(bboxes), bboxes_to_array(bboxes)))
+        nms_loop = best_of(lambda: loop_nms(bboxes, 0.5))
+        nms_vec = best_of(lambda: nms(bboxes_to_array(bboxes), 0.5))
+        print(f"{n:>6} {iou_loop:>12.2f} {iou_vec:>13.2f} {nms_loop:>12.2f} {nms_vec:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import time
+from app.multisource import MultiSourceManager
+
+
+class CountingArchiver:
+    # Stands in for the archive writer so the benchmark measures the pipelines, not the disk.
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, item):
+        self.submitted += 1
+        return True
+
+
+def run(source, workers, seconds, threads):
+    sources = [{"name": f"source-{i}", "source": source} for i in range(workers)]
+    archiver = CountingArchiver()
+    manager = MultiSourceManager(sources, threads_per_worker=threads, archiver=archiver, realtime=False, loop=True)
+    manager.start()
+    try:
+        # Wait for every worker to report once (model loaded, pipeline running), then measure.
+        while not all(handle.stats for handle in manager.handles.values()):
+            time.sleep(0.2)
+        before = {name: handle.stats["tracking"]["processed"] for name, handle in manager.handles.items()}
+        time.sleep(seconds)
+        stats = manager.stats()
+    finally:
+        manager.stop()
+    frames = sum(stats[name]["tracking"]["processed"] - before[name] for name in stats)
+    inferences = sum(stats[name]["inference"]["processed"] for name in stats)
+    cpu = sum(stats[name].get("cpu_percent", 0.0) for name in stats)
+    return frames / seconds, inferences, cpu, archiver.submitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate throughput with one worker process per source.")
+    parser.add_argument("source", help="video file or image directory replayed by every worker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--threads", type=int, help="inference threads per worker (default: cores / workers)")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores")
+    print(f"{'workers':>7} {'fps':>8} {'fps/worker':>10} {'speedup':>7} {'cpu %':>6}")
+    baseline = None
+    for workers in args.workers:
+        threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+        fps, _, cpu, _ = run(args.source, workers, args.seconds, threads)
+        baseline = baseline or fps
+        print(f"{workers:>7} {fps:>8.1f} {fps / workers:>10.1f} {fps / baseline:>7.2f} {cpu:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from app.archiver import Archiver
+from app.base.inference import load_backend
+from app.base.tracker import create_tracker
+from app.bestshot import BestShotSelector
+from app.pipeline import FramePipeline
+from app.scheduler import AdaptiveDetectionScheduler
+from app.sources import open_source
+from app.config.config import Config
+cfg = Config()
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_summary(timings):
+    ms = 1000 * np.asarray(timings)
+    if ms.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def replay(source, pipeline, max_frames=None, fps=None):
+    # Frames get synthetic timestamps at the source frame rate so time-based logic (best-shot
+    # sampling, track flushes) behaves the same on every run regardless of processing speed.
+    fps = fps or source.fps or cfg.get("camera.frame_rate", 30)
+    stage_timings = {}
+    frame_timings = []
+    start_ts = 1_700_000_000.0
+    frames = 0
+    wall_start = time.perf_counter()
+    while max_frames is None or frames < max_frames:
+        image = source.read()
+        if image is None:
+            break
+        frame_start = time.perf_counter()
+        for name, duration in pipeline.step(image, start_ts + frames / fps, fps).items():
+            stage_timings.setdefault(name, []).append(duration)
+        frame_timings.append(time.perf_counter() - frame_start)
+        frames += 1
+    if pipeline.bestshot is not None:
+        pipeline.bestshot.flush_all()
+    return frames, time.perf_counter() - wall_start, stage_timings, frame_timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded clip through detection, tracking and archiving.")
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("--backend", default=cfg.get("detection.backend", "torch"))
+    parser.add_argument("--tracker", default=cfg.get("tracker.backend", "opencv"))
+    parser.add_argument("--frames", type=int, help="stop after this many frames")
+    parser.add_argument("--fps", type=float, help="override the source frame rate used for timestamps")
+    parser.add_argument("--detect-every", type=int, help="fixed detection interval instead of the adaptive scheduler")
+    parser.add_argument("--no-archive", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open_source(args.source, fps=args.fps) as source:
+        model = load_backend(args.backend)
+        archiver = Archiver(db_file=os.path.join(tmp, "bench.db"))
+        archiver.start()
+        pipeline = FramePipeline(source, model, create_tracker(args.tracker))
+        pipeline.archive_enabled = not args.no_archive
+        pipeline.bestshot = BestShotSelector(archiver=archiver, images_core=os.path.join(tmp, "images"))
+        if args.detect_every:
+            pipeline.scheduler = AdaptiveDetectionScheduler(enabled=False, base_interval=args.detect_every)
+
+        frames, wall, stage_timings, frame_timings = replay(source, pipeline, args.frames, args.fps)
+        archiver.stop(timeout=60)
+        pipeline_stats = pipeline.stats()
+
+    gate = pipeline_stats.get("motion_gate") or {}
+    inferences = len(stage_timings.get("inference", [])) - gate.get("inferences_skipped", 0)
+    results = {
+        "source": args.source,
+        "backend": args.backend,
+        "tracker": args.tracker,
+        "detect_every": args.detect_every,
+        "archive": not args.no_archive,
+        "frames": frames,
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "inferences": inferences,
+        "inferences_per_second": round(inferences / wall, 2) if wall else 0.0,
+        "images_written": archiver.written,
+        "peak_rss_mb": peak_rss_mb(),
+        "frame": latency_summary(frame_timings),
+        "stages": {name: latency_summary(timings) for name, timings in stage_timings.items()},
+        "scheduler": pipeline_stats["scheduler"],
+        "motion_gate": pipeline_stats.get("motion_gate"),
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+    }
+
+    print(f"{frames} frames in {wall:.2f} s: {results['fps']} fps, {results['inferences_per_second']} inferences/s, "
+          f"{results['images_written']} images, peak RSS {results['peak_rss_mb']} MB")
+    print(f"{'stage':>10} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, summary in [("frame", results["frame"])] + list(results["stages"].items()):
+        if summary["count"]:
+            print(f"{name:>10} {summary['count']:>6} {summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} "
+                  f"{summary['p99_ms']:>8.2f}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
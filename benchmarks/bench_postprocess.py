@@ -0,0 +1,67 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.base.postprocess import detections_from_array, detections_from_pandas
+
+COCO_NAMES = {i: f"class{i}" for i in range(80)}
+COCO_NAMES.update({0: "person", 15: "cat", 16: "dog"})
+
+
+class RecordedResults:
+    # Mirrors the parts of yolov5's Detections object used by both post-processing paths.
+    def __init__(self, pred, names=COCO_NAMES):
+        self.xyxy = [pred]
+        self.names = names
+
+    def pandas(self):
+        columns = ["xmin", "ymin", "xmax", "ymax", "confidence", "class"]
+        df = pd.DataFrame(self.xyxy[0].tolist(), columns=columns)
+        df["name"] = [self.names[int(c)] for c in df["class"]]
+        result = type("Results", (), {})()
+        result.xyxy = [df]
+        return result
+
+
+def synthetic_predictions(rng, count):
+    x1 = rng.uniform(0, 1100, count)
+    y1 = rng.uniform(0, 600, count)
+    w = rng.uniform(20, 180, count)
+    h = rng.uniform(20, 120, count)
+    conf = rng.uniform(0.25, 1.0, count)
+    cls = rng.choice([0, 16, 2, 15, 56], count)
+    return np.stack([x1, y1, x1 + w, y1 + h, conf, cls], axis=1).astype(np.float32)
+
+
+def best_of(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return 1000 * min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pandas and array post-processing of YOLO outputs.")
+    parser.add_argument("--recorded", help="npz file with one (N, 6) prediction array per key")
+    parser.add_argument("--classes", nargs="+", default=["dog", "person"])
+    args = parser.parse_args()
+
+    if args.recorded:
+        recorded = np.load(args.recorded)
+        cases = [(key, recorded[key]) for key in recorded.files]
+    else:
+        rng = np.random.default_rng(0)
+        cases = [(f"{n} boxes", synthetic_predictions(rng, n)) for n in (0, 5, 20, 100)]
+
+    print(f"{'case':>12} {'pandas ms':>10} {'array ms':>10} {'speedup':>8}")
+    for name, pred in cases:
+        results = RecordedResults(pred)
+        pandas_ms = best_of(lambda: detections_from_pandas(results, args.classes))
+        array_ms = best_of(lambda: detections_from_array(results.xyxy[0], results.names, args.classes))
+        print(f"{name:>12} {pandas_ms:>10.3f} {array_ms:>10.3f} {pandas_ms / array_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.base.reid import HistogramEmbedder, VectorIndex
+
+
+def percentiles(timings):
+    timings = 1000 * np.asarray(timings)
+    return f"p50 {np.percentile(timings, 50):.2f} ms, p99 {np.percentile(timings, 99):.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-ID embedding cost and vector index query latency.")
+    parser.add_argument("--size", type=int, default=100000, help="embeddings stored in the index")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embedder = HistogramEmbedder()
+    crops = rng.integers(0, 256, (args.queries, 160, 90, 3), dtype=np.uint8)
+    timings = []
+    for crop in crops:
+        t0 = time.perf_counter()
+        embedder.embed(crop)
+        timings.append(time.perf_counter() - t0)
+    print(f"histogram embedding ({embedder.dim}-d): {percentiles(timings)}")
+
+    vectors = rng.random((args.size, embedder.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, args.size, args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path in (("in-memory", None), ("memmap", os.path.join(tmp, "dogs"))):
+            index = VectorIndex(embedder.dim, path, capacity=args.size)
+            t0 = time.perf_counter()
+            for label, vector in enumerate(vectors):
+                index.add(vector, label)
+            index.flush()
+            build = time.perf_counter() - t0
+            if path is not None:
+                index = VectorIndex(embedder.dim, path)
+            timings = []
+            for query in queries:
+                t0 = time.perf_counter()
+                index.search(query)
+                timings.append(time.perf_counter() - t0)
+            print(f"{name} index, {len(index)} vectors (built in {build:.2f} s): {percentiles(timings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = {
+    "config": "from app.config.config import Config; Config()",
+    "database": "import app.database",
+    "api": "import app.api",
+    "create_app": "from app import create_app; create_app(warm_up=False)",
+    "pipeline": "import app.pipeline",
+    "torch_backend": "from app.base.inference import load_backend; load_backend('torch', warmup_runs=0)",
+}
+
+
+def run(code, env):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, result.stderr
+
+
+def slowest_imports(importtime_output, top):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time of each entry point, in fresh interpreters.")
+    parser.add_argument("--entry-points", nargs="+", default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="slowest top-level imports to list per entry point")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    print(f"{'entry point':>14} {'median s':>9} {'min s':>7}")
+    for name in args.entry_points:
+        try:
+            runs = [run(ENTRY_POINTS[name], env) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:>14} failed: {e}")
+            continue
+        timings = [elapsed for elapsed, _ in runs]
+        print(f"{name:>14} {statistics.median(timings):>9.3f} {min(timings):>7.3f}")
+        for cumulative, module in slowest_imports(runs[-1][1], args.top):
+            print(f"{'':>16}{cumulative / 1e6:.3f} s  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.base.detection import Detection
+from app.base.tracker import OpenCVTracker
+
+CATEGORIES = (Category("dog"), Category("person"))
+
+
+def grid_boxes(count):
+    columns = int(np.ceil(np.sqrt(count)))
+    return [BBox(10 + 60 * (i % columns), 10 + 60 * (i // columns), 40, 40) for i in range(count)]
+
+
+def run(count, frames, detect_every, kind):
+    # Tracker bookkeeping cost, including the per-frame snapshot the pipeline takes: the cheap
+    # "motion" box tracker keeps OpenCV out of the numbers.
+    tracker = OpenCVTracker(kind=kind)
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    boxes = grid_boxes(count)
+    detections = [Detection(bbox, CATEGORIES[i % 2], 0.9) for i, bbox in enumerate(boxes)]
+    tracker.update_with_detections(frame, detections)
+
+    # Timed without tracemalloc, which slows every allocation down; the second pass measures
+    # the per-frame tracemalloc peak.
+    timings = {"track": [], "detect": []}
+    allocated = {"track": [], "detect": []}
+    for i in range(2 * frames):
+        if i == frames:
+            tracemalloc.start()
+        phase = "detect" if detect_every and i % detect_every == 0 else "track"
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if phase == "detect":
+            tracked = tracker.update_with_detections(frame, detections)
+        else:
+            tracked = tracker.update_trackers(frame)
+        # The pipeline hands a snapshot of the store to the stages after tracking.
+        tracked.snapshot()
+        if i < frames:
+            timings[phase].append(time.perf_counter() - start)
+        else:
+            allocated[phase].append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    assert len(tracker.trackers) == count, f"{len(tracker.trackers)} of {count} tracks survived"
+    return {phase: (1000 * np.mean(timings[phase]), np.mean(allocated[phase]) / 1024)
+            for phase in timings if timings[phase]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame update time and allocation of the track store.")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--kind", default="motion")
+    args = parser.parse_args()
+
+    print(f"{'tracks':>7} {'track ms':>9} {'track KiB':>10} {'detect ms':>10} {'detect KiB':>11}")
+    for count in args.tracks:
+        result = run(count, args.frames, args.detect_every, args.kind)
+        track_ms, track_kib = result["track"]
+        detect_ms, detect_kib = result.get("detect", (0.0, 0.0))
+        print(f"{count:>7} {track_ms:>9.3f} {track_kib:>10.1f} {detect_ms:>10.3f} {detect_kib:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.base.tracker import create_tracker
+
+TIERS = [
+    ("csrt", dict(backend="opencv", kind="csrt")),
+    ("kcf", dict(backend="opencv", kind="kcf")),
+    ("mosse", dict(backend="opencv", kind="mosse")),
+    ("flow", dict(backend="opencv", kind="flow")),
+    ("motion", dict(backend="opencv", kind="motion")),
+    ("csrt x0.5", dict(backend="opencv", kind="csrt", scale=0.5)),
+    ("csrt x0.5 4thr", dict(backend="opencv", kind="csrt", scale=0.5, workers=4)),
+    ("kcf x0.5 4thr", dict(backend="opencv", kind="kcf", scale=0.5, workers=4)),
+    ("sort", dict(backend="sort", min_hits=1)),
+]
+
+
+def synthetic_frames(rng, count, shape=(720, 1280, 3)):
+    base = rng.integers(0, 255, shape, dtype=np.uint8)
+    return [np.roll(base, shift=2 * i, axis=1) for i in range(count)]
+
+
+def bench_tier(options, n_objects, frames):
+    options = dict(options)
+    backend = options.pop("backend")
+    tracker = create_tracker(backend, **options)
+    for i in range(n_objects):
+        x, y = 20 + (i * 97) % 1100, 20 + (i * 61) % 560
+        tracker.add_tracker(frames[0], BBox(x, y, 80, 80), Category("dog"))
+
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        tracker.update_trackers(frame)
+    elapsed = time.perf_counter() - start
+    return (len(frames) - 1) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracker update FPS per tier and object count.")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--objects", type=int, nargs="+", default=[1, 5, 10, 20])
+    args = parser.parse_args()
+
+    frames = synthetic_frames(np.random.default_rng(0), args.frames + 1)
+    print(f"{'tier':>16} " + " ".join(f"{f'{n} obj fps':>11}" for n in args.objects))
+    for name, options in TIERS:
+        try:
+            row = [bench_tier(options, n, frames) for n in args.objects]
+        except (RuntimeError, AttributeError) as e:
+            print(f"{name:>16} unavailable: {e}")
+            continue
+        print(f"{name:>16} " + " ".join(f"{fps:>11.1f}" for fps in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import cv2
+from flask import Flask
+from app.api import api
+from app.database import add_clip, add_image, connect, initialize_database
+
+
+class TestArchiveApi(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "test.db")
+        initialize_database(self.db_file)
+        self.image_path = os.path.join(self.tmp.name, "dog.jpg")
+        cv2.imwrite(self.image_path, np.full((400, 200, 3), 128, dtype=np.uint8))
+
+        conn = connect(self.db_file)
+        open_sightings = {}
+        with conn:
+            for track_id in range(1, 6):
+                add_image(conn, open_sightings, "dogs", track_id, 1000 + track_id, self.image_path)
+        conn.close()
+
+        app = Flask(__name__)
+        app.config.update(DB_FILE=self.db_file, THUMBNAILS_DIR=os.path.join(self.tmp.name, "thumbs"))
+        app.register_blueprint(api)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_entities_keyset_pagination(self):
+        seen = []
+        cursor = None
+        while True:
+            query = {"limit": 2}
+            if cursor:
+                query["cursor"] = cursor
+            payload = self.client.get("/api/entities", query_string=query).get_json()
+            seen.extend(item["last_seen"] for item in payload["items"])
+            cursor = payload["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [1005, 1004, 1003, 1002, 1001])
+
+    def test_entity_images_and_sightings(self):
+        entity_id = self.client.get("/api/entities", query_string={"limit": 1}).get_json()["items"][0]["id"]
+        images = self.client.get(f"/api/entities/{entity_id}/images").get_json()["items"]
+        self.assertEqual(len(images), 1)
+        sightings = self.client.get(f"/api/entities/{entity_id}/sightings").get_json()["items"]
+        self.assertEqual((sightings[0]["start"], sightings[0]["end"]), (1005, 1005))
+
+    def test_entity_clips(self):
+        clip_path = os.path.join(self.tmp.name, "clip.mp4")
+        with open(clip_path, "wb") as file:
+            file.write(b"\x00" * 1024)
+        conn = connect(self.db_file)
+        with conn:
+            entity_id = add_clip(conn, {}, "dogs", 1, 1001, 1001, clip_path, 995, 1010, 1024)
+        conn.close()
+
+        clips = self.client.get(f"/api/entities/{entity_id}/clips").get_json()["items"]
+        self.assertEqual([(clip["start"], clip["end"]) for clip in clips], [(995, 1010)])
+        response = self.client.get(clips[0]["video"], headers={"Range": "bytes=0-99"})
+        self.assertEqual((response.status_code, len(response.data)), (206, 100))
+        response.close()
+        self.assertEqual(self.client.get("/api/clips/99").status_code, 404)
+
+    def test_full_image_loose_and_packed(self):
+        image_url = self.client.get("/api/entities/1/images").get_json()["items"][0]["image"]
+        self.assertEqual(image_url, "/api/images/1")
+        response = self.client.get(image_url)
+        self.assertEqual((response.status_code, response.mimetype), (200, "image/jpeg"))
+        with open(self.image_path, "rb") as file:
+            self.assertEqual(response.data, file.read())
+        response.close()
+
+        pack_path = os.path.join(self.tmp.name, "dogs.pack")
+        data = cv2.imencode(".jpg", np.full((40, 20, 3), 64, dtype=np.uint8))[1].tobytes()
+        with open(pack_path, "wb") as pack:
+            pack.write(b"header" + data)
+        conn = connect(self.db_file)
+        with conn:
+            pack_id = conn.execute("INSERT INTO packs (category, path, size, created) VALUES ('dogs', ?, ?, 0)",
+                                   (pack_path, len(data) + 6)).lastrowid
+            conn.execute("UPDATE images SET pack_id = ?, pack_offset = 6, pack_length = ? WHERE id = 2",
+                         (pack_id, len(data)))
+        conn.close()
+        os.remove(self.image_path)
+
+        response = self.client.get("/api/images/2")
+        self.assertEqual((response.status_code, response.data), (200, data))
+        cached = self.client.get("/api/images/2", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get("/api/images/1").status_code, 404)
+        self.assertEqual(self.client.get("/api/images/99").status_code, 404)
+
+    def test_conditional_requests(self):
+        response = self.client.get("/api/entities")
+        self.assertIsNotNone(response.headers.get("ETag"))
+        self.assertIsNotNone(response.headers.get("Last-Modified"))
+        cached = self.client.get("/api/entities", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_thumbnail_is_cached_on_disk(self):
+        response = self.client.get("/api/images/1/thumbnail", query_string={"size": 160})
+        self.assertEqual(response.status_code, 200)
+        thumbnail = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(thumbnail.shape[:2], (160, 80))
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "thumbs", "160", "1.jpg")))
+
+        cached = self.client.get("/api/images/1/thumbnail", query_string={"size": 160},
+                                 headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        response.close()
+
+    def test_rejects_bad_input(self):
+        self.assertEqual(self.client.get("/api/entities", query_string={"cursor": "!!"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/entities", query_string={"cursor": "/w=="}).status_code, 400)
+
+    def test_rejects_cursor_with_wrong_number_of_fields(self):
+        for cursor in ("NQ==", "MToyOjM="):
+            self.assertEqual(self.client.get("/api/entities", query_string={"cursor": cursor}).status_code, 400)
+            self.assertEqual(self.client.get("/api/entities/1/images", query_string={"cursor": cursor}).status_code, 400)
+            self.assertEqual(self.client.get("/api/entities/1/sightings", query_string={"cursor": cursor}).status_code, 400)
+        self.assertEqual(self.client.get("/api/images/1/thumbnail", query_string={"size": 17}).status_code, 400)
+        self.assertEqual(self.client.get("/api/images/99/thumbnail").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from app.archiver import Archiver, ArchiveItem, ClipItem, SightingItem
+from app.database import add_image, connect, initialize_database
+
+
+class TestArchiver(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "test.db")
+        self.crop = np.full((40, 30, 3), 127, dtype=np.uint8)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def item(self, obj_id, captured_at, category_pl="dogs"):
+        path = os.path.join(self.tmp.name, category_pl, str(obj_id), f"{captured_at}.jpg")
+        return ArchiveItem(path, self.crop, category_pl, obj_id, str(captured_at), captured_at)
+
+    def test_writes_images_and_batches_rows_on_stop(self):
+        archiver = Archiver(db_file=self.db_file, queue_size=8, flush_interval=60, batch_size=100)
+        archiver.start()
+        archiver.submit(self.item(1, 1000))
+        archiver.submit(self.item(1, 1020))
+        archiver.submit(SightingItem("dogs", 1, 990, 1030))
+        archiver.submit(self.item(2, 1030, category_pl="owners"))
+        archiver.stop()
+
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "dogs", "1", "1020.jpg")))
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "owners", "2", "1030.jpg")))
+        conn = sqlite3.connect(self.db_file)
+        entities = conn.execute("SELECT category, first_seen, last_seen, sightings FROM entities ORDER BY id").fetchall()
+        images = conn.execute("SELECT entity_id, ts FROM images ORDER BY id").fetchall()
+        sightings = conn.execute("SELECT entity_id, start_ts, end_ts FROM sightings ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(entities, [("dogs", 990, 1030, 1), ("owners", 1030, 1030, 1)])
+        self.assertEqual(images, [(1, 1000), (1, 1020), (2, 1030)])
+        self.assertEqual(sightings, [(1, 990, 1030), (2, 1030, 1030)])
+        self.assertEqual(archiver.stats()["db_flushes"], 1)
+        self.assertEqual(archiver.stats()["written"], 3)
+
+    def test_failed_item_does_not_stop_the_writer(self):
+        blocker = os.path.join(self.tmp.name, "dogs")
+        open(blocker, "wb").close()
+        archiver = Archiver(db_file=self.db_file, queue_size=8, flush_interval=60, batch_size=100)
+        archiver.start()
+        archiver.submit(self.item(1, 1000))
+        archiver.submit(self.item(2, 1010, category_pl="owners"))
+        archiver.stop()
+
+        self.assertFalse(os.path.isdir(blocker))
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "owners", "2", "1010.jpg")))
+        self.assertEqual(archiver.stats()["errors"], 1)
+        self.assertEqual(archiver.stats()["written"], 1)
+
+    def test_failed_embedding_still_stores_sighting(self):
+        reid = MagicMock()
+        reid.embed.side_effect = RuntimeError("bad crop")
+        archiver = Archiver(db_file=self.db_file, queue_size=8, flush_interval=60, batch_size=100, reid=reid)
+        archiver.start()
+        archiver.submit(SightingItem("dogs", 1, 990, 1030, self.crop))
+        archiver.stop()
+
+        conn = sqlite3.connect(self.db_file)
+        sightings = conn.execute("SELECT start_ts, end_ts FROM sightings").fetchall()
+        conn.close()
+        self.assertEqual(sightings, [(990, 1030)])
+        self.assertEqual(archiver.stats()["embed_errors"], 1)
+        reid.identify.assert_not_called()
+
+    def test_failed_flush_is_retried(self):
+        calls = []
+
+        def locked_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return add_image(*args)
+
+        initialize_database(self.db_file)
+        archiver = Archiver(db_file=self.db_file, flush_interval=5, max_retry_delay=60)
+        archiver.conn = connect(self.db_file)
+        archiver.process(self.item(1, 1000))
+        archiver.process(self.item(1, 1020))
+        with patch("app.archiver.add_image", side_effect=locked_once):
+            archiver.flush()
+            self.assertEqual(len(archiver.pending_rows), 2)
+            self.assertEqual(archiver.retry_delay, 5)
+            archiver.flush()
+            self.assertEqual(len(calls), 1)
+
+            archiver.retry_at = 0.0
+            archiver.flush()
+        archiver.conn.close()
+
+        conn = sqlite3.connect(self.db_file)
+        images = conn.execute("SELECT ts FROM images ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(images, [(1000,), (1020,)])
+        self.assertEqual(archiver.pending_rows, [])
+        self.assertEqual((archiver.stats()["flush_failures"], archiver.retry_delay), (1, 0))
+
+    def test_full_queue_drops_items(self):
+        archiver = Archiver(db_file=self.db_file, queue_size=1)
+        self.assertTrue(archiver.submit(self.item(1, 1)))
+        self.assertFalse(archiver.submit(self.item(1, 2)))
+        self.assertFalse(archiver.submit(ClipItem("clip.mp4", 1000, 1010, {("dogs", 1): (1000, 1010)})))
+        self.assertEqual(archiver.stats()["dropped"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
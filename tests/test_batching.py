@@ -0,0 +1,111 @@
+import threading
+import unittest
+from concurrent.futures import Future
+import numpy as np
+from app.base.batching import BatchedInference
+from app.base.detection import detect_tiled, tile_regions
+
+
+class FakeBackend:
+    # Returns one "dog" box per frame, placed at (frame value, frame value) so results can be traced.
+    names = {0: "person", 16: "dog"}
+
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def infer_batch(self, frames):
+        if self.fail:
+            raise ValueError("boom")
+        with self.lock:
+            self.batch_sizes.append(len(frames))
+        preds = []
+        for frame in frames:
+            v = float(frame[0, 0, 0])
+            preds.append(np.array([[v, v, v + 10, v + 10, 0.9, 16]], dtype=np.float32))
+        return preds
+
+
+def frame(value, size=32):
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+
+class TestBatchedInference(unittest.TestCase):
+    def test_requests_from_many_threads_are_batched_and_routed(self):
+        backend = FakeBackend()
+        service = BatchedInference(backend, max_batch=4, max_wait_ms=50)
+        service.start()
+        results = {}
+
+        def request(value):
+            results[value] = service(frame(value)).xyxy[0][0, 0]
+
+        threads = [threading.Thread(target=request, args=(value,)) for value in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        service.stop()
+
+        self.assertEqual(results, {value: float(value) for value in range(10)})
+        self.assertEqual(sum(backend.batch_sizes), 10)
+        self.assertLessEqual(max(backend.batch_sizes), 4)
+        self.assertLess(len(backend.batch_sizes), 10)
+        self.assertEqual(service.stats()["frames"], 10)
+
+    def test_errors_reach_every_caller(self):
+        service = BatchedInference(FakeBackend(fail=True), max_batch=2, max_wait_ms=20)
+        service.start()
+        futures = [service.submit(frame(1)), service.submit(frame(2))]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        service.stop()
+        with self.assertRaises(RuntimeError):
+            service.submit(frame(3)).result(timeout=1)
+
+    def test_requests_left_after_the_loop_fail(self):
+        service = BatchedInference(FakeBackend(), max_batch=2, max_wait_ms=1)
+        stranded = Future()
+        # As if put by a submit() that raced the loop's exit check.
+        service.requests.put((frame(1), stranded))
+        service.requests.empty = lambda: True
+        service.stop_event.set()
+        service.run()
+        with self.assertRaises(RuntimeError):
+            stranded.result(timeout=0)
+        with self.assertRaises(RuntimeError):
+            service.submit(frame(2)).result(timeout=0)
+
+    def test_call_times_out(self):
+        service = BatchedInference(FakeBackend(), timeout=0.05)
+        with self.assertRaises(RuntimeError):
+            service(frame(1))
+        _, future = service.requests.get_nowait()
+        self.assertTrue(future.cancelled())
+
+
+class TestTiling(unittest.TestCase):
+    def test_tiles_cover_frame(self):
+        regions = tile_regions((720, 1280), 640, overlap=0.2)
+        self.assertEqual(regions[0], (0, 0, 640, 640))
+        self.assertTrue(all(x + w <= 1280 and y + h <= 720 for x, y, w, h in regions))
+        self.assertEqual(max(x + w for x, _, w, _ in regions), 1280)
+        self.assertEqual(max(y + h for _, y, _, h in regions), 720)
+        self.assertEqual(tile_regions((100, 200), 640), [(0, 0, 200, 100)])
+
+    def test_detect_tiled_offsets_boxes(self):
+        service = BatchedInference(FakeBackend(), max_batch=8, max_wait_ms=20)
+        service.start()
+        image = np.zeros((64, 128, 3), dtype=np.uint8)
+        image[:, 64:] = 5
+        detections = detect_tiled(service, image, ["dog"], tile_size=64, overlap=0)
+        service.stop()
+
+        self.assertEqual(sorted(d.bbox.xmin for d in detections), [0, 69])
+        self.assertEqual(service.stats()["batches"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import cv2
+from app.archiver import ArchiveItem, SightingItem
+from app.bestshot import BestShotSelector, score_crop, is_truncated, downscale
+from app.base.bbox import BBox
+
+
+def textured(shape, blur=0):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, shape, dtype=np.uint8)
+    return cv2.GaussianBlur(image, (blur, blur), 0) if blur else image
+
+
+class TestScoring(unittest.TestCase):
+    def test_sharp_crop_scores_higher_than_blurry(self):
+        bbox = BBox(100, 100, 200, 200)
+        sharp = score_crop(textured((200, 200, 3)), 0.8, bbox, (720, 1280, 3))
+        blurry = score_crop(textured((200, 200, 3), blur=15), 0.8, bbox, (720, 1280, 3))
+        self.assertGreater(sharp, blurry)
+
+    def test_truncated_box(self):
+        self.assertTrue(is_truncated(BBox(0, 100, 50, 50), (720, 1280, 3)))
+        self.assertFalse(is_truncated(BBox(100, 100, 50, 50), (720, 1280, 3)))
+
+    def test_downscale_keeps_aspect(self):
+        self.assertEqual(downscale(np.zeros((400, 800, 3), dtype=np.uint8), 200).shape, (100, 200, 3))
+
+
+class TestBestShotSelector(unittest.TestCase):
+    def setUp(self):
+        self.archiver = MagicMock()
+        self.archiver.submit.return_value = True
+        self.selector = BestShotSelector(top_k=2, max_side=64, sample_interval=0.0, flush_interval=100,
+                                         min_score=0.0, archiver=self.archiver)
+        self.frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        self.frame[100:300, 100:300] = textured((200, 200, 3))
+
+    def submitted(self, kind):
+        return [call.args[0] for call in self.archiver.submit.call_args_list if isinstance(call.args[0], kind)]
+
+    def test_keeps_top_k_and_commits_on_track_end(self):
+        for i, confidence in enumerate([0.3, 0.9, 0.5, 0.8]):
+            self.selector.offer("dogs", 1, self.frame, BBox(100, 100, 200, 200), confidence, now=1000 + i)
+        self.selector.end_missing(set())
+
+        items = self.submitted(ArchiveItem)
+        self.assertEqual(len(items), 2)
+        sighting = self.submitted(SightingItem)[0]
+        self.assertEqual((sighting.start, sighting.end), (1000, 1003))
+        self.assertTrue(all(max(item.crop.shape[:2]) <= 64 for item in items))
+        self.assertEqual(self.selector.stats()["candidates_seen"], 4)
+        self.assertEqual(self.selector.stats()["written"], 2)
+
+    def test_periodic_flush(self):
+        self.selector.offer("dogs", 1, self.frame, BBox(100, 100, 200, 200), 0.9, now=1000)
+        self.selector.flush_due(now=1050)
+        self.assertEqual(len(self.submitted(ArchiveItem)), 0)
+        self.selector.flush_due(now=1101)
+        self.assertEqual(len(self.submitted(ArchiveItem)), 1)
+        self.assertEqual(self.selector.stats()["live_tracks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
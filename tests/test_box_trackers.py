@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+import cv2
+from app.base.box_trackers import MotionBoxTracker, FlowBoxTracker, create_box_tracker
+from app.base.detection import Detection
+from app.base.tracker import OpenCVTracker
+from app.base.bbox import BBox
+from app.base.category import Category
+
+
+def textured_frame(offset_x=0, shape=(240, 320)):
+    rng = np.random.default_rng(0)
+    frame = np.zeros(shape, dtype=np.uint8)
+    patch = rng.integers(0, 255, (60, 60), dtype=np.uint8)
+    frame[80:140, 100 + offset_x:160 + offset_x] = cv2.GaussianBlur(patch, (5, 5), 0)
+    return frame
+
+
+class TestBoxTrackers(unittest.TestCase):
+    def test_motion_tracker_extrapolates_velocity(self):
+        tracker = MotionBoxTracker()
+        tracker.init(None, (100, 100, 50, 50))
+        tracker.update(None)
+        tracker.update(None)
+        tracker.correct(None, (110, 100, 50, 50))
+
+        success, bbox = tracker.update(None)
+        self.assertTrue(success)
+        self.assertAlmostEqual(bbox[0], 115)
+
+    def test_flow_tracker_follows_shift(self):
+        tracker = FlowBoxTracker()
+        tracker.init(textured_frame(), (100, 80, 60, 60))
+
+        success, bbox = tracker.update(textured_frame(offset_x=4))
+        self.assertTrue(success)
+        self.assertAlmostEqual(bbox[0], 104, delta=1)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            create_box_tracker("boosting")
+
+    def test_downscaled_tracker_reports_full_resolution_boxes(self):
+        frame = np.dstack([textured_frame()] * 3)
+        tracker = OpenCVTracker(kind="flow", scale=0.5, workers=2)
+        obj_id = tracker.add_tracker(frame, BBox(100, 80, 60, 60), Category("dog"))
+        tracker.add_tracker(frame, BBox(10, 10, 40, 40), Category("dog"))
+
+        moved = np.dstack([textured_frame(offset_x=8)] * 3)
+        tracker.update_trackers(moved)
+        self.assertAlmostEqual(tracker.trackers[obj_id].bbox.xmin, 108, delta=2)
+
+    def test_lagged_detections_advance_trackers_first(self):
+        source = np.dstack([textured_frame()] * 3)
+        tracker = OpenCVTracker(kind="flow", max_time_gap=30)
+        obj_id = tracker.add_tracker(source, BBox(100, 80, 60, 60), Category("dog"))
+
+        # Detections from `source` arrive when the object has moved on to `current`.
+        current = np.dstack([textured_frame(offset_x=8)] * 3)
+        detections = [Detection(BBox(100, 80, 60, 60), Category("dog"), 0.9),
+                      Detection(BBox(220, 150, 40, 40), Category("dog"), 0.8)]
+        source_tracks = {obj_id: (Category("dog"), BBox(100, 80, 60, 60), 1.0)}
+        tracker.update_with_detections(current, detections, source_frame=source, source_tracks=source_tracks)
+
+        self.assertAlmostEqual(tracker.trackers[obj_id].bbox.xmin, 108, delta=2)
+        self.assertAlmostEqual(tracker.trackers[obj_id].confidence, 0.9)
+        self.assertEqual(len(tracker.trackers), 2)
+
+    def test_tracks_outside_inferred_regions_are_not_missed(self):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        tracker = OpenCVTracker(kind="motion", max_time_gap=30)
+        still = tracker.add_tracker(frame, BBox(10, 10, 40, 40), Category("dog"))
+        moving = tracker.add_tracker(frame, BBox(200, 150, 40, 40), Category("dog"))
+        gone = tracker.add_tracker(frame, BBox(100, 150, 40, 40), Category("dog"))
+
+        detections = [Detection(BBox(204, 150, 40, 40), Category("dog"), 0.9)]
+        tracker.update_with_detections(frame, detections, regions=[(90, 130, 200, 100)])
+
+        self.assertEqual(sorted(tracker.trackers), sorted([still, moving]))
+        self.assertNotIn(gone, tracker.trackers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from app.broadcast import FrameBroadcaster
+
+
+class TestFrameBroadcaster(unittest.TestCase):
+    def setUp(self):
+        self.broadcaster = FrameBroadcaster()
+
+    def test_subscribers_share_the_same_buffer(self):
+        first = self.broadcaster.subscribe()
+        second = self.broadcaster.subscribe()
+        buffer = b"\xff\xd8jpeg"
+        self.broadcaster.publish(buffer)
+
+        self.assertIs(first.next_frame(timeout=0.1), buffer)
+        self.assertIs(second.next_frame(timeout=0.1), buffer)
+
+    def test_slow_subscriber_skips_frames(self):
+        subscription = self.broadcaster.subscribe()
+        for i in range(5):
+            self.broadcaster.publish(bytes([i]))
+
+        self.assertEqual(subscription.next_frame(timeout=0.1), bytes([4]))
+        self.assertEqual(subscription.skipped, 4)
+        self.assertEqual(subscription.stats()["frames_behind"], 0)
+
+    def test_next_frame_times_out_without_new_frame(self):
+        subscription = self.broadcaster.subscribe()
+        self.assertIsNone(subscription.next_frame(timeout=0.01))
+
+    def test_unsubscribe(self):
+        subscription = self.broadcaster.subscribe()
+        self.assertEqual(self.broadcaster.subscriber_count(), 1)
+        subscription.close()
+        self.assertEqual(self.broadcaster.subscriber_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import cv2
+import numpy as np
+from app.archiver import Archiver, ClipItem
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.clips import ClipRecorder
+from app.database import clips_page, connect, get_clip
+
+DOG = Category("dog")
+PERSON = Category("person")
+
+
+def frame(i):
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    image[:, :i % 320] = 200
+    return image
+
+
+class TestClipRecorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archiver = MagicMock()
+        self.recorder = ClipRecorder(categories=["dogs"], pre_roll=1.0, post_roll=1.0, fps=10, max_side=160,
+                                     max_buffer_mb=1, max_clip_seconds=60, max_clip_mb=8, max_pending=2,
+                                     codec="MJPG", container="avi", clips_core=self.tmp.name, archiver=self.archiver)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def feed(self, start, end, tracked, step=0.1):
+        for i in range(round((end - start) / step)):
+            self.recorder.record(start + i * step, frame(i), tracked)
+
+    def test_clip_covers_pre_roll_to_post_roll(self):
+        self.feed(100.0, 103.0, {})
+        self.assertFalse(self.recorder.stats()["recording"])
+        self.assertLessEqual(len(self.recorder.buffer), 11)
+
+        self.feed(103.0, 105.0, {1: (DOG, BBox(0, 0, 10, 10), 0.9), 2: (PERSON, BBox(0, 0, 10, 10), 0.9)})
+        self.assertTrue(self.recorder.stats()["recording"])
+        self.feed(105.0, 107.0, {})
+
+        clip = self.recorder.queue.get_nowait()
+        self.assertAlmostEqual(clip.start, 101.9, delta=0.01)
+        self.assertAlmostEqual(clip.end, 105.9, delta=0.01)
+        self.assertEqual(list(clip.tracks), [("dogs", 1)])
+        self.assertEqual(clip.frames[0].data[:2], b"\xff\xd8")
+
+        path = self.recorder.write(clip)
+        capture = cv2.VideoCapture(path)
+        self.assertEqual(int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), len(clip.frames))
+        self.assertEqual(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), 160)
+        capture.release()
+        item = self.archiver.submit.call_args.args[0]
+        self.assertIsInstance(item, ClipItem)
+        first_seen, last_seen = item.tracks[("dogs", 1)]
+        self.assertAlmostEqual(first_seen, 103.0)
+        self.assertAlmostEqual(last_seen, 104.9)
+        self.assertEqual(item.size, os.path.getsize(path))
+
+    def test_memory_is_bounded(self):
+        frame_bytes = len(self.recorder.encode(0, frame(0)).data)
+        self.recorder.max_buffer_bytes = 3 * frame_bytes
+        self.feed(100.0, 102.0, {})
+        self.assertLessEqual(self.recorder.buffer_bytes, self.recorder.max_buffer_bytes)
+        self.assertLessEqual(len(self.recorder.buffer), 3)
+
+        self.recorder.max_clip_bytes = 5 * frame_bytes
+        self.feed(102.0, 106.0, {1: (DOG, BBox(0, 0, 10, 10), 0.9)})
+        stats = self.recorder.stats()
+        self.assertGreater(stats["truncated"], 2)
+        self.assertEqual(stats["pending"], 2)
+        self.assertGreater(stats["clips_dropped"], 0)
+
+    def test_stop_writes_open_clip(self):
+        self.recorder.start()
+        self.feed(100.0, 101.0, {1: (DOG, BBox(0, 0, 10, 10), 0.9)})
+        self.recorder.stop()
+        self.assertEqual(self.recorder.stats()["clips_written"], 1)
+        self.assertTrue(os.path.isfile(self.archiver.submit.call_args.args[0].path))
+
+
+class TestClipArchiving(unittest.TestCase):
+    def test_clip_rows_link_to_track_entities(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "test.db")
+            archiver = Archiver(db_file=db_file, flush_interval=0.05)
+            archiver.start()
+            archiver.submit(ClipItem("clip.mp4", 100.0, 130.0, {("dogs", 1): (105.0, 120.0), ("dogs", 2): (110.0, 125.0)},
+                                     2048))
+            archiver.stop()
+
+            conn = connect(db_file)
+            entities = [row[0] for row in conn.execute("SELECT id FROM entities ORDER BY id")]
+            self.assertEqual(len(entities), 2)
+            clip_id, start, end, path = clips_page(conn, entities[0], 10)[0]
+            self.assertEqual((start, end, path), (100, 130, "clip.mp4"))
+            self.assertEqual(get_clip(conn, clip_id)[1], entities[0])
+            sighting = conn.execute("SELECT start_ts, end_ts FROM sightings WHERE entity_id = ?", (entities[1],)).fetchone()
+            self.assertEqual(sighting, (110, 125))
+            conn.close()
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from app.database import (MAX_SIGHTING_SECONDS, SCHEMA_VERSION, add_image, connect, count_sightings_by_category,
+                          entities_seen_between, initialize_database, record_sighting, sightings_per_day)
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "test.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_migrates_legacy_dogs_table(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE dogs (id INTEGER PRIMARY KEY, first_seen TEXT, last_seen TEXT, image_path TEXT)")
+        conn.execute("INSERT INTO dogs VALUES (4, '2024-01-01_10-00-00', '2024-01-01_10-05-00', 'static/images/dogs/4/a.jpg')")
+        conn.commit()
+        conn.close()
+
+        initialize_database(self.db_file)
+        conn = connect(self.db_file)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        entity = conn.execute("SELECT id, category, last_seen - first_seen FROM entities").fetchone()
+        self.assertEqual(entity, (4, "dogs", 300))
+        self.assertEqual(conn.execute("SELECT path FROM images WHERE entity_id = 4").fetchone()[0],
+                         "static/images/dogs/4/a.jpg")
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'dogs'").fetchone())
+        conn.close()
+
+        initialize_database(self.db_file)
+
+    def test_sightings_and_range_queries(self):
+        initialize_database(self.db_file)
+        conn = connect(self.db_file)
+        open_sightings = {}
+        with conn:
+            dog = add_image(conn, open_sightings, "dogs", 1, 1000, "a.jpg")
+            add_image(conn, open_sightings, "dogs", 1, 1500, "b.jpg")
+            owner, _ = record_sighting(conn, open_sightings, "owners", 2, 5000, 5100)
+            record_sighting(conn, open_sightings, "dogs", 1, 1500, 1000 + MAX_SIGHTING_SECONDS + 10)
+
+        self.assertEqual(conn.execute("SELECT sightings FROM entities WHERE id = ?", (dog,)).fetchone()[0], 2)
+        self.assertEqual(entities_seen_between(conn, 1200, 1300), [dog])
+        self.assertEqual(sorted(entities_seen_between(conn, 0, 10000)), [dog, owner])
+        self.assertEqual(entities_seen_between(conn, 0, 10000, category="owners"), [owner])
+        self.assertEqual(entities_seen_between(conn, 10000, 20000), [])
+
+        counts = count_sightings_by_category(conn, 0, 10000)
+        self.assertEqual(counts["dogs"], {"sightings": 2, "entities": 1})
+        self.assertEqual(sightings_per_day(conn, "dogs", 0, 86400), [(0, 2)])
+        conn.close()
+
+    def test_out_of_order_rows_keep_sightings_bounded(self):
+        initialize_database(self.db_file)
+        conn = connect(self.db_file)
+        open_sightings = {}
+        with conn:
+            record_sighting(conn, open_sightings, "dogs", 1, 5000, 5000)
+            # A clip span arriving late moves the start back; the next row must roll over.
+            record_sighting(conn, open_sightings, "dogs", 1, 3000, 5000)
+            record_sighting(conn, open_sightings, "dogs", 1, 5000, 3000 + MAX_SIGHTING_SECONDS + 10)
+        spans = conn.execute("SELECT start_ts, end_ts FROM sightings ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(len(spans), 2)
+        self.assertTrue(all(end - start <= MAX_SIGHTING_SECONDS for start, end in spans))
+
+    def test_long_first_span_is_split(self):
+        initialize_database(self.db_file)
+        conn = connect(self.db_file)
+        open_sightings = {}
+        with conn:
+            dog, _ = record_sighting(conn, open_sightings, "dogs", 1, 1000, 1000 + 2 * MAX_SIGHTING_SECONDS + 500)
+            record_sighting(conn, open_sightings, "dogs", 1, 1000 + 2 * MAX_SIGHTING_SECONDS + 600,
+                            1000 + 2 * MAX_SIGHTING_SECONDS + 700)
+        spans = conn.execute("SELECT start_ts, end_ts FROM sightings ORDER BY id").fetchall()
+        self.assertEqual(spans, [(1000, 1000 + MAX_SIGHTING_SECONDS),
+                                 (1000 + MAX_SIGHTING_SECONDS, 1000 + 2 * MAX_SIGHTING_SECONDS),
+                                 (1000 + 2 * MAX_SIGHTING_SECONDS, 1000 + 2 * MAX_SIGHTING_SECONDS + 700)])
+        # More than an hour after the span started, beyond the start_ts lower bound of the queries.
+        self.assertEqual(entities_seen_between(conn, 5000, 5100), [dog])
+        self.assertEqual(count_sightings_by_category(conn, 5000, 5100)["dogs"]["sightings"], 1)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
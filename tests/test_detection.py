@@ -4,6 +4,7 @@ import pandas as pd
 import numpy as np
 from app.base.detection import Detection, detect_objects, filter_duplicate_detections, load_model
 from app.base.bbox import BBox
+from app.base.postprocess import detections_from_array, detections_from_pandas
 from app.base.category import Category
 
 
@@ -12,7 +13,7 @@ class TestDetection(unittest.TestCase):
         self.mock_frame = np.zeros((720, 1280, 3), dtype=np.uint8)
         self.mock_model = MagicMock()
 
-    @patch("app.base.detection.torch.hub.load")
+    @patch("torch.hub.load")
     @patch("app.base.detection.os.path.isfile")
     def test_load_model_existing_path(self, mock_isfile, mock_hub_load):
         mock_isfile.return_value = True
@@ -24,9 +25,9 @@ class TestDetection(unittest.TestCase):
         mock_isfile.assert_called_with(model_path)
         self.assertIsNotNone(model)
 
-    @patch("app.base.detection.torch.hub.load")
+    @patch("torch.hub.load")
     @patch("app.base.detection.os.path.isfile")
-    @patch("app.base.detection.torch.save")
+    @patch("torch.save")
     def test_load_model_download_model(self, mock_save, mock_isfile, mock_hub_load):
         mock_isfile.return_value = False
         mock_hub_load.return_value = MagicMock()
@@ -40,10 +41,11 @@ class TestDetection(unittest.TestCase):
 
     def test_detect_objects(self):
         mock_results = MagicMock()
-        mock_results.pandas.return_value.xyxy = [
-            pd.DataFrame([
-                {"xmin": 50, "ymin": 50, "xmax": 100, "ymax": 100, "confidence": 0.9, "name": "dog"},
-                {"xmin": 150, "ymin": 150, "xmax": 200, "ymax": 200, "confidence": 0.85, "name": "cat"}
+        mock_results.names = {0: "person", 15: "cat", 16: "dog"}
+        mock_results.xyxy = [
+            np.array([
+                [50, 50, 100, 100, 0.9, 16],
+                [150, 150, 200, 200, 0.85, 15],
             ])
         ]
         self.mock_model.return_value = mock_results
@@ -54,6 +56,22 @@ class TestDetection(unittest.TestCase):
         self.assertEqual(len(detections), 1)
         self.assertIsInstance(detections[0], Detection)
         self.assertEqual(detections[0].category, Category("dog"))
+        self.assertEqual(detections[0].bbox, BBox(50, 50, 50, 50))
+        self.assertAlmostEqual(detections[0].confidence, 0.9)
+
+    def test_detections_from_pandas_matches_array_path(self):
+        mock_results = MagicMock()
+        mock_results.pandas.return_value.xyxy = [
+            pd.DataFrame([
+                {"xmin": 50.7, "ymin": 50.2, "xmax": 100.9, "ymax": 100.1, "confidence": 0.9, "name": "dog"},
+                {"xmin": 150, "ymin": 150, "xmax": 200, "ymax": 200, "confidence": 0.85, "name": "cat"}
+            ])
+        ]
+        pred = np.array([[50.7, 50.2, 100.9, 100.1, 0.9, 1], [150, 150, 200, 200, 0.85, 0]])
+
+        expected = detections_from_pandas(mock_results, ["dog"])
+        detections = detections_from_array(pred, ["cat", "dog"], ["dog"])
+        self.assertEqual([d.to_tuple() for d in detections], [d.to_tuple() for d in expected])
 
     def test_filter_duplicate_detections(self):
         bbox1 = BBox(50, 50, 100, 100)
@@ -0,0 +1,67 @@
+import unittest
+import cv2
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.broadcast import FrameBroadcaster
+from app.encoder import OpenCVJpeg, StreamEncoder, load_jpeg_encoder, preview_size
+
+
+class TestStreamEncoder(unittest.TestCase):
+    def setUp(self):
+        self.broadcaster = FrameBroadcaster()
+        self.frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        self.tracked = {1: (Category("dog"), BBox(100, 100, 200, 150), 0.9)}
+
+    def encoder(self, **kwargs):
+        options = dict(preview_width=640, quality=80, target_bitrate_kbps=None, max_fps=1000, jpeg_encoder=OpenCVJpeg())
+        options.update(kwargs)
+        return StreamEncoder(self.broadcaster, **options)
+
+    def test_skips_without_subscribers(self):
+        encoder = self.encoder()
+        self.assertIsNone(encoder.encode(self.frame, self.tracked, 30.0))
+        self.assertEqual(encoder.stats()["skipped_idle"], 1)
+        self.assertEqual(self.broadcaster.seq, 0)
+
+    def test_encodes_at_preview_resolution_without_touching_source(self):
+        original = self.frame.copy()
+        encoder = self.encoder()
+        subscription = self.broadcaster.subscribe()
+        buffer = encoder.encode(self.frame, self.tracked, 30.0)
+        subscription.close()
+
+        decoded = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, (360, 640, 3))
+        np.testing.assert_array_equal(self.frame, original)
+        self.assertEqual(self.broadcaster.seq, 1)
+
+    def test_frame_rate_limit(self):
+        encoder = self.encoder(max_fps=10)
+        subscription = self.broadcaster.subscribe()
+        self.assertIsNotNone(encoder.encode(self.frame, {}, 30.0, now=100.0))
+        self.assertIsNone(encoder.encode(self.frame, {}, 30.0, now=100.05))
+        self.assertIsNotNone(encoder.encode(self.frame, {}, 30.0, now=100.11))
+        subscription.close()
+        self.assertEqual(encoder.stats()["skipped_rate"], 1)
+
+    def test_quality_drops_to_fit_bitrate(self):
+        encoder = self.encoder(target_bitrate_kbps=500, min_fps=5, min_quality=30)
+        subscriptions = [self.broadcaster.subscribe() for _ in range(3)]
+        for i in range(20):
+            encoder.encode(self.frame, {}, 30.0, now=100.0 + i)
+        for subscription in subscriptions:
+            subscription.close()
+        self.assertEqual(encoder.fps_limit, 5)
+        self.assertEqual(encoder.quality, 30)
+
+    def test_preview_size_and_fallback(self):
+        self.assertEqual(preview_size((720, 1280, 3), 960), (960, 540))
+        self.assertEqual(preview_size((480, 640, 3), 960), (640, 480))
+        self.assertIn(load_jpeg_encoder("auto").name, ("simplejpeg", "turbojpeg", "opencv"))
+        with self.assertRaises(ValueError):
+            load_jpeg_encoder("png")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import cv2
+import numpy as np
+from app.framebuffer import FrameRing
+from app.pipeline import FramePipeline
+from app.sources import ImageDirectorySource, VideoFileSource, read_into
+
+
+def read_latest(name, results):
+    ring = FrameRing.attach(name)
+    slot, seq, timestamp, view = ring.latest()
+    results.put((seq, timestamp, int(view[0, 0, 0]), view.flags.writeable, ring.valid(slot, seq)))
+    ring.close()
+
+
+class TestFrameRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = FrameRing((8, 8, 3), slots=3)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def write(self, value, seq):
+        slot, buffer = self.ring.acquire()
+        buffer[:] = value
+        return slot, self.ring.commit(slot, seq, 100.0 + seq)
+
+    def test_views_are_read_only(self):
+        _, view = self.write(7, 0)
+        self.assertEqual(int(view[0, 0, 0]), 7)
+        self.assertFalse(view.flags.writeable)
+        with self.assertRaises(ValueError):
+            view[0, 0, 0] = 1
+
+    def test_slot_is_not_reused_while_view_is_held(self):
+        first_slot, held = self.write(1, 0)
+        slots = {self.write(2 + i, 1 + i)[0] for i in range(4)}
+        self.assertNotIn(first_slot, slots)
+        self.assertEqual(int(held[0, 0, 0]), 1)
+
+        views = [self.write(9, 10 + i)[1] for i in range(2)]
+        with self.assertRaises(RuntimeError):
+            self.ring.acquire()
+        del held, views
+        self.ring.acquire()
+
+    def test_latest_and_seqlock(self):
+        self.assertIsNone(self.ring.latest())
+        slot, _ = self.write(5, 42)
+        latest_slot, seq, timestamp, view = self.ring.latest()
+        self.assertEqual((latest_slot, seq, timestamp, int(view[0, 0, 0])), (slot, 42, 142.0, 5))
+        self.assertTrue(self.ring.valid(slot, 42))
+        self.ring.seqs[slot] = -1
+        self.assertFalse(self.ring.valid(slot, 42))
+
+    def test_view_outlives_ring(self):
+        _, view = self.write(3, 0)
+        self.ring.close()
+        self.assertEqual(int(view.sum()), 3 * view.size)
+
+    def test_attach_from_another_process(self):
+        if self.ring.name is None:
+            self.skipTest("shared memory unavailable")
+        self.write(11, 5)
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=read_latest, args=(self.ring.name, results))
+        process.start()
+        process.join(30)
+        self.assertEqual(results.get(timeout=5), (5, 105.0, 11, False, True))
+        # The reader must not have unlinked the segment on exit.
+        reader = FrameRing.attach(self.ring.name)
+        self.assertEqual(reader.shape, (8, 8, 3))
+        reader.close()
+
+    def test_process_local_fallback(self):
+        ring = FrameRing((4, 4), slots=2, shared=False)
+        slot, buffer = ring.acquire()
+        buffer[:] = 1
+        self.assertIsNone(ring.name)
+        self.assertEqual(int(ring.commit(slot, 0, 0.0).sum()), 16)
+
+
+class TestReadInto(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frame = np.full((48, 64, 3), 120, dtype=np.uint8)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_video_decodes_into_buffer(self):
+        path = os.path.join(self.tmp.name, "clip.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        writer.write(self.frame)
+        writer.release()
+        out = np.zeros_like(self.frame)
+        with VideoFileSource(path) as source:
+            self.assertIs(source.read_into(out), out)
+        self.assertGreater(int(out.mean()), 100)
+
+    def test_copies_from_other_sources(self):
+        cv2.imwrite(os.path.join(self.tmp.name, "000.png"), self.frame)
+        out = np.zeros_like(self.frame)
+        self.assertIs(read_into(ImageDirectorySource(self.tmp.name), out), out)
+        np.testing.assert_array_equal(out, self.frame)
+
+        camera = MagicMock()
+        camera.capture_array.return_value = None
+        self.assertIsNone(read_into(camera, out))
+
+
+class TestPipelineFrameRing(unittest.TestCase):
+    def test_capture_hands_out_ring_views(self):
+        camera = MagicMock()
+        camera.capture_array.side_effect = lambda: np.full((120, 160, 3), 9, dtype=np.uint8)
+        pipeline = FramePipeline(camera, MagicMock(), MagicMock())
+        for _ in range(3):
+            pipeline.capture(None)
+
+        packets = [pipeline.queues["tracking"].get_nowait() for _ in range(3)]
+        self.assertEqual([packet.seq for packet in packets], [0, 1, 2])
+        self.assertTrue(all(not packet.image.flags.writeable for packet in packets))
+        self.assertEqual(pipeline.stats()["frame_ring"]["in_use"], 3)
+        pipeline.ring.close()
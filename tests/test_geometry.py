@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from app.base.bbox import BBox
+from app.base.geometry import bboxes_to_array, iou_matrix, nms, greedy_match
+
+
+def random_bboxes(rng, n):
+    return [BBox(int(x), int(y), int(w), int(h))
+            for x, y, w, h in zip(rng.integers(0, 1200, n), rng.integers(0, 700, n),
+                                  rng.integers(1, 200, n), rng.integers(1, 200, n))]
+
+
+class TestGeometry(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_iou_matrix_matches_compute_iou(self):
+        a = random_bboxes(self.rng, 40)
+        b = random_bboxes(self.rng, 30)
+        iou = iou_matrix(bboxes_to_array(a), bboxes_to_array(b))
+
+        expected = np.array([[x.compute_iou(y) for y in b] for x in a])
+        np.testing.assert_allclose(iou, expected)
+
+    def test_bbox_is_hashable_by_value(self):
+        boxes = {BBox(1, 2, 3, 4): "a"}
+        self.assertEqual(boxes[BBox(1, 2, 3, 4)], "a")
+        self.assertEqual(len({BBox(1, 2, 3, 4), BBox(1, 2, 3, 4), BBox(0, 0, 1, 1)}), 2)
+
+    def test_iou_matrix_empty(self):
+        self.assertEqual(iou_matrix(np.empty((0, 4)), np.empty((3, 4))).shape, (0, 3))
+
+    def test_nms_matches_sequential_filter(self):
+        bboxes = random_bboxes(self.rng, 200)
+        expected = []
+        for i, bbox in enumerate(bboxes):
+            if not any(bbox.compute_iou(bboxes[j]) > 0.3 for j in expected):
+                expected.append(i)
+
+        keep = nms(bboxes_to_array(bboxes), 0.3)
+        self.assertEqual(keep.tolist(), expected)
+
+    def test_nms_class_aware_and_scored(self):
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10]])
+        keep = nms(boxes, 0.5, scores=[0.5, 0.9, 0.8], classes=[0, 0, 1])
+        self.assertEqual(sorted(keep.tolist()), [1, 2])
+        self.assertEqual(keep[0], 1)
+
+    def test_greedy_match(self):
+        iou = np.array([
+            [0.6, 0.7, 0.0],
+            [0.0, 0.9, 0.2],
+            [0.0, 0.0, 0.0],
+        ])
+        matched, unmatched_rows, unmatched_cols = greedy_match(iou, 0.5)
+
+        self.assertEqual(matched, [(0, 1)])
+        self.assertEqual(unmatched_rows, [1, 2])
+        self.assertEqual(unmatched_cols, [0, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from app.base.inference import (InferenceBackend, InferenceResults, decode_yolov5_output, letterbox,
+                                model_variant_path, load_backend)
+from app.base.detection import detect_objects
+
+
+def raw_row(cx, cy, w, h, objectness, class_id, score=1.0, classes=80):
+    row = np.zeros(5 + classes, dtype=np.float32)
+    row[:5] = cx, cy, w, h, objectness
+    row[5 + class_id] = score
+    return row
+
+
+class FixedBackend(InferenceBackend):
+    name = "fixed"
+
+    def __init__(self, pred):
+        super().__init__()
+        self.pred = pred
+
+    def infer(self, frame):
+        return self.pred
+
+
+class TestInference(unittest.TestCase):
+    def test_letterbox_pads_to_square(self):
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        image, ratio, pad = letterbox(frame, 640)
+
+        self.assertEqual(image.shape, (640, 640, 3))
+        self.assertAlmostEqual(ratio, 0.5)
+        self.assertEqual(pad, (0, 140))
+
+    def test_decode_maps_back_to_frame_and_suppresses(self):
+        raw = np.stack([
+            raw_row(320, 320, 100, 50, 0.9, 16),
+            raw_row(322, 321, 100, 50, 0.8, 16),
+            raw_row(100, 200, 40, 40, 0.1, 0),
+        ])
+        pred = decode_yolov5_output(raw, 0.5, (0, 140), (720, 1280, 3), 0.25, 0.45)
+
+        self.assertEqual(pred.shape, (1, 6))
+        np.testing.assert_allclose(pred[0, :4], [540, 310, 740, 410])
+        self.assertAlmostEqual(pred[0, 4], 0.9, places=5)
+        self.assertEqual(pred[0, 5], 16)
+
+    def test_model_variant_path(self):
+        self.assertEqual(model_variant_path("./m/yolov5n.onnx", "int8"), "./m/yolov5n-int8.onnx")
+        self.assertEqual(model_variant_path("./m/yolov5n.onnx", "fp32"), "./m/yolov5n.onnx")
+
+    def test_backend_works_with_detect_objects(self):
+        backend = FixedBackend(np.array([[10, 20, 60, 80, 0.7, 16], [0, 0, 5, 5, 0.9, 2]], dtype=np.float32))
+        self.assertIsInstance(backend(None), InferenceResults)
+
+        detections = detect_objects(backend, np.zeros((100, 100, 3), dtype=np.uint8), ["dog"])
+        self.assertEqual(len(detections), 1)
+        self.assertEqual(detections[0].bbox.to_tuple(), (10, 20, 50, 60))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            load_backend("tensorrt")
+
+
+if __name__ == "__main__":
+    unittest.main()
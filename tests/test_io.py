@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from app.io import LastSavedIndex, check_if_recently_saved, parse_timestamp, TIMESTAMP_FORMAT
+
+
+class TestLastSavedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = datetime.now()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, category, obj_id, name):
+        base_dir = os.path.join(self.tmp.name, category, str(obj_id))
+        os.makedirs(base_dir, exist_ok=True)
+        open(os.path.join(base_dir, f"{name}.jpg"), "wb").close()
+
+    def test_rebuilds_from_legacy_and_new_filenames(self):
+        recent = self.now - timedelta(seconds=5)
+        self.touch("dogs", 1, (self.now - timedelta(minutes=5)).strftime("%Y-%m-%d_%H-%M-%S"))
+        self.touch("dogs", 1, recent.strftime(TIMESTAMP_FORMAT))
+        self.touch("owners", 2, (self.now - timedelta(seconds=3)).strftime("%Y-%m-%d_%H-%M-%S"))
+
+        index = LastSavedIndex(self.tmp.name)
+        self.assertAlmostEqual(index.last_saved("dogs", 1), recent.timestamp(), places=3)
+        self.assertTrue(check_if_recently_saved("owners", 2, self.now, index=index))
+        self.assertFalse(check_if_recently_saved("dogs", 3, self.now, index=index))
+
+    def test_rebuild_skips_entries_older_than_ttl(self):
+        self.touch("dogs", 1, (self.now - timedelta(hours=3)).strftime(TIMESTAMP_FORMAT))
+        index = LastSavedIndex(self.tmp.name, ttl=3600)
+        self.assertIsNone(index.last_saved("dogs", 1))
+
+    def test_cooldown_without_filesystem(self):
+        index = LastSavedIndex(os.path.join(self.tmp.name, "missing"))
+        index.record("dogs", 7, self.now.timestamp())
+
+        self.assertTrue(check_if_recently_saved("dogs", 7, self.now + timedelta(seconds=9.5), index=index))
+        self.assertFalse(check_if_recently_saved("dogs", 7, self.now + timedelta(seconds=10), index=index))
+
+    def test_lru_eviction(self):
+        index = LastSavedIndex(os.path.join(self.tmp.name, "missing"), max_entries=2)
+        now = time.time()
+        index.record("dogs", 1, now)
+        index.record("dogs", 2, now)
+        index.last_saved("dogs", 1)
+        index.record("dogs", 3, now)
+
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.last_saved("dogs", 2))
+        self.assertIsNotNone(index.last_saved("dogs", 1))
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("2024-01-02_03-04-05"), datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(parse_timestamp("2024-01-02_03-04-05-123456"), datetime(2024, 1, 2, 3, 4, 5, 123456))
+        self.assertIsNone(parse_timestamp("thumbnail"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+import unittest
+from app.metrics import NULL_TIMER, Histogram, Metrics, SamplingProfiler
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_interpolate_within_buckets(self):
+        histogram = Histogram(buckets=(0.01, 0.02, 0.04), window=60, slices=6)
+        for _ in range(50):
+            histogram.observe(0.005, now=100.0)
+        for _ in range(50):
+            histogram.observe(0.03, now=100.0)
+
+        self.assertAlmostEqual(histogram.quantile(0.5, now=100.0), 0.01)
+        self.assertAlmostEqual(histogram.quantile(0.75, now=100.0), 0.03)
+        self.assertEqual(histogram.count, 100)
+
+    def test_window_forgets_old_observations(self):
+        histogram = Histogram(buckets=(0.01, 0.1), window=60, slices=6)
+        histogram.observe(0.05, now=0.0)
+        histogram.observe(0.005, now=100.0)
+
+        self.assertEqual(sum(histogram.window_counts(now=100.0)), 1)
+        self.assertLess(histogram.quantile(0.99, now=100.0), 0.01)
+        self.assertEqual(histogram.count, 2)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics(enabled=False)
+        self.assertIs(metrics.timer("draw"), NULL_TIMER)
+        metrics.observe("draw", 0.1)
+        metrics.inc("frames_captured")
+        self.assertEqual(metrics.histograms, {})
+        self.assertEqual(metrics.counters, {})
+
+    def test_prometheus_exposition(self):
+        metrics = Metrics(enabled=True)
+        with metrics.timer("jpeg_encode"):
+            pass
+        metrics.observe("inference", 0.2)
+        metrics.inc("frames_captured", 3)
+
+        text = metrics.render_prometheus()
+        self.assertIn('dogarchivist_stage_seconds_bucket{stage="inference",le="0.25"} 1', text)
+        self.assertIn('dogarchivist_stage_seconds_bucket{stage="inference",le="0.1"} 0', text)
+        self.assertIn('dogarchivist_stage_seconds_count{stage="jpeg_encode"} 1', text)
+        self.assertIn('dogarchivist_stage_seconds_window{stage="inference",quantile="0.5"}', text)
+        self.assertIn("dogarchivist_frames_captured_total 3", text)
+        self.assertEqual(set(metrics.summary()), {"inference", "jpeg_encode"})
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_writes_collapsed_stacks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = SamplingProfiler(0.1, interval=0.01, output_dir=tmp)
+            profiler.start()
+            time.sleep(0.05)
+            profiler.join(timeout=5)
+
+            self.assertGreater(profiler.samples, 0)
+            with open(profiler.output_path) as file:
+                lines = file.read().splitlines()
+            self.assertTrue(lines)
+            self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+            self.assertTrue(os.path.dirname(profiler.output_path) == tmp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from app.base.motion import MotionGate, merge_rects
+from app.base.detection import Detection, detect_in_regions
+from app.base.bbox import BBox
+from app.base.category import Category
+
+
+class TestMotionGate(unittest.TestCase):
+    def setUp(self):
+        self.background = np.full((360, 640, 3), 80, dtype=np.uint8)
+        self.gate = MotionGate(width=160, roi_inference=True, padding=16, min_roi_size=64,
+                               max_roi_fraction=0.5, history=50, var_threshold=16)
+
+    def test_static_frames_are_skipped(self):
+        self.assertIsNone(self.gate.regions(self.background))
+        for _ in range(10):
+            self.assertEqual(self.gate.regions(self.background), [])
+        self.assertEqual(self.gate.stats()["inferences_skipped"], 10)
+
+    def test_motion_returns_full_frame_regions(self):
+        for _ in range(20):
+            self.gate.regions(self.background)
+        frame = self.background.copy()
+        frame[100:180, 300:380] = 250
+
+        regions = self.gate.regions(frame)
+        self.assertEqual(len(regions), 1)
+        x, y, w, h = regions[0]
+        self.assertTrue(x <= 300 and y <= 100 and x + w >= 380 and y + h >= 180)
+        self.assertEqual(self.gate.stats()["roi_inferences"], 1)
+
+    def test_merge_rects(self):
+        merged = merge_rects([(0, 0, 10, 10), (5, 5, 10, 10), (50, 50, 5, 5)])
+        self.assertEqual(sorted(merged), [(0, 0, 15, 15), (50, 50, 5, 5)])
+
+
+class TestDetectInRegions(unittest.TestCase):
+    @patch("app.base.detection.detect_objects")
+    def test_boxes_mapped_to_frame_coordinates(self, mock_detect):
+        mock_detect.side_effect = lambda model, crop, classes: [Detection(BBox(5, 5, 20, 20), Category("dog"), 0.9)]
+        frame = np.zeros((360, 640, 3), dtype=np.uint8)
+
+        detections = detect_in_regions(MagicMock(), frame, ["dog"], [(100, 50, 64, 64)])
+        self.assertEqual(detections[0].bbox, BBox(105, 55, 20, 20))
+        self.assertEqual(mock_detect.call_args[0][1].shape, (64, 64, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
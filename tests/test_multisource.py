@@ -0,0 +1,77 @@
+import queue
+import time
+import unittest
+import threading
+from unittest.mock import MagicMock, patch
+from app.archiver import SightingItem
+from app.multisource import FrameRelay, MultiSourceManager, QueueArchiver, run_worker
+
+
+def fake_worker(name, spec, index, threads, frames, archive_items, stats, subscribers, stop_event, **options):
+    relay = FrameRelay(frames, subscribers)
+    QueueArchiver(archive_items).submit(SightingItem("dogs", index * 1_000_000 + 1, 1000, 1010))
+    while not stop_event.wait(0.05):
+        relay.publish(f"{name}-jpeg".encode())
+        try:
+            stats.put_nowait((name, {"cpu_percent": 1.0, "threads": threads}))
+        except queue.Full:
+            pass
+
+
+class TestFrameRelay(unittest.TestCase):
+    def test_drops_when_parent_is_behind(self):
+        frames = queue.Queue(maxsize=1)
+        relay = FrameRelay(frames, MagicMock(value=2))
+        relay.publish(b"a")
+        relay.publish(b"b")
+        self.assertEqual(relay.subscriber_count(), 2)
+        self.assertEqual((relay.published, relay.dropped), (1, 1))
+        self.assertEqual(frames.get_nowait(), b"a")
+
+
+class TestRunWorker(unittest.TestCase):
+    def test_clips_and_best_shots_go_to_the_parent(self):
+        archive_items = queue.Queue()
+        stop_event = threading.Event()
+        stop_event.set()
+        with patch("app.sources.open_source"), patch("app.base.inference.load_backend"), \
+                patch("app.pipeline.FramePipeline") as FramePipeline:
+            run_worker("front", "a.mp4", 1, 1, queue.Queue(), archive_items, queue.Queue(), MagicMock(), stop_event)
+
+        pipeline = FramePipeline.return_value
+        self.assertIsInstance(pipeline.clip_recorder.archiver, QueueArchiver)
+        self.assertIs(pipeline.clip_recorder.archiver, pipeline.bestshot.archiver)
+        self.assertIs(pipeline.clip_recorder.archiver.items, archive_items)
+        pipeline.stop.assert_called_once()
+
+
+class TestMultiSourceManager(unittest.TestCase):
+    def test_workers_stream_report_and_share_one_archiver(self):
+        archiver = MagicMock()
+        manager = MultiSourceManager([{"name": "front", "source": "a.mp4"}, {"name": "back", "source": "b.mp4"}],
+                                     threads_per_worker=1, archiver=archiver, worker=fake_worker)
+        manager.start()
+        try:
+            subscription = manager.broadcaster("back").subscribe()
+            frame = subscription.next_frame(timeout=30)
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and not all(h.stats for h in manager.handles.values()):
+                time.sleep(0.05)
+            subscription.close()
+        finally:
+            manager.stop()
+
+        self.assertEqual(frame, b"back-jpeg")
+        stats = manager.stats()
+        self.assertEqual(set(stats), {"front", "back"})
+        self.assertEqual(stats["front"]["threads"], 1)
+        submitted = sorted(call.args[0].obj_id for call in archiver.submit.call_args_list)
+        self.assertEqual(submitted, [1, 1_000_001])
+
+    def test_duplicate_names_rejected(self):
+        with self.assertRaises(ValueError):
+            MultiSourceManager([{"name": "front", "source": "a"}, {"name": "front", "source": "b"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
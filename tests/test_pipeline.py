@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.base.detection import Detection
+from app.base.tracker import OpenCVTracker
+from app.pipeline import BoundedQueue, DetectionResult, FramePacket, FramePipeline, StageStats
+
+
+class TestBoundedQueue(unittest.TestCase):
+    def test_drop_oldest_when_full(self):
+        queue = BoundedQueue(2)
+        for item in range(5):
+            queue.put(item)
+
+        self.assertEqual(queue.qsize(), 2)
+        self.assertEqual(queue.dropped, 3)
+        self.assertEqual(queue.get_nowait(), 3)
+        self.assertEqual(queue.get_nowait(), 4)
+        self.assertIsNone(queue.get_nowait())
+
+    def test_get_timeout_returns_none(self):
+        queue = BoundedQueue(1)
+        self.assertIsNone(queue.get(timeout=0.01))
+
+
+class TestStageStats(unittest.TestCase):
+    def test_snapshot(self):
+        stats = StageStats()
+        stats.record(0.01)
+        stats.record(0.03)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["processed"], 2)
+        self.assertAlmostEqual(snapshot["avg_ms"], 20.0, places=1)
+
+
+class TestFramePipeline(unittest.TestCase):
+    @patch("app.pipeline.detect_objects", return_value=[])
+    def test_pipeline_produces_jpeg_frames(self, mock_detect):
+        camera = MagicMock()
+        camera.capture_array.side_effect = lambda: np.zeros((120, 160, 3), dtype=np.uint8)
+        tracker = MagicMock()
+        tracker.trackers = {}
+        tracker.update_trackers.return_value = {}
+
+        pipeline = FramePipeline(camera, MagicMock(), tracker)
+        subscription = pipeline.broadcaster.subscribe()
+        pipeline.start()
+        try:
+            buffer = subscription.next_frame(timeout=5)
+        finally:
+            pipeline.stop()
+            subscription.close()
+
+        self.assertTrue(buffer.startswith(b"\xff\xd8"))
+        stats = pipeline.stats()
+        self.assertIn("capture", stats)
+        self.assertIn("queue_depth", stats["encode"])
+
+    @patch("app.pipeline.detect_objects", return_value=[])
+    def test_step_runs_stages_synchronously(self, mock_detect):
+        tracker = MagicMock()
+        tracker.trackers = {}
+        tracker.update_trackers.return_value = {}
+        pipeline = FramePipeline(MagicMock(), MagicMock(), tracker)
+        pipeline.motion_gate = None
+
+        timings = pipeline.step(np.zeros((120, 160, 3), dtype=np.uint8), timestamp=1000.0, capture_fps=30)
+
+        self.assertEqual(set(timings), {"inference", "tracking", "encode", "archive"})
+        mock_detect.assert_called_once()
+        self.assertEqual(pipeline.stats()["tracking"]["processed"], 1)
+
+    @patch("app.pipeline.update_trackers_with_yolo", return_value={})
+    def test_lagged_detections_carry_their_frame(self, mock_update):
+        tracker = MagicMock()
+        tracker.trackers = {}
+        tracker.update_trackers.return_value = {}
+        pipeline = FramePipeline(MagicMock(), MagicMock(), tracker)
+        pipeline.max_detection_age = 0.5
+        source = FramePacket(10, 1000.0, np.zeros((120, 160, 3), dtype=np.uint8))
+        source.tracked = {}
+        current = FramePacket(12, 1000.3, np.ones((120, 160, 3), dtype=np.uint8))
+
+        pipeline.queues["detections"].put(DetectionResult(source, ["dog"]))
+        pipeline.track(current)
+        self.assertIs(mock_update.call_args.args[3], source.image)
+        self.assertIs(mock_update.call_args.args[4], source.tracked)
+
+        pipeline.queues["detections"].put(DetectionResult(current, ["dog"], [(0, 0, 40, 40)]))
+        pipeline.track(current)
+        self.assertEqual(len(mock_update.call_args.args), 3)
+        self.assertEqual(mock_update.call_args.kwargs["regions"], [(0, 0, 40, 40)])
+
+        pipeline.queues["detections"].put(DetectionResult(FramePacket(2, 999.0, source.image), ["dog"]))
+        pipeline.track(current)
+        self.assertEqual(mock_update.call_count, 2)
+        tracker.update_trackers.assert_called_once()
+        self.assertEqual(pipeline.stats()["tracking"]["stale_detections"], 1)
+
+    def test_lagged_detections_keep_motion_tracks(self):
+        # A dog moving 4 px a frame, detected every 5th frame with the result arriving 3 frames
+        # late: its motion track must be re-anchored each time, not replaced by a new ID.
+        tracker = OpenCVTracker(kind="motion", max_time_gap=30)
+        pipeline = FramePipeline(MagicMock(), MagicMock(), tracker)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        sent = {}
+        seen = set()
+        for seq in range(60):
+            packet = FramePacket(seq, 1000 + seq / 30, frame)
+            if seq % 5 == 0:
+                sent[seq] = packet
+            if seq - 3 in sent:
+                detection = Detection(BBox(20 + 4 * (seq - 3), 200, 80, 80), Category("dog"), 0.9)
+                pipeline.queues["detections"].put(DetectionResult(sent.pop(seq - 3), [detection]))
+            pipeline.track(packet)
+            seen.update(packet.tracked)
+
+        self.assertEqual(seen, {1})
+        self.assertAlmostEqual(packet.tracked[1][1].xmin, 20 + 4 * 59, delta=8)
+
+    def test_exhausted_source_finishes_capture(self):
+        camera = MagicMock()
+        camera.capture_array.return_value = None
+        pipeline = FramePipeline(camera, MagicMock(), MagicMock())
+        pipeline.start()
+        try:
+            self.assertTrue(pipeline.finished.wait(timeout=5))
+        finally:
+            pipeline.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from app.archiver import Archiver, SightingItem
+from app.base.reid import HistogramEmbedder, ReIdentifier, VectorIndex
+
+
+def striped_crop(top, bottom, seed=0):
+    rng = np.random.default_rng(seed)
+    crop = np.empty((120, 60, 3), dtype=np.uint8)
+    crop[:60] = top
+    crop[60:] = bottom
+    noise = rng.integers(-8, 9, crop.shape)
+    return np.clip(crop.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+class TestHistogramEmbedder(unittest.TestCase):
+    def test_similar_crops_score_higher_than_different_ones(self):
+        embedder = HistogramEmbedder()
+        brown = embedder.embed(striped_crop((140, 90, 40), (90, 60, 30), seed=1))
+        brown_again = embedder.embed(striped_crop((140, 90, 40), (90, 60, 30), seed=2))
+        white = embedder.embed(striped_crop((40, 90, 200), (220, 220, 220), seed=3))
+        self.assertEqual(brown.shape, (embedder.dim,))
+        self.assertAlmostEqual(float(np.linalg.norm(brown)), 1.0, places=5)
+        self.assertGreater(float(brown @ brown_again), 0.95)
+        self.assertLess(float(brown @ white), float(brown @ brown_again))
+
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_grows_and_persists(self):
+        path = os.path.join(self.tmp.name, "dogs")
+        index = VectorIndex(8, path, capacity=4)
+        for label, vector in enumerate(self.vectors):
+            index.add(vector, label)
+        self.assertEqual(len(index), 50)
+        self.assertEqual(index.search(self.vectors[17])[0][0], 17)
+        labels = [label for label, _ in index.search(self.vectors[3], k=3)]
+        self.assertEqual(labels[0], 3)
+        self.assertEqual(len(labels), 3)
+        index.flush()
+
+        reopened = VectorIndex(8, path)
+        self.assertEqual(len(reopened), 50)
+        self.assertEqual(reopened.search(self.vectors[42])[0][0], 42)
+        with self.assertRaises(ValueError):
+            VectorIndex(16, path)
+
+    def test_empty_index(self):
+        self.assertEqual(VectorIndex(8).search(self.vectors[0]), [])
+
+
+class TestArchiverReid(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "test.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_track_joins_matching_identity(self):
+        reid = ReIdentifier(HistogramEmbedder(), os.path.join(self.tmp.name, "reid"), threshold=0.9)
+        archiver = Archiver(db_file=self.db_file, batch_size=1, reid=reid)
+        archiver.start()
+        archiver.submit(SightingItem("dogs", 1, 1000, 1010, striped_crop((140, 90, 40), (90, 60, 30), seed=1)))
+        archiver.submit(SightingItem("dogs", 2, 2000, 2010, striped_crop((140, 90, 40), (90, 60, 30), seed=2)))
+        archiver.submit(SightingItem("dogs", 3, 3000, 3010, striped_crop((40, 90, 200), (220, 220, 220), seed=3)))
+        archiver.stop()
+
+        conn = sqlite3.connect(self.db_file)
+        sightings = conn.execute("SELECT track_id, entity_id FROM sightings ORDER BY id").fetchall()
+        entities = conn.execute("SELECT id, sightings FROM entities ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(sightings, [(1, 1), (2, 1), (3, 2)])
+        self.assertEqual(entities, [(1, 2), (2, 1)])
+        self.assertEqual(reid.stats()["matches"], 1)
+        self.assertEqual(reid.stats()["embeddings"], {"dogs": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from app.scheduler import AdaptiveDetectionScheduler
+
+
+class TestAdaptiveDetectionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.static = np.zeros((72, 128, 3), dtype=np.uint8)
+
+    def make(self, **kwargs):
+        options = dict(enabled=True, base_interval=10, min_interval=2, max_interval=40,
+                       motion_threshold=4.0, inference_budget=0.5, motion_width=64)
+        options.update(kwargs)
+        return AdaptiveDetectionScheduler(**options)
+
+    def run_frames(self, scheduler, frames):
+        return [i for i, frame in enumerate(frames) if scheduler.should_detect(frame)]
+
+    def test_disabled_matches_fixed_interval(self):
+        scheduler = self.make(enabled=False)
+        detected = self.run_frames(scheduler, [self.static] * 25)
+        self.assertEqual(detected, [0, 10, 20])
+
+    def test_static_scene_backs_off_to_heartbeat(self):
+        scheduler = self.make()
+        self.run_frames(scheduler, [self.static] * 200)
+        self.assertEqual(scheduler.interval, 40)
+
+    def test_motion_raises_detection_rate(self):
+        scheduler = self.make()
+        self.run_frames(scheduler, [self.static] * 200)
+
+        rng = np.random.default_rng(0)
+        noisy = [rng.integers(0, 255, self.static.shape, dtype=np.uint8) for _ in range(10)]
+        detected = self.run_frames(scheduler, noisy)
+        self.assertGreaterEqual(len(detected), 4)
+        self.assertEqual(scheduler.interval, 2)
+
+    def test_live_tracks_keep_base_interval(self):
+        scheduler = self.make()
+        scheduler.observe_tracks(live_tracks=2, lost_tracks=0)
+        self.run_frames(scheduler, [self.static] * 100)
+        self.assertEqual(scheduler.interval, 10)
+
+    def test_inference_budget_limits_interval(self):
+        scheduler = self.make()
+        scheduler.record_inference(0.5)
+        scheduler.should_detect(self.static, capture_fps=30)
+        self.assertEqual(scheduler.budget_interval(), 30)
+        self.assertGreaterEqual(scheduler.interval, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
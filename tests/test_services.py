@@ -0,0 +1,68 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from app.routes import main
+from app.services import ServiceRegistry
+
+
+class TestServiceRegistry(unittest.TestCase):
+    def test_factory_runs_once_on_first_use(self):
+        registry = ServiceRegistry()
+        factory = MagicMock(return_value="model")
+        registry.register("model", factory)
+
+        self.assertIsNone(registry.peek("model"))
+        self.assertFalse(registry.ready())
+        self.assertEqual(registry.get("model"), "model")
+        self.assertEqual(registry.get("model"), "model")
+        factory.assert_called_once()
+        self.assertTrue(registry.ready("model"))
+
+    def test_failure_is_reported_and_retried(self):
+        registry = ServiceRegistry()
+        registry.register("camera", MagicMock(side_effect=[OSError("busy"), "camera"]))
+
+        with self.assertRaises(RuntimeError):
+            registry.get("camera")
+        self.assertEqual(registry.status()["camera"]["state"], "failed")
+        self.assertEqual(registry.status()["camera"]["error"], "busy")
+        self.assertEqual(registry.get("camera"), "camera")
+
+    def test_concurrent_gets_share_one_instance(self):
+        registry = ServiceRegistry()
+        started = threading.Event()
+
+        def slow_factory():
+            started.wait(1)
+            return object()
+
+        registry.register("pipeline", slow_factory)
+        warm = registry.warm_up("pipeline")
+        started.set()
+        instance = registry.get("pipeline")
+        warm.join(timeout=5)
+        self.assertIs(registry.get("pipeline"), instance)
+
+
+class TestReadiness(unittest.TestCase):
+    def setUp(self):
+        self.registry = ServiceRegistry()
+        self.registry.register("pipeline", lambda: MagicMock())
+        app = Flask(__name__)
+        app.register_blueprint(main)
+        self.client = app.test_client()
+
+    def test_ready_endpoint(self):
+        with patch("app.routes.services", self.registry), patch("app.routes.startup_services", return_value=("pipeline",)):
+            response = self.client.get("/ready")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()["services"]["pipeline"]["state"], "pending")
+            self.assertEqual(self.client.get("/stats").status_code, 503)
+
+            self.registry.get("pipeline")
+            self.assertEqual(self.client.get("/ready").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
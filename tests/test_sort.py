@@ -0,0 +1,110 @@
+import unittest
+import itertools
+import numpy as np
+from app.base.sort import SortTracker
+from app.base.geometry import linear_assignment
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.base.detection import Detection
+
+
+class TestLinearAssignment(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for n, m in [(3, 3), (2, 5), (5, 2), (4, 4)]:
+            cost = rng.random((n, m))
+            rows, cols = linear_assignment(cost)
+            if n <= m:
+                best = min(sum(cost[i, p[i]] for i in range(n)) for p in itertools.permutations(range(m), n))
+            else:
+                best = min(sum(cost[p[j], j] for j in range(m)) for p in itertools.permutations(range(n), m))
+            self.assertEqual(len(rows), min(n, m))
+            self.assertAlmostEqual(cost[rows, cols].sum(), best)
+
+
+class TestSortTracker(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        self.tracker = SortTracker(min_hits=2, max_misses=2, iou_threshold=0.3, max_time_gap=30)
+
+    def dog(self, x, y=100):
+        return Detection(BBox(x, y, 50, 50), Category("dog"), 0.9)
+
+    def test_track_confirmed_after_min_hits(self):
+        self.tracker.update_with_detections(self.frame, [self.dog(100)])
+        self.assertEqual(self.tracker.trackers, {})
+
+        trackers = self.tracker.update_with_detections(self.frame, [self.dog(105)])
+        self.assertEqual(list(trackers.keys()), [1])
+
+    def test_track_survives_missed_detections(self):
+        for x in (100, 105, 110):
+            self.tracker.update_with_detections(self.frame, [self.dog(x)])
+        self.tracker.update_with_detections(self.frame, [])
+        self.tracker.update_with_detections(self.frame, [])
+        self.assertIn(1, self.tracker.trackers)
+
+        trackers = self.tracker.update_with_detections(self.frame, [self.dog(125)])
+        self.assertEqual(list(trackers.keys()), [1])
+
+        for _ in range(3):
+            self.tracker.update_with_detections(self.frame, [])
+        self.assertNotIn(1, self.tracker.trackers)
+
+    def test_prediction_follows_motion(self):
+        for x in (100, 110, 120, 130):
+            self.tracker.update_with_detections(self.frame, [self.dog(x)])
+            self.tracker.update_trackers(self.frame)
+        bbox = self.tracker.trackers[1].bbox
+        self.assertGreater(bbox.xmin, 130)
+
+    def test_detection_frames_predict_before_matching(self):
+        # Once the velocity is known, a jump too far for plain IoU still matches the predicted box.
+        for x in (100, 110, 120, 130, 160, 190, 220):
+            trackers = self.tracker.update_with_detections(self.frame, [self.dog(x)])
+        self.assertEqual(list(trackers.keys()), [1])
+        self.assertEqual(trackers[1].bbox.xmin, 220)
+
+    def test_lagged_detections_keep_velocity_unbiased(self):
+        # 5 px a frame, detected every 3rd frame with the result arriving 2 frames late.
+        tracker = SortTracker(min_hits=1, max_misses=2, iou_threshold=0.3, max_time_gap=30)
+        sent = {}
+        for frame_index in range(40):
+            if frame_index - 2 in sent:
+                tracker.update_with_detections(self.frame, [self.dog(100 + 5 * (frame_index - 2))],
+                                               source_frame=self.frame, source_tracks=sent.pop(frame_index - 2))
+            else:
+                tracker.update_trackers(self.frame)
+            if frame_index % 3 == 0:
+                sent[frame_index] = {obj_id: (track.category, track.bbox, track.confidence)
+                                     for obj_id, track in tracker.trackers.items()}
+        self.assertEqual(list(tracker.trackers.keys()), [1])
+        self.assertAlmostEqual(tracker.trackers[1].x[4], 5, delta=0.5)
+        self.assertAlmostEqual(tracker.trackers[1].bbox.xmin, 100 + 5 * 39, delta=3)
+
+    def test_add_tracker_returns_confirmed_id(self):
+        obj_id = self.tracker.add_tracker(self.frame, BBox(100, 100, 50, 50), Category("dog"))
+        self.assertEqual(obj_id, 1)
+        self.assertEqual(self.tracker.trackers[obj_id].category.to_plural(), "dogs")
+
+    def test_tracks_outside_inferred_regions_are_not_missed(self):
+        for x in (100, 105):
+            self.tracker.update_with_detections(self.frame, [self.dog(x)])
+        for _ in range(4):
+            self.tracker.update_with_detections(self.frame, [], regions=[(600, 400, 200, 200)])
+        self.assertIn(1, self.tracker.trackers)
+        self.assertEqual(self.tracker.trackers[1].misses, 0)
+
+        for _ in range(3):
+            self.tracker.update_with_detections(self.frame, [], regions=[(50, 50, 200, 200)])
+        self.assertNotIn(1, self.tracker.trackers)
+
+    def test_categories_are_not_mixed(self):
+        person = Detection(BBox(100, 100, 50, 50), Category("person"), 0.9)
+        self.tracker.update_with_detections(self.frame, [self.dog(100)])
+        self.tracker.update_with_detections(self.frame, [person])
+        self.assertEqual(self.tracker.trackers, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
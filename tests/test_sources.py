@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from app.sources import ImageDirectorySource, VideoFileSource, open_source
+
+
+class TestFrameSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frames = [np.full((48, 64, 3), 40 * i, dtype=np.uint8) for i in range(3)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_image_directory_in_order(self):
+        for i, frame in enumerate(self.frames):
+            cv2.imwrite(os.path.join(self.tmp.name, f"{i:03d}.png"), frame)
+        open(os.path.join(self.tmp.name, "notes.txt"), "w").close()
+
+        source = open_source(self.tmp.name)
+        self.assertIsInstance(source, ImageDirectorySource)
+        read = [source.read() for _ in range(4)]
+        self.assertEqual([int(frame[0, 0, 0]) for frame in read[:3]], [0, 40, 80])
+        self.assertIsNone(read[3])
+
+    def test_video_file_loops(self):
+        path = os.path.join(self.tmp.name, "clip.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for frame in self.frames:
+            writer.write(frame)
+        writer.release()
+
+        with VideoFileSource(path, loop=True) as source:
+            self.assertEqual(source.fps, 10)
+            read = [source.capture_array() for _ in range(5)]
+        self.assertTrue(all(frame is not None and frame.shape == (48, 64, 3) for frame in read))
+        self.assertEqual(source.frames_read, 5)
+
+    def test_unknown_source(self):
+        with self.assertRaises(ValueError):
+            open_source(os.path.join(self.tmp.name, "missing.mp4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from app.database import add_clip, add_image, connect, get_image, initialize_database
+from app.io import get_thumbnail, read_image
+from app.storage import MB, RECORD_HEADER, RECORD_MAGIC, RateLimiter, StorageManager
+
+DAY = 86400
+NOW = 1_700_000_000
+
+
+class RecordingEvent:
+    def __init__(self):
+        self.waits = []
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+
+
+class TestStorageManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "test.db")
+        self.images = os.path.join(self.tmp.name, "images")
+        self.thumbnails = os.path.join(self.tmp.name, "thumbnails")
+        self.clips = os.path.join(self.tmp.name, "clips")
+        initialize_database(self.db_file)
+        self.conn = connect(self.db_file)
+        self.open_sightings = {}
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def manager(self, **kwargs):
+        options = dict(db_file=self.db_file, budget_mb=None, min_free_mb=0, io_rate_mb=0, batch_size=2,
+                       pack_max_side=0, pack_quality=0, policies={"owners": {"compact_after_days": 1, "retention_days": 10}},
+                       default_policy={"compact_after_days": 7, "retention_days": 365}, images_core=self.images,
+                       packs_core=os.path.join(self.tmp.name, "packs"), thumbnails_core=self.thumbnails,
+                       clips_core=self.clips)
+        options.update(kwargs)
+        return StorageManager(**options)
+
+    def add(self, category, track_id, age_days, side=64, record_size=True):
+        ts = int(NOW - age_days * DAY)
+        path = os.path.join(self.images, category, str(track_id), f"{ts}.jpg")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image = np.random.default_rng(ts).integers(0, 255, (side, side, 3), dtype=np.uint8)
+        cv2.imwrite(path, image)
+        with self.conn:
+            add_image(self.conn, self.open_sightings, category, track_id, ts, path,
+                      os.path.getsize(path) if record_size else None)
+        return self.conn.execute("SELECT MAX(id) FROM images").fetchone()[0], path
+
+    def add_clip(self, tracks, age_days, size):
+        # tracks are (category, track_id) pairs appearing in one clip file.
+        ts = int(NOW - age_days * DAY)
+        path = os.path.join(self.clips, str(ts), f"{ts}.mp4")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"\x00" * size)
+        with self.conn:
+            for category, track_id in tracks:
+                add_clip(self.conn, self.open_sightings, category, track_id, ts, ts + 10, path, ts, ts + 10, size)
+        return path
+
+    def test_old_images_are_packed_and_readable(self):
+        old_id, old_path = self.add("dogs", 1, 30)
+        other_id, _ = self.add("dogs", 1, 29)
+        new_id, new_path = self.add("dogs", 2, 1)
+        original = cv2.imread(old_path)
+
+        summary = self.manager().run_pass(now=NOW)
+
+        self.assertEqual(summary["compacted"], 2)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertFalse(os.path.exists(os.path.dirname(old_path)))
+        self.assertTrue(os.path.exists(new_path))
+        image_id, _, _, path, pack_path, offset, length = get_image(self.conn, old_id)
+        self.assertEqual(path, old_path)
+        self.assertIsNone(get_image(self.conn, new_id)[4])
+        np.testing.assert_array_equal(read_image(path, (pack_path, offset, length)), original)
+        with open(pack_path, "rb") as pack:
+            magic, packed_id, packed_length = RECORD_HEADER.unpack(pack.read(RECORD_HEADER.size))
+        self.assertEqual((magic, packed_id, packed_length), (RECORD_MAGIC, old_id, length))
+        thumb = get_thumbnail(path, image_id, 32, self.thumbnails, pack=(pack_path, offset, length))
+        self.assertEqual(cv2.imread(thumb).shape[:2], (32, 32))
+
+    def test_pack_downscaling(self):
+        image_id, _ = self.add("dogs", 1, 30, side=256)
+        self.manager(pack_max_side=64, pack_quality=70).run_pass(now=NOW)
+        _, _, _, path, *pack = get_image(self.conn, image_id)
+        self.assertEqual(read_image(path, tuple(pack)).shape[:2], (64, 64))
+
+    def test_retention_per_category(self):
+        owner_id, owner_path = self.add("owners", 1, 11)
+        dog_id, _ = self.add("dogs", 2, 11)
+        os.makedirs(os.path.join(self.thumbnails, "160"))
+        thumb = os.path.join(self.thumbnails, "160", f"{owner_id}.jpg")
+        open(thumb, "wb").close()
+
+        summary = self.manager().run_pass(now=NOW)
+
+        self.assertEqual(summary["expired"], 1)
+        self.assertIsNone(get_image(self.conn, owner_id))
+        self.assertFalse(os.path.exists(owner_path) or os.path.exists(thumb))
+        self.assertIsNotNone(get_image(self.conn, dog_id))
+
+    def test_empty_packs_are_deleted(self):
+        image_id, _ = self.add("owners", 1, 5)
+        manager = self.manager()
+        manager.run_pass(now=NOW)
+        pack_path = get_image(self.conn, image_id)[4]
+        self.assertTrue(os.path.exists(pack_path))
+
+        manager.run_pass(now=NOW + 6 * DAY)
+        self.assertFalse(os.path.exists(pack_path))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM packs").fetchone()[0], 0)
+
+    def test_budget_evicts_oldest_first(self):
+        ids = [self.add("dogs", track_id, age, side=256)[0] for track_id, age in ((1, 3), (2, 2), (3, 1))]
+        size = self.conn.execute("SELECT bytes FROM images WHERE id = ?", (ids[2],)).fetchone()[0]
+        manager = self.manager(budget_mb=2.5 * size / MB)
+
+        summary = manager.run_pass(now=NOW)
+
+        self.assertEqual(summary["evicted"], 1)
+        self.assertIsNone(get_image(self.conn, ids[0]))
+        self.assertIsNotNone(get_image(self.conn, ids[1]))
+        usage = manager.stats()
+        self.assertEqual(usage["loose"]["images"], 2)
+        self.assertLessEqual(usage["utilization"], 1.0)
+
+    def test_clip_retention_waits_for_every_category(self):
+        shared = self.add_clip([("dogs", 1), ("owners", 2)], 40, 1000)
+        recent = self.add_clip([("dogs", 3)], 1, 1000)
+        manager = self.manager(default_policy={"clip_retention_days": 30},
+                               policies={"owners": {"clip_retention_days": 60}})
+
+        self.assertEqual(manager.run_pass(now=NOW)["clips_expired"], 0)
+        self.assertTrue(os.path.exists(shared))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM clips WHERE path = ?", (shared,)).fetchone()[0], 1)
+
+        self.assertEqual(manager.run_pass(now=NOW + 25 * DAY)["clips_expired"], 1)
+        self.assertFalse(os.path.exists(os.path.dirname(shared)))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_budget_counts_and_evicts_clips(self):
+        clip = self.add_clip([("dogs", 1), ("dogs", 2)], 3, 200_000)
+        image_id, _ = self.add("dogs", 3, 2, side=256)
+        size = self.conn.execute("SELECT bytes FROM images WHERE id = ?", (image_id,)).fetchone()[0]
+        manager = self.manager(budget_mb=(size + 100_000) / MB)
+        self.assertEqual(manager.stats()["clips"], {"files": 1, "mb": round(200_000 / MB, 1)})
+
+        summary = manager.run_pass(now=NOW)
+
+        self.assertEqual((summary["clips_evicted"], summary["evicted"]), (1, 0))
+        self.assertFalse(os.path.exists(clip))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM clips").fetchone()[0], 0)
+        self.assertIsNotNone(get_image(self.conn, image_id))
+
+    def test_sizes_of_legacy_rows_are_backfilled(self):
+        image_id, path = self.add("dogs", 1, 1, record_size=False)
+        self.manager().run_pass(now=NOW)
+        size = self.conn.execute("SELECT bytes FROM images WHERE id = ?", (image_id,)).fetchone()[0]
+        self.assertEqual(size, os.path.getsize(path))
+
+    def test_rate_limiter_waits_for_tokens(self):
+        event = RecordingEvent()
+        limiter = RateLimiter(1000, event)
+        limiter.consume(500)
+        limiter.consume(1500)
+        # The bucket starts full, so only the bytes beyond one second's worth are waited for.
+        self.assertEqual(len(event.waits), 1)
+        self.assertAlmostEqual(event.waits[0], 1.0, delta=0.05)
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from app.base.bbox import BBox
+from app.base.category import Category
+from app.base.track_store import TrackStore
+
+
+class TestTrackStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TrackStore(max_time_gap=30, capacity=2)
+        for obj_id in (1, 2, 3):
+            category = Category("dog" if obj_id % 2 else "person")
+            self.store.add(obj_id, BBox(10 * obj_id, 0, 20, 20), category, 0.5, f"tracker-{obj_id}", 100.0)
+
+    def test_views_and_growth(self):
+        self.assertEqual(self.store.capacity, 4)
+        self.assertEqual(list(self.store), [1, 2, 3])
+        view = self.store[2]
+        self.assertEqual(view.bbox, BBox(20, 0, 20, 20))
+        self.assertEqual(view.category.to_plural(), "owners")
+        self.assertEqual(view.tracker, "tracker-2")
+        view.bbox = BBox(1, 2, 3, 4)
+        self.assertEqual(self.store.boxes[1].tolist(), [1, 2, 3, 4])
+        with self.assertRaises(AttributeError):
+            view.extra = 1
+
+    def test_remove_compacts_in_order(self):
+        view = self.store[3]
+        self.store.remove([1, 4])
+        self.assertEqual(list(self.store), [2, 3])
+        self.assertIs(self.store[3], view)
+        self.assertEqual((view.row, view.obj_id, view.tracker), (1, 3, "tracker-3"))
+        self.assertEqual(self.store.last_seen[2], np.inf)
+        self.assertNotIn(1, self.store)
+
+    def test_expiry_on_monotonic_clock(self):
+        self.store[2].last_seen = 50.0
+        self.assertEqual(self.store.expired_ids(110.0), [2])
+        self.assertTrue(self.store[1].is_active(130.0))
+        self.assertFalse(self.store[1].is_active(130.5))
+
+    def test_apply_updates_rescales_updated_rows(self):
+        self.store.raw[:3] = [[5, 5, 10, 10], [0, 0, 0, 0], [7, 7, 7, 7]]
+        self.store.updated[:3] = [True, False, True]
+        self.store.apply_updates(0.5, 200.0)
+        self.assertEqual(self.store[1].bbox, BBox(10, 10, 20, 20))
+        self.assertEqual(self.store[2].bbox, BBox(20, 0, 20, 20))
+        self.assertEqual(self.store.last_seen[:3].tolist(), [200.0, 100.0, 200.0])
+        self.assertEqual(self.store.failed_ids(), [2])
+        np.testing.assert_array_equal(self.store.xyxy()[0], [10, 10, 30, 30])
+
+    def test_snapshot_is_a_frame_copy(self):
+        self.store[2].confidence = 0.75
+        snapshot = self.store.snapshot()
+        self.store[1].bbox = BBox(0, 0, 1, 1)
+        self.store.remove([3])
+
+        self.assertEqual(list(snapshot), [1, 2, 3])
+        self.assertEqual(len(snapshot), 3)
+        category, bbox, confidence = snapshot[2]
+        self.assertEqual((category.to_plural(), bbox, confidence), ("owners", BBox(20, 0, 20, 20), 0.75))
+        self.assertEqual(dict(snapshot.items())[1][1], BBox(10, 0, 20, 20))
+        self.assertNotIn(4, snapshot)
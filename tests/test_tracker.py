@@ -1,6 +1,5 @@
 import unittest
 from unittest.mock import MagicMock, patch
-import datetime
 import numpy as np
 from app.base.tracker import OpenCVTracker, update_trackers_with_yolo
 from app.base.bbox import BBox
@@ -40,7 +39,7 @@ class TestTracker(unittest.TestCase):
         tracker_id = self.tracker.add_tracker(self.mock_frame, bbox, category)
 
         # Manually set `last_seen` to simulate inactivity
-        self.tracker.trackers[tracker_id].last_seen -= datetime.timedelta(seconds=30)
+        self.tracker.trackers[tracker_id].last_seen -= 30
         self.tracker.update_trackers(self.mock_frame)
 
         self.assertNotIn(tracker_id, self.tracker.trackers)